@@ -0,0 +1,66 @@
+"""Add hot path indexes
+
+Revision ID: c3f1a9d27b54
+Revises: ae6068934f89
+Create Date: 2026-10-19 09:12:41.318204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c3f1a9d27b54'
+down_revision: Union[str, Sequence[str], None] = 'ae6068934f89'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# (index name, table, columns)
+INDEXES = [
+    # Asset list filters, with the location second so scope filtering stays inside the index
+    ('ix_assets_status_location', 'assets', ['status', 'location']),
+    ('ix_assets_category_location', 'assets', ['category', 'location']),
+    # Task progress counts; uq_task_asset already serves task_id alone
+    ('ix_cycle_count_items_task_status', 'cycle_count_items', ['task_id', 'status']),
+    ('ix_cycle_count_tasks_status_assigned', 'cycle_count_tasks', ['status', 'assigned_to']),
+    # "Is this asset already in a transfer" check
+    ('ix_asset_transfer_items_asset_id', 'asset_transfer_items', ['asset_id']),
+    # Pending approvals of a user
+    ('ix_asset_transfer_approvals_approver_status', 'asset_transfer_approvals', ['approver_id', 'status']),
+    # Sync history per type, and the dashboards' latest syncs
+    ('ix_sync_logs_type_started', 'sync_logs', ['sync_type', 'started_at']),
+    ('ix_sync_logs_started_at', 'sync_logs', ['started_at']),
+    # Children of a node, listed by name
+    ('ix_locations_branch_name', 'locations', ['branch_id', 'name']),
+    ('ix_branches_region_name', 'branches', ['region_id', 'name']),
+    ('ix_regions_country_name', 'regions', ['country_id', 'name']),
+    ('ix_temp_assets_created_by', 'temp_assets', ['created_by', 'created_at']),
+]
+
+# Foreign key columns whose implicit InnoDB index is replaced by one of the indexes above;
+# downgrade puts a plain index back first, otherwise MySQL refuses to drop ours
+FOREIGN_KEY_COLUMNS = {
+    'ix_asset_transfer_items_asset_id': ('asset_transfer_items', 'asset_id'),
+    'ix_asset_transfer_approvals_approver_status': ('asset_transfer_approvals', 'approver_id'),
+    'ix_locations_branch_name': ('locations', 'branch_id'),
+    'ix_branches_region_name': ('branches', 'region_id'),
+    'ix_regions_country_name': ('regions', 'country_id'),
+}
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # user_*_assignments.user_id needs nothing: it leads the uq_user_* unique keys
+    for name, table, columns in INDEXES:
+        op.create_index(name, table, columns)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for name, table, columns in reversed(INDEXES):
+        if name in FOREIGN_KEY_COLUMNS:
+            fk_table, column = FOREIGN_KEY_COLUMNS[name]
+            op.create_index(column, fk_table, [column])
+        op.drop_index(name, table_name=table)
@@ -0,0 +1,44 @@
+"""Add asset search index
+
+Revision ID: d8e2b4c61f07
+Revises: c3f1a9d27b54
+Create Date: 2026-10-19 11:04:27.551930
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd8e2b4c61f07'
+down_revision: Union[str, Sequence[str], None] = 'c3f1a9d27b54'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Same recipe as models.asset_search_text; CONCAT_WS skips NULLs
+BACKFILL = """
+UPDATE assets SET search_text = LOWER(CONCAT_WS(' ',
+    name,
+    model,
+    barcode,
+    REGEXP_REPLACE(LOWER(barcode), '[^0-9a-z]+', ''),
+    REGEXP_REPLACE(LOWER(model), '[^0-9a-z]+', ''),
+    erp_asset_id
+))
+"""
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('assets', sa.Column('search_text', sa.Text(), nullable=True))
+    op.execute(BACKFILL)
+    # Words shorter than innodb_ft_min_token_size (3 by default) are not indexed
+    op.create_index('ix_assets_search_text', 'assets', ['search_text'], mysql_prefix='FULLTEXT')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_assets_search_text', table_name='assets')
+    op.drop_column('assets', 'search_text')
@@ -0,0 +1,39 @@
+"""Add asset change feed
+
+Revision ID: e5b9a3c2d417
+Revises: d8e2b4c61f07
+Create Date: 2026-10-19 15:42:08.213664
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e5b9a3c2d417'
+down_revision: Union[str, Sequence[str], None] = 'd8e2b4c61f07'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_assets_updated_at_id', 'assets', ['updated_at', 'id'])
+    op.create_table('asset_tombstones',
+    sa.Column('id', sa.BigInteger(), autoincrement=True, nullable=False),
+    sa.Column('asset_id', sa.String(length=36), nullable=False),
+    sa.Column('location', sa.String(length=36), nullable=True),
+    sa.Column('reason', sa.String(length=16), nullable=False),
+    sa.Column('removed_at', sa.DateTime(), server_default=sa.text('now()'), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_asset_tombstones_removed_at_id', 'asset_tombstones', ['removed_at', 'id'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_asset_tombstones_removed_at_id', table_name='asset_tombstones')
+    op.drop_table('asset_tombstones')
+    op.drop_index('ix_assets_updated_at_id', table_name='assets')
@@ -1,13 +1,17 @@
+import hashlib
+import time
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import List, Optional
 from jose import JWTError, jwt
 from passlib.context import CryptContext
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.orm import Session
-from db import get_db
+from db import get_db, identify_caller
 from models import User, UserRole
 from config import config
+from utils import AccessScope, get_access_scope_for_user
+from cache import LRUCache, CacheStats, get_version, bump_version
 
 # Password hashing
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
@@ -20,6 +24,20 @@ ACCESS_TOKEN_EXPIRE_MINUTES = config.ACCESS_TOKEN_EXPIRE_MINUTES
 # OAuth2 scheme
 oauth2_scheme = HTTPBearer()
 
+# Verified tokens: sha256(token) -> (detached User, user version when cached)
+_token_cache = LRUCache(maxsize=config.TOKEN_CACHE_SIZE)
+token_cache_stats = CacheStats()
+
+def _user_version_key(user_id: str) -> str:
+    return f"user:{user_id}"
+
+def invalidate_user_tokens(user_id: str):
+    """
+    Revoke the tokens already issued to a user; call after lock, unlock, role change or deletion.
+    Cached tokens are dropped in every worker and tokens stamped with an older version are rejected.
+    """
+    bump_version(_user_version_key(user_id))
+
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
@@ -44,7 +62,71 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-async def get_current_user(token: HTTPAuthorizationCredentials = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+def create_user_token(db: Session, user: User) -> str:
+    """Issue an access token carrying the user's roles and current version as signed claims"""
+    return create_access_token(
+        data={
+            "sub": user.id,
+            "roles": get_user_roles(db, user.id),
+            # Read straight from Redis so a change made in another worker is never missed
+            "ver": get_version(_user_version_key(user.id), max_age=0),
+        },
+        expires_delta=timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES),
+    )
+
+class Principal:
+    """
+    Authenticated caller of a request.
+    Roles come from the token claims when present, otherwise they are loaded on first use.
+    Access scope is loaded on first use; both are then reused by every dependency and handler.
+    """
+
+    def __init__(self, user: User, db: Session, roles: Optional[List[str]] = None):
+        self.user = user
+        self._db = db
+        self._roles: Optional[List[str]] = roles
+        self._scope: Optional[AccessScope] = None
+
+    @property
+    def id(self) -> str:
+        return self.user.id
+
+    @property
+    def roles(self) -> List[str]:
+        if self._roles is None:
+            self._roles = get_user_roles(self._db, self.user.id)
+        return self._roles
+
+    @property
+    def loaded_roles(self) -> Optional[List[str]]:
+        """Roles if already known, without querying for them"""
+        return self._roles
+
+    @property
+    def scope(self) -> AccessScope:
+        if self._scope is None:
+            self._scope = get_access_scope_for_user(self._db, self.user.id, roles=self.roles)
+        return self._scope
+
+def get_principal(request: Request, token: HTTPAuthorizationCredentials = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> Principal:
+    """Resolve the caller once per request and keep it on request.state"""
+    principal = getattr(request.state, "principal", None)
+    if principal is not None:
+        return principal
+
+    token_key = hashlib.sha256(token.credentials.encode()).hexdigest()
+    cached = _token_cache.get(token_key)
+    if cached is not None:
+        user, user_version, roles = cached
+        if user_version == get_version(_user_version_key(user.id)):
+            token_cache_stats.record_hit()
+            identify_caller(db, user.id)
+            principal = Principal(user, db, roles=roles)
+            request.state.principal = principal
+            return principal
+        _token_cache.delete(token_key)
+
+    started = time.perf_counter()
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -58,12 +140,42 @@ async def get_current_user(token: HTTPAuthorizationCredentials = Depends(oauth2_
     except JWTError:
         raise credentials_exception
     
+    # Read the version before the user so an invalidation racing this lookup is not lost
+    user_version = get_version(_user_version_key(user_id))
+    # Tokens issued before a role change, lock or deletion are no longer honoured. Tokens from before
+    # the claim existed count as version 0, so the first revocation of their user rejects them too
+    token_version = payload.get("ver", 0)
+    if token_version < user_version:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Token has been revoked, please sign in again",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    # Older tokens without claims fall back to loading roles from the database
+    roles = payload.get("roles")
+
     user = db.query(User).filter(User.id == user_id).first()
     if user is None:
         raise credentials_exception
-    return user
+    if user.is_active is False:
+        raise HTTPException(status_code=400, detail="Inactive user")
+
+    # Cache until the token expires, but never longer than the configured window
+    ttl = min(payload.get("exp", 0) - time.time(), config.TOKEN_CACHE_TTL_SECONDS)
+    if ttl > 0:
+        db.expunge(user)
+        _token_cache.set(token_key, (user, user_version, roles), ttl=ttl)
+    token_cache_stats.record_miss(time.perf_counter() - started)
+
+    identify_caller(db, user.id)
+    principal = Principal(user, db, roles=roles)
+    request.state.principal = principal
+    return principal
 
-async def get_current_active_user(current_user: User = Depends(get_current_user)):
+def get_current_user(principal: Principal = Depends(get_principal)):
+    return principal.user
+
+def get_current_active_user(current_user: User = Depends(get_current_user)):
     if not current_user.is_active:
         raise HTTPException(status_code=400, detail="Inactive user")
     return current_user
@@ -73,23 +185,21 @@ def get_user_roles(db: Session, user_id: str) -> list:
     return [role.role for role in roles]
 
 def require_role(required_role: str):
-    def role_checker(current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
-        user_roles = get_user_roles(db, current_user.id)
-        if required_role not in user_roles:
+    def role_checker(principal: Principal = Depends(get_principal)):
+        if required_role not in principal.roles:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail="Not enough permissions"
             )
-        return current_user
+        return principal.user
     return role_checker
 
 def require_any_role(required_roles: list):
-    def role_checker(current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
-        user_roles = get_user_roles(db, current_user.id)
-        if not any(role in user_roles for role in required_roles):
+    def role_checker(principal: Principal = Depends(get_principal)):
+        if not any(role in principal.roles for role in required_roles):
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail="Not enough permissions"
             )
-        return current_user
-    return role_checker 
\ No newline at end of file
+        return principal.user
+    return role_checker
@@ -0,0 +1,175 @@
+import itertools
+import json
+import logging
+import time
+from typing import Any, Dict, Iterable, Optional
+import redis
+from sqlalchemy import event
+from sqlalchemy.orm import Session, attributes
+from config import config
+from cache import LRUCache, CacheStats, get_redis, get_version, bump_version
+from db import SessionLocal
+from hierarchy import get_hierarchy
+from models import Asset
+from schemas import AssetOut
+
+logger = logging.getLogger("uvicorn")
+
+# Bumped by bulk writes; every cached barcode of older versions is dropped at once
+BARCODE_VERSION = "barcodes"
+
+_local = LRUCache(maxsize=config.BARCODE_CACHE_SIZE, ttl=config.BARCODE_CACHE_LOCAL_TTL_SECONDS)
+barcode_cache_stats = CacheStats()
+
+def _key(barcode: str, version: Optional[int] = None) -> str:
+    # Lowercased like the case-insensitive column collation, so 'abc-1' and 'ABC-1' share an entry
+    return f"barcode:{get_version(BARCODE_VERSION) if version is None else version}:{barcode.lower()}"
+
+def project(asset: Asset) -> Dict[str, Any]:
+    """The AssetOut response of an asset as a JSON-ready dict"""
+    return AssetOut.model_validate(asset).model_dump(mode="json")
+
+def cached_projection(barcode: str) -> Optional[Dict[str, Any]]:
+    """Cached projection from process memory or Redis; None on a miss"""
+    key = _key(barcode)
+    projection = _local.get(key)
+    if projection is not None:
+        barcode_cache_stats.record_hit("local")
+        return projection
+    client = get_redis()
+    if client is None:
+        return None
+    try:
+        cached = client.get(key)
+    except redis.RedisError:
+        return None
+    if cached is None:
+        return None
+    projection = json.loads(cached)
+    _local.set(key, projection)
+    barcode_cache_stats.record_hit("redis")
+    return projection
+
+def remember(asset: Asset, rebuild_seconds: float = 0.0) -> Dict[str, Any]:
+    """Store the projection of an asset loaded after a miss and return it"""
+    projection = project(asset)
+    barcode_cache_stats.record_miss(rebuild_seconds)
+    key = _key(asset.barcode)
+    _local.set(key, projection)
+    client = get_redis()
+    if client is not None:
+        try:
+            client.setex(key, config.BARCODE_CACHE_TTL_SECONDS, json.dumps(projection))
+        except redis.RedisError:
+            pass
+    return projection
+
+def remember_many(assets: Iterable[Asset]) -> Dict[str, Dict[str, Any]]:
+    """Store projections of assets loaded in bulk with one Redis round trip; returns them by asset id"""
+    projections = {}
+    client = get_redis()
+    pipeline = client.pipeline(transaction=False) if client is not None else None
+    version = get_version(BARCODE_VERSION)
+    for asset in assets:
+        projection = projections[asset.id] = project(asset)
+        key = _key(asset.barcode, version)
+        _local.set(key, projection)
+        if pipeline is not None:
+            pipeline.setex(key, config.BARCODE_CACHE_TTL_SECONDS, json.dumps(projection))
+    if pipeline is not None:
+        try:
+            pipeline.execute()
+        except redis.RedisError:
+            pass
+    return projections
+
+def get_asset_projection(db: Session, barcode: str) -> Optional[Dict[str, Any]]:
+    """Asset projection for a scanned barcode, read through the cache"""
+    if not config.BARCODE_CACHE_ENABLED:
+        asset = db.query(Asset).filter(Asset.barcode == barcode).first()
+        return project(asset) if asset else None
+    projection = cached_projection(barcode)
+    if projection is not None:
+        return projection
+    started = time.perf_counter()
+    asset = db.query(Asset).filter(Asset.barcode == barcode).first()
+    if asset is None:
+        return None
+    return remember(asset, time.perf_counter() - started)
+
+def invalidate(barcodes: Iterable[str]):
+    barcodes = set(barcodes)
+    if len(barcodes) > config.BARCODE_CACHE_BULK_THRESHOLD:
+        invalidate_all()
+        return
+    keys = [_key(barcode) for barcode in barcodes]
+    for key in keys:
+        _local.delete(key)
+    client = get_redis()
+    if client is not None and keys:
+        try:
+            client.delete(*keys)
+        except redis.RedisError as e:
+            logger.warning(f"Failed to invalidate {len(keys)} cached barcodes: {str(e)}")
+
+def invalidate_all():
+    """Call after writes to assets that bypass the ORM, or after large syncs"""
+    bump_version(BARCODE_VERSION)
+    _local.clear()
+
+# Every ORM write to an asset (API, transfers, ERP sync, imports) invalidates its old and new barcode on commit
+@event.listens_for(Session, "after_flush")
+def _collect_barcodes(session, flush_context):
+    stale = session.info.setdefault("stale_barcodes", set())
+    for obj in itertools.chain(session.new, session.dirty, session.deleted):
+        if isinstance(obj, Asset):
+            history = attributes.get_history(obj, "barcode")
+            stale.update(barcode for barcode in itertools.chain(history.added, history.unchanged, history.deleted) if barcode)
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_committed(session):
+    stale = session.info.pop("stale_barcodes", None)
+    if stale:
+        invalidate(stale)
+
+@event.listens_for(Session, "after_rollback")
+def _discard_uncommitted(session):
+    session.info.pop("stale_barcodes", None)
+
+def warm_location_branch(location_id: str) -> int:
+    """
+    Load every asset of the location's branch into the cache, so the scans of a cycle count
+    that just started hit it from the first item. Runs as a background task.
+    """
+    if not config.BARCODE_CACHE_ENABLED:
+        return 0
+    hierarchy = get_hierarchy()
+    node = hierarchy.locations.get(location_id)
+    location_ids = list(hierarchy.branch_locations.get(node.branch_id, ())) if node and node.branch_id else []
+    location_ids = location_ids or [location_id]
+
+    started = time.perf_counter()
+    version = get_version(BARCODE_VERSION)
+    client = get_redis()
+    pipeline = client.pipeline(transaction=False) if client is not None else None
+    warmed = 0
+    db = SessionLocal()
+    try:
+        assets = db.query(Asset).filter(Asset.location.in_(location_ids), Asset.barcode.isnot(None)).yield_per(1000)
+        for asset in assets:
+            projection = project(asset)
+            key = _key(asset.barcode, version)
+            _local.set(key, projection)
+            if pipeline is not None:
+                pipeline.setex(key, config.BARCODE_CACHE_TTL_SECONDS, json.dumps(projection))
+                if len(pipeline) >= 1000:
+                    pipeline.execute()
+            warmed += 1
+        if pipeline is not None:
+            pipeline.execute()
+    except redis.RedisError as e:
+        logger.warning(f"Barcode cache warm-up for location {location_id} stopped: {str(e)}")
+    finally:
+        db.close()
+    logger.info(f"Warmed {warmed} barcodes for location {location_id} in {time.perf_counter() - started:.2f}s")
+    return warmed
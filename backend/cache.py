@@ -0,0 +1,212 @@
+import itertools
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional
+import redis
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from config import config
+
+logger = logging.getLogger("uvicorn")
+
+# Version names shared by every process (API workers and Celery)
+HIERARCHY_VERSION = "hierarchy"
+ASSETS_VERSION = "assets"
+CATEGORIES_VERSION = "categories"
+PROFILES_VERSION = "profiles"
+# Tables whose ORM writes bump a version named after the table, a cheap change signal for ETags
+VERSIONED_TABLES = {ASSETS_VERSION, CATEGORIES_VERSION, PROFILES_VERSION}
+
+class LRUCache:
+    """Thread-safe in-process LRU cache with an optional per-entry TTL"""
+
+    def __init__(self, maxsize: int = 1024, ttl: Optional[float] = None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return default
+            value, expires_at = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None):
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = time.monotonic() + ttl if ttl else None
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key: Hashable):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+class CacheStats:
+    """Hit/miss counters and rebuild latency for a two-tier cache"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.local_hits = 0
+        self.redis_hits = 0
+        self.misses = 0
+        self.rebuild_seconds_total = 0.0
+        self.rebuild_seconds_max = 0.0
+
+    def record_hit(self, tier: str = "local"):
+        with self._lock:
+            if tier == "redis":
+                self.redis_hits += 1
+            else:
+                self.local_hits += 1
+
+    def record_miss(self, rebuild_seconds: float):
+        with self._lock:
+            self.misses += 1
+            self.rebuild_seconds_total += rebuild_seconds
+            self.rebuild_seconds_max = max(self.rebuild_seconds_max, rebuild_seconds)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            hits = self.local_hits + self.redis_hits
+            lookups = hits + self.misses
+            return {
+                "lookups": lookups,
+                "local_hits": self.local_hits,
+                "redis_hits": self.redis_hits,
+                "misses": self.misses,
+                "hit_ratio": round(hits / lookups, 4) if lookups else None,
+                "rebuild_avg_ms": round(self.rebuild_seconds_total / self.misses * 1000, 3) if self.misses else None,
+                "rebuild_max_ms": round(self.rebuild_seconds_max * 1000, 3),
+            }
+
+_redis_client: Optional[redis.Redis] = None
+_redis_retry_at = 0.0
+_redis_lock = threading.Lock()
+
+def get_redis() -> Optional[redis.Redis]:
+    """Return the shared Redis client, or None while Redis is unreachable"""
+    global _redis_client, _redis_retry_at
+    if _redis_client is not None:
+        return _redis_client
+    if time.monotonic() < _redis_retry_at:
+        return None
+    with _redis_lock:
+        if _redis_client is not None:
+            return _redis_client
+        client = redis.Redis(
+            host=config.REDIS_HOST,
+            port=config.REDIS_PORT,
+            db=config.REDIS_DB,
+            password=config.REDIS_PASSWORD or None,
+            socket_timeout=config.CACHE_REDIS_TIMEOUT,
+            socket_connect_timeout=config.CACHE_REDIS_TIMEOUT,
+            decode_responses=True,
+        )
+        try:
+            client.ping()
+        except redis.RedisError as e:
+            logger.warning(f"Redis cache unavailable, using in-process cache only: {str(e)}")
+            _redis_retry_at = time.monotonic() + 30
+            return None
+        _redis_client = client
+        return _redis_client
+
+# Last known value of each version counter, when it last changed, and when it was read from Redis
+_versions: Dict[str, int] = {}
+_versions_changed_at: Dict[str, float] = {}
+_versions_checked_at: Dict[str, float] = {}
+# Latest version each counter was bumped to by this process
+_bumped_versions: Dict[str, int] = {}
+
+def get_version(name: str, max_age: Optional[float] = None) -> int:
+    """
+    Current value of a shared version counter.
+    Reads are served from process memory for CACHE_VERSION_CHECK_SECONDS (or max_age) before Redis is asked again.
+    """
+    now = time.monotonic()
+    max_age = config.CACHE_VERSION_CHECK_SECONDS if max_age is None else max_age
+    if name in _versions and now - _versions_checked_at.get(name, 0) < max_age:
+        return _versions[name]
+    client = get_redis()
+    if client is not None:
+        try:
+            version, changed_at = client.mget(f"version:{name}", f"version_at:{name}")
+            _versions[name] = int(version or 0)
+            _versions_changed_at[name] = float(changed_at or 0)
+        except redis.RedisError as e:
+            logger.warning(f"Failed to read cache version {name}: {str(e)}")
+    _versions.setdefault(name, 0)
+    _versions_changed_at.setdefault(name, 0.0)
+    _versions_checked_at[name] = now
+    return _versions[name]
+
+def get_version_changed_at(name: str) -> float:
+    """Unix time of the last bump of a version counter, 0 if never bumped"""
+    get_version(name)
+    return _versions_changed_at[name]
+
+def bump_version(name: str) -> int:
+    """Increment a shared version counter, invalidating everything cached under the old value"""
+    client = get_redis()
+    version = None
+    changed_at = time.time()
+    if client is not None:
+        try:
+            pipeline = client.pipeline()
+            pipeline.incr(f"version:{name}")
+            pipeline.set(f"version_at:{name}", changed_at)
+            version = int(pipeline.execute()[0])
+        except redis.RedisError as e:
+            logger.warning(f"Failed to bump cache version {name}: {str(e)}")
+    if version is None:
+        version = _versions.get(name, 0) + 1
+    _versions[name] = version
+    _versions_changed_at[name] = changed_at
+    _versions_checked_at[name] = time.monotonic()
+    _bumped_versions[name] = max(version, _bumped_versions.get(name, 0))
+    return version
+
+def get_bumped_version(name: str) -> int:
+    """Latest version this process bumped a counter to, 0 if it never did"""
+    return _bumped_versions.get(name, 0)
+
+def bump_hierarchy_version() -> int:
+    """Call after any write to countries, regions, branches, locations, assignments or roles"""
+    return bump_version(HIERARCHY_VERSION)
+
+@event.listens_for(Session, "after_flush")
+def _collect_changed_tables(session, flush_context):
+    changed = session.info.setdefault("changed_tables", set())
+    modified = (obj for obj in session.dirty if session.is_modified(obj))
+    for obj in itertools.chain(session.new, session.deleted, modified):
+        table = getattr(obj, "__tablename__", None)
+        if table in VERSIONED_TABLES:
+            changed.add(table)
+
+@event.listens_for(Session, "after_commit")
+def _bump_changed_tables(session):
+    for table in session.info.pop("changed_tables", ()):
+        bump_version(table)
+
+@event.listens_for(Session, "after_rollback")
+def _discard_changed_tables(session):
+    session.info.pop("changed_tables", None)
@@ -7,7 +7,7 @@ celery_app = Celery(
     "asset_management",
     broker=f"redis://{config.REDIS_HOST}:{config.REDIS_PORT}/{config.REDIS_DB}",
     backend=f"redis://{config.REDIS_HOST}:{config.REDIS_PORT}/{config.REDIS_DB}",
-    include=["tasks.erp_tasks"]
+    include=["tasks.erp_tasks", "tasks.snapshot_tasks"]
 )
 
 # Celery configuration
@@ -29,6 +29,7 @@ celery_app.conf.update(
 # Optional: Configure task routing
 celery_app.conf.task_routes = {
     "tasks.erp_tasks.*": {"queue": "erp_sync"},
+    "tasks.snapshot_tasks.*": {"queue": "snapshots"},
 }
 
 if __name__ == "__main__":
@@ -0,0 +1,58 @@
+import hashlib
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Iterable, Optional
+from fastapi import Request, Response
+from cache import get_redis, get_version, get_version_changed_at, HIERARCHY_VERSION
+from hierarchy import get_hierarchy
+
+# Conditional GET for list endpoints. Validators come from the shared version counters
+# (cache.VERSIONED_TABLES and the hierarchy version), so a matching request is answered
+# with 304 before the list is queried or serialised.
+
+def etag_matches(header: str, etag: str) -> bool:
+    if header.strip() == "*":
+        return True
+    # Weak comparison, as for GET
+    candidates = {candidate.strip().removeprefix("W/") for candidate in header.split(",")}
+    return etag.removeprefix("W/") in candidates
+
+def _not_modified_since(header: str, changed_at: float) -> bool:
+    try:
+        since = parsedate_to_datetime(header)
+    except (TypeError, ValueError):
+        return False
+    # Last-Modified has whole seconds
+    return since.tzinfo is not None and int(changed_at) <= since.timestamp()
+
+def conditional_get(request: Request, response: Response, versions: Iterable[str], *scope) -> Optional[Response]:
+    """
+    Set ETag and Last-Modified for a list built from data covered by `versions`.
+    `scope` holds whatever else changes the result for this caller, e.g. their access scope fingerprint.
+    Returns a 304 response to send instead when the client's copy is still current.
+    """
+    # Without Redis each worker only sees its own version bumps, so it cannot vouch for other workers' writes
+    if get_redis() is None:
+        return None
+    versions = list(versions)
+    # After a hierarchy bump the old snapshot keeps being served until the background rebuild is done,
+    # so the body is older than the version; validators now would pin it until the next bump
+    if HIERARCHY_VERSION in versions and get_hierarchy().version != get_version(HIERARCHY_VERSION):
+        return None
+    signal = (request.url.path, request.url.query, [(name, get_version(name)) for name in versions], scope)
+    etag = f'W/"{hashlib.sha1(repr(signal).encode()).hexdigest()[:24]}"'
+    changed_at = max(get_version_changed_at(name) for name in versions)
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if changed_at:
+        headers["Last-Modified"] = formatdate(changed_at, usegmt=True)
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        # If-None-Match wins over If-Modified-Since when both are sent
+        not_modified = etag_matches(if_none_match, etag)
+    else:
+        if_modified_since = request.headers.get("if-modified-since")
+        not_modified = bool(if_modified_since and changed_at and _not_modified_since(if_modified_since, changed_at))
+    if not_modified:
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return None
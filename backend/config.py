@@ -14,6 +14,39 @@ class Config:
     DATABASE_USER: str = os.getenv("DATABASE_USER")
     DATABASE_PASSWORD: str = os.getenv("DATABASE_PASSWORD")
 
+    # Process type ("api" or "celery") selects connection pool defaults
+    PROCESS_TYPE: str = os.getenv("PROCESS_TYPE", "api").lower()
+
+    # Threads shared by all sync endpoints and dependencies of one worker
+    THREADPOOL_SIZE: int = int(os.getenv("THREADPOOL_SIZE", "40"))
+
+    # Connection Pool Configuration
+    # API workers serve up to THREADPOOL_SIZE concurrent requests, so pool + overflow must cover
+    # every thread (checked at startup); a Celery worker runs one task at a time
+    DB_POOL_SIZE: int = int(os.getenv("DB_POOL_SIZE", "10" if PROCESS_TYPE == "api" else "2"))
+    DB_MAX_OVERFLOW: int = int(os.getenv("DB_MAX_OVERFLOW", str(max(THREADPOOL_SIZE - DB_POOL_SIZE, 0)) if PROCESS_TYPE == "api" else "2"))
+    DB_POOL_TIMEOUT: float = float(os.getenv("DB_POOL_TIMEOUT", "10" if PROCESS_TYPE == "api" else "60"))
+    DB_POOL_PRE_PING: bool = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+    # Recycle well below MySQL's wait_timeout (8 hours by default) to avoid "server has gone away"
+    DB_POOL_RECYCLE: int = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+    # Session time zone of every connection, so NOW() agrees with the UTC timestamps written from Python
+    DB_TIME_ZONE: str = os.getenv("DB_TIME_ZONE", "+00:00")
+    # MySQL's innodb_ft_min_token_size: shorter search words are not in the FULLTEXT index (search.py)
+    FULLTEXT_MIN_TOKEN_SIZE: int = int(os.getenv("FULLTEXT_MIN_TOKEN_SIZE", "3"))
+
+    # Read replicas (comma-separated URLs); GET requests read from them unless lagging or the caller just wrote
+    DATABASE_REPLICA_URLS: str = os.getenv("DATABASE_REPLICA_URLS", "")
+    REPLICA_MAX_LAG_SECONDS: float = float(os.getenv("REPLICA_MAX_LAG_SECONDS", "5"))
+    REPLICA_LAG_CHECK_SECONDS: float = float(os.getenv("REPLICA_LAG_CHECK_SECONDS", "5"))
+    READ_YOUR_WRITES_SECONDS: float = float(os.getenv("READ_YOUR_WRITES_SECONDS", "10"))
+
+    # Async engine for read-heavy endpoints (aiomysql), with its own pool
+    ASYNC_DB_ENABLED: bool = os.getenv("ASYNC_DB_ENABLED", "false").lower() == "true"
+    ASYNC_DATABASE_URL: str = os.getenv("ASYNC_DATABASE_URL", "")
+    ASYNC_DB_POOL_SIZE: int = int(os.getenv("ASYNC_DB_POOL_SIZE", "20"))
+    ASYNC_DB_MAX_OVERFLOW: int = int(os.getenv("ASYNC_DB_MAX_OVERFLOW", "20"))
+    ASYNC_DB_POOL_TIMEOUT: float = float(os.getenv("ASYNC_DB_POOL_TIMEOUT", "10"))
+
     # Server Configuration
     HOST: str = os.getenv("HOST", "0.0.0.0")
     PORT: int = int(os.getenv("PORT", "8002"))
@@ -36,6 +69,11 @@ class Config:
     OAUTH_API_KEY: str = os.getenv("OAUTH2_API_KEY", "")
     OAUTH_REDIRECT_URI: str = os.getenv("OAUTH2_REDIRECT_URI", "")
     OAUTH_SCOPES: str = os.getenv("OAUTH2_SCOPES", "openid email profile")
+    OAUTH_PROVIDER_NAME: str = os.getenv("OAUTH2_PROVIDER_NAME", "")
+    OAUTH_DISCOVERY_URL: str = os.getenv("OAUTH2_DISCOVERY_URL", "")
+    OAUTH_HTTP_TIMEOUT: float = float(os.getenv("OAUTH2_HTTP_TIMEOUT", "10"))
+    OAUTH_HTTP_MAX_CONNECTIONS: int = int(os.getenv("OAUTH2_HTTP_MAX_CONNECTIONS", "20"))
+    OAUTH_PROVIDER_CACHE_SECONDS: int = int(os.getenv("OAUTH2_PROVIDER_CACHE_SECONDS", "300"))
 
     # Security
     SECRET_KEY: str = os.getenv("SECRET_KEY", "")
@@ -73,6 +111,56 @@ class Config:
     REDIS_DB = int(os.getenv("REDIS_DB", "0"))
     REDIS_PASSWORD = os.getenv("REDIS_PASSWORD", None)
 
+    # Rate Limiting, as "<requests>/<seconds>" per client; empty disables a class
+    RATE_LIMIT_ENABLED: bool = os.getenv("RATE_LIMIT_ENABLED", "true").lower() == "true"
+    RATE_LIMIT_LOGIN: str = os.getenv("RATE_LIMIT_LOGIN", "10/60")
+    RATE_LIMIT_BARCODE: str = os.getenv("RATE_LIMIT_BARCODE", "600/60")
+    RATE_LIMIT_SEARCH: str = os.getenv("RATE_LIMIT_SEARCH", "120/60")
+    RATE_LIMIT_SYNC: str = os.getenv("RATE_LIMIT_SYNC", "5/300")
+    # Load balancers and reverse proxies (IPs or CIDRs, comma separated) whose X-Forwarded-For is
+    # trusted for the client IP. Behind a proxy this must be set, or every login shares the proxy's bucket
+    TRUSTED_PROXIES: str = os.getenv("TRUSTED_PROXIES", "")
+    RATE_LIMIT_AUDIT_FLUSH_SECONDS: float = float(os.getenv("RATE_LIMIT_AUDIT_FLUSH_SECONDS", "10"))
+
+    # Query Diagnostics
+    # A statement shape repeated this often within one request is logged as a possible N+1
+    QUERY_REPEAT_THRESHOLD: int = int(os.getenv("QUERY_REPEAT_THRESHOLD", "5"))
+    # Statements slower than this are kept in the slow-query log
+    SLOW_QUERY_THRESHOLD_MS: float = float(os.getenv("SLOW_QUERY_THRESHOLD_MS", "200"))
+    SLOW_QUERY_LOG_SIZE: int = int(os.getenv("SLOW_QUERY_LOG_SIZE", "200"))
+    SLOW_QUERY_PARAMS_MAX_CHARS: int = int(os.getenv("SLOW_QUERY_PARAMS_MAX_CHARS", "200"))
+    # Distinct statement shapes tracked for the totals; shapes beyond this are only counted as untracked
+    QUERY_SHAPES_MAX: int = int(os.getenv("QUERY_SHAPES_MAX", "2000"))
+
+    # Cache Configuration
+    CACHE_REDIS_TIMEOUT: float = float(os.getenv("CACHE_REDIS_TIMEOUT", "0.5"))
+    CACHE_VERSION_CHECK_SECONDS: float = float(os.getenv("CACHE_VERSION_CHECK_SECONDS", "1"))
+    SCOPE_CACHE_SIZE: int = int(os.getenv("SCOPE_CACHE_SIZE", "2048"))
+    SCOPE_CACHE_TTL_SECONDS: int = int(os.getenv("SCOPE_CACHE_TTL_SECONDS", "900"))
+    TOKEN_CACHE_SIZE: int = int(os.getenv("TOKEN_CACHE_SIZE", "4096"))
+    TOKEN_CACHE_TTL_SECONDS: int = int(os.getenv("TOKEN_CACHE_TTL_SECONDS", "30"))
+    # List totals, keyed by the versions of the tables they count so writes show up at once
+    COUNT_CACHE_SIZE: int = int(os.getenv("COUNT_CACHE_SIZE", "4096"))
+    COUNT_CACHE_TTL_SECONDS: int = int(os.getenv("COUNT_CACHE_TTL_SECONDS", "30"))
+    # Barcode -> asset lookups; the short local TTL bounds how long other workers serve an entry deleted from Redis
+    BARCODE_CACHE_ENABLED: bool = os.getenv("BARCODE_CACHE_ENABLED", "true").lower() == "true"
+    BARCODE_CACHE_SIZE: int = int(os.getenv("BARCODE_CACHE_SIZE", "20000"))
+    BARCODE_CACHE_LOCAL_TTL_SECONDS: int = int(os.getenv("BARCODE_CACHE_LOCAL_TTL_SECONDS", "10"))
+    BARCODE_CACHE_TTL_SECONDS: int = int(os.getenv("BARCODE_CACHE_TTL_SECONDS", "900"))
+    # Commits touching more assets than this drop the whole cache instead of deleting keys one by one
+    BARCODE_CACHE_BULK_THRESHOLD: int = int(os.getenv("BARCODE_CACHE_BULK_THRESHOLD", "200"))
+    # Most barcodes accepted by one POST /assets/barcodes:resolve
+    BARCODE_RESOLVE_MAX: int = int(os.getenv("BARCODE_RESOLVE_MAX", "500"))
+    # Asset change feed: rows newer than this many seconds wait for the next sync, so writes still
+    # committing are not skipped; tombstones (and tokens) older than the retention are dropped
+    SYNC_SETTLE_SECONDS: int = int(os.getenv("SYNC_SETTLE_SECONDS", "5"))
+    SYNC_TOMBSTONE_RETENTION_DAYS: int = int(os.getenv("SYNC_TOMBSTONE_RETENTION_DAYS", "30"))
+    SYNC_PAGE_MAX: int = int(os.getenv("SYNC_PAGE_MAX", "5000"))
+    # Offline snapshot packs; with several API servers this must be storage they all share
+    SNAPSHOT_DIR: str = os.getenv("SNAPSHOT_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "snapshots"))
+    # Commits to a branch within this window are folded into one rebuild of its pack
+    SNAPSHOT_REBUILD_DELAY_SECONDS: int = int(os.getenv("SNAPSHOT_REBUILD_DELAY_SECONDS", "120"))
+
     @classmethod
     def is_development(cls) -> bool:
         return cls.NODE_ENV.lower() == "development"
@@ -93,6 +181,13 @@ class Config:
         
         return f"mysql+pymysql://{cls.DATABASE_USER}:{cls.DATABASE_PASSWORD}@{cls.DATABASE_HOST}:{cls.DATABASE_PORT}/{cls.DATABASE_NAME}"
 
+    @classmethod
+    def get_async_database_url(cls) -> str:
+        """Async driver URL, derived from the sync URL unless ASYNC_DATABASE_URL is set"""
+        if cls.ASYNC_DATABASE_URL:
+            return cls.ASYNC_DATABASE_URL
+        return cls.get_database_url().replace("mysql+pymysql://", "mysql+aiomysql://", 1)
+
     @classmethod
     def validate_required_config(cls):
         """Validate that all required configuration is present"""
@@ -102,6 +197,10 @@ class Config:
         if not cls.DATABASE_URL and not all([cls.DATABASE_HOST, cls.DATABASE_NAME, cls.DATABASE_USER, cls.DATABASE_PASSWORD]):
             errors.append("Database configuration is incomplete")
         
+        # Every request thread must be able to get a connection without waiting out DB_POOL_TIMEOUT
+        if cls.PROCESS_TYPE == "api" and cls.DB_POOL_SIZE + cls.DB_MAX_OVERFLOW < cls.THREADPOOL_SIZE:
+            errors.append(f"DB_POOL_SIZE + DB_MAX_OVERFLOW ({cls.DB_POOL_SIZE + cls.DB_MAX_OVERFLOW}) must be at least THREADPOOL_SIZE ({cls.THREADPOOL_SIZE})")
+        
         # Check security configuration
         if not cls.SECRET_KEY:
             errors.append("SECRET_KEY is required")
@@ -1,20 +1,243 @@
-from sqlalchemy import create_engine
+import itertools
+import logging
+import threading
+import time
+from typing import Any, Dict, List, Optional
+import redis
+from fastapi import Request
+from sqlalchemy import create_engine, event
+from sqlalchemy.exc import DBAPIError, TimeoutError as PoolTimeoutError
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import QueuePool
+from sqlalchemy.sql.dml import UpdateBase
 from config import config
+from cache import LRUCache, get_redis
+
+logger = logging.getLogger("uvicorn")
 
 # Use config for database URL
 SQLALCHEMY_DATABASE_URL = config.get_database_url()
 
-engine = create_engine(SQLALCHEMY_DATABASE_URL)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+class PoolStats:
+    """Checkout counts and time spent waiting for a free connection"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+
+    def record(self, wait_seconds: float, timed_out: bool = False):
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+            self.wait_seconds_total += wait_seconds
+            self.wait_seconds_max = max(self.wait_seconds_max, wait_seconds)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            attempts = self.checkouts + self.timeouts
+            return {
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "wait_avg_ms": round(self.wait_seconds_total / attempts * 1000, 3) if attempts else None,
+                "wait_max_ms": round(self.wait_seconds_max * 1000, 3),
+            }
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool that records how long each checkout waited"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.stats = PoolStats()
+
+    def recreate(self):
+        pool = super().recreate()
+        pool.stats = self.stats
+        return pool
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except PoolTimeoutError:
+            self.stats.record(time.perf_counter() - started, timed_out=True)
+            raise
+        self.stats.record(time.perf_counter() - started)
+        return connection
+
+def _create_engine(url: str):
+    return create_engine(
+        url,
+        poolclass=InstrumentedQueuePool,
+        pool_size=config.DB_POOL_SIZE,
+        max_overflow=config.DB_MAX_OVERFLOW,
+        pool_timeout=config.DB_POOL_TIMEOUT,
+        pool_pre_ping=config.DB_POOL_PRE_PING,
+        pool_recycle=config.DB_POOL_RECYCLE,
+        connect_args={"init_command": f"SET time_zone = '{config.DB_TIME_ZONE}'"},
+    )
+
+engine = _create_engine(SQLALCHEMY_DATABASE_URL)
+
+class Replica:
+    """A read replica engine and its last measured replication lag"""
+
+    def __init__(self, url: str):
+        self.engine = _create_engine(url)
+        self.lag_seconds: Optional[float] = None
+        self.healthy = False
+        self.checked_at = 0.0
+
+    def check_lag(self):
+        try:
+            with self.engine.connect() as conn:
+                try:
+                    row = conn.exec_driver_sql("SHOW REPLICA STATUS").mappings().first()
+                except DBAPIError:
+                    # MySQL before 8.0.22
+                    row = conn.exec_driver_sql("SHOW SLAVE STATUS").mappings().first()
+            lag = None
+            if row is not None:
+                lag = row.get("Seconds_Behind_Source", row.get("Seconds_Behind_Master"))
+            # NULL lag means replication is stopped
+            self.lag_seconds = float(lag) if lag is not None else None
+            self.healthy = self.lag_seconds is not None and self.lag_seconds <= config.REPLICA_MAX_LAG_SECONDS
+        except Exception as e:
+            if self.healthy or not self.checked_at:
+                logger.warning(f"Read replica {self.engine.url.host} unavailable, reading from primary: {str(e)}")
+            self.lag_seconds = None
+            self.healthy = False
+        self.checked_at = time.time()
+
+replicas: List[Replica] = [Replica(url.strip()) for url in config.DATABASE_REPLICA_URLS.split(",") if url.strip()]
+all_engines = [engine] + [replica.engine for replica in replicas]
+_next_replica = itertools.count()
+_lag_monitor: Optional[threading.Thread] = None
+_lag_monitor_lock = threading.Lock()
+
+def _monitor_lag():
+    while True:
+        for replica in replicas:
+            replica.check_lag()
+        time.sleep(config.REPLICA_LAG_CHECK_SECONDS)
+
+def pick_replica():
+    """Round-robin over replicas within the lag threshold; None sends the read to the primary"""
+    global _lag_monitor
+    if _lag_monitor is None:
+        with _lag_monitor_lock:
+            if _lag_monitor is None:
+                _lag_monitor = threading.Thread(target=_monitor_lag, name="replica-lag-monitor", daemon=True)
+                _lag_monitor.start()
+    healthy = [replica for replica in replicas if replica.healthy]
+    if not healthy:
+        return None
+    return healthy[next(_next_replica) % len(healthy)].engine
+
+class RoutingSession(Session):
+    """
+    Sends reads of read-only sessions to a replica and everything else to the primary.
+    The replica is picked once per session, so a count and its page see the same data.
+    Once a session has flushed, it stays on the primary so it reads its own writes.
+    """
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        if not replicas or self._flushing or not self.info.get("read_only") or self.info.get("wrote"):
+            return engine
+        if isinstance(clause, UpdateBase):
+            return engine
+        # Request sessions read from the primary until the caller is known (see identify_caller)
+        if self.info.get("awaiting_caller"):
+            return engine
+        if "replica" not in self.info:
+            caller = self.info.get("caller")
+            recent_writer = caller is not None and _wrote_recently(caller)
+            self.info["replica"] = engine if recent_writer else (pick_replica() or engine)
+        return self.info["replica"]
+
+@event.listens_for(RoutingSession, "after_flush")
+def _mark_written(session, flush_context):
+    session.info["wrote"] = True
+
+SessionLocal = sessionmaker(class_=RoutingSession, autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
 
+def _pool_status(pool) -> Dict[str, Any]:
+    status = {
+        "pool_size": pool.size(),
+        "max_overflow": config.DB_MAX_OVERFLOW,
+        "checked_out": pool.checkedout(),
+        "checked_in": pool.checkedin(),
+        "overflow": max(0, pool.overflow()),
+    }
+    status.update(pool.stats.snapshot())
+    return status
+
+def get_pool_status() -> Dict[str, Any]:
+    """Live connection counts of the engine pools plus checkout wait statistics"""
+    status = {"process_type": config.PROCESS_TYPE}
+    status.update(_pool_status(engine.pool))
+    if replicas:
+        status["replicas"] = [
+            {
+                "host": replica.engine.url.host,
+                "healthy": replica.healthy,
+                "lag_seconds": replica.lag_seconds,
+                "checked_at": replica.checked_at,
+                **_pool_status(replica.engine.pool),
+            }
+            for replica in replicas
+        ]
+    return status
+
+# Read-your-writes: callers who just wrote keep reading from the primary for a short window
+_recent_writers = LRUCache(maxsize=4096, ttl=config.READ_YOUR_WRITES_SECONDS)
+
+def identify_caller(db: Session, user_id: str):
+    """
+    Tell a request session whose it is, keying read-your-writes on the user rather than the token,
+    so a fresh login or a second device sees the user's own writes too
+    """
+    db.info["caller"] = user_id
+    db.info.pop("awaiting_caller", None)
+
+def _wrote_recently(caller: str) -> bool:
+    if _recent_writers.get(caller):
+        return True
+    client = get_redis()
+    if client is None:
+        return False
+    try:
+        return bool(client.exists(f"ryw:{caller}"))
+    except redis.RedisError:
+        # Cannot tell, so stay on the safe side
+        return True
+
+def _remember_write(caller: str):
+    _recent_writers.set(caller, True)
+    client = get_redis()
+    if client is not None:
+        try:
+            client.setex(f"ryw:{caller}", max(1, int(config.READ_YOUR_WRITES_SECONDS)), 1)
+        except redis.RedisError as e:
+            logger.warning(f"Failed to record write for read-your-writes: {str(e)}")
+
 # Dependency
-def get_db():
+def get_db(request: Request = None):
     db = SessionLocal()
+    if request is not None and replicas and request.method in ("GET", "HEAD") and request.headers.get("authorization"):
+        db.info["read_only"] = True
+        db.info["awaiting_caller"] = True
     try:
         yield db
     finally:
-        db.close() 
\ No newline at end of file
+        caller = db.info.get("caller")
+        if replicas and caller is not None and db.info.get("wrote"):
+            _remember_write(caller)
+        db.close()
@@ -0,0 +1,35 @@
+from typing import Any, AsyncIterator, Dict, Optional
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
+from config import config
+
+# Optional async engine for the hottest read endpoints; sync SQLAlchemy stays the default everywhere else
+async_engine: Optional[AsyncEngine] = None
+AsyncSessionLocal: Optional[async_sessionmaker] = None
+
+if config.ASYNC_DB_ENABLED:
+    async_engine = create_async_engine(
+        config.get_async_database_url(),
+        pool_size=config.ASYNC_DB_POOL_SIZE,
+        max_overflow=config.ASYNC_DB_MAX_OVERFLOW,
+        pool_timeout=config.ASYNC_DB_POOL_TIMEOUT,
+        pool_pre_ping=config.DB_POOL_PRE_PING,
+        pool_recycle=config.DB_POOL_RECYCLE,
+        connect_args={"init_command": f"SET time_zone = '{config.DB_TIME_ZONE}'"},
+    )
+    AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+async def get_async_db() -> AsyncIterator[AsyncSession]:
+    async with AsyncSessionLocal() as db:
+        yield db
+
+def get_async_pool_status() -> Optional[Dict[str, Any]]:
+    if async_engine is None:
+        return None
+    pool = async_engine.pool
+    return {
+        "pool_size": pool.size(),
+        "max_overflow": config.ASYNC_DB_MAX_OVERFLOW,
+        "checked_out": pool.checkedout(),
+        "checked_in": pool.checkedin(),
+        "overflow": max(0, pool.overflow()),
+    }
@@ -0,0 +1,80 @@
+import csv
+import io
+import json
+import zlib
+from datetime import date, datetime
+from typing import Any, Iterator, List, Optional
+from db import SessionLocal, identify_caller
+
+# Streaming exports: rows come from a server-side cursor and leave as NDJSON or CSV chunks,
+# optionally gzip-compressed on the fly, so memory stays flat whatever the row count.
+
+CHUNK_SIZE = 64 * 1024
+FETCH_SIZE = 1000
+
+MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv; charset=utf-8"}
+
+def _json_default(value: Any):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return str(value)
+
+def _csv_value(value: Any):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+def _encode(rows: Iterator, columns: List[str], fmt: str) -> Iterator[str]:
+    if fmt == "csv":
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(columns)
+        for row in rows:
+            writer.writerow([_csv_value(value) for value in row])
+            if buffer.tell() >= CHUNK_SIZE:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+        yield buffer.getvalue()
+    else:
+        lines = []
+        size = 0
+        for row in rows:
+            line = json.dumps(dict(zip(columns, row)), default=_json_default, separators=(",", ":")) + "\n"
+            lines.append(line)
+            size += len(line)
+            if size >= CHUNK_SIZE:
+                yield "".join(lines)
+                lines, size = [], 0
+        yield "".join(lines)
+
+def stream_export(statement, columns: List[str], fmt: str, compress: bool, caller: Optional[str] = None, read_only: bool = True) -> Iterator[bytes]:
+    """
+    Run a select() of `columns` on its own session and stream the encoded result.
+    The request's session is closed once the handler returns, before the body is sent, hence the separate one.
+    `caller` is the requesting user, so their recent writes are read from the primary.
+    """
+    db = SessionLocal()
+    db.info["read_only"] = read_only
+    if caller is not None:
+        identify_caller(db, caller)
+    compressor: Optional[Any] = zlib.compressobj(6, zlib.DEFLATED, 31) if compress else None
+    try:
+        result = db.execute(statement.execution_options(stream_results=True, yield_per=FETCH_SIZE))
+        for text in _encode(result, columns, fmt):
+            data = text.encode()
+            if compressor is not None:
+                data = compressor.compress(data)
+            if data:
+                yield data
+        if compressor is not None:
+            yield compressor.flush()
+    finally:
+        db.close()
+
+def accepts_gzip(accept_encoding: Optional[str]) -> bool:
+    for coding in (accept_encoding or "").split(","):
+        name, _, params = coding.strip().partition(";")
+        if name.strip().lower() == "gzip" and params.replace(" ", "") not in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+            return True
+    return False
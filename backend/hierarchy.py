@@ -0,0 +1,218 @@
+import logging
+import threading
+import time
+from types import MappingProxyType
+from typing import Dict, List, Mapping, NamedTuple, Optional, Tuple
+from sqlalchemy.orm import Session
+from db import SessionLocal
+from models import Country, Region, Branch, Location, UserRole, UserCountryAssignment, UserRegionAssignment, UserBranchAssignment
+from cache import get_bumped_version, get_version, HIERARCHY_VERSION
+
+logger = logging.getLogger("uvicorn")
+
+class CountryNode(NamedTuple):
+    id: str
+    name: str
+    code: str
+
+class RegionNode(NamedTuple):
+    id: str
+    name: str
+    country_id: str
+
+class BranchNode(NamedTuple):
+    id: str
+    name: str
+    region_id: str
+    country_id: Optional[str]
+
+class LocationNode(NamedTuple):
+    id: str
+    name: str
+    branch_id: Optional[str]
+
+class Assignment(NamedTuple):
+    id: str
+    user_id: str
+
+def _freeze(index: Dict) -> Mapping:
+    return MappingProxyType({key: tuple(value) if isinstance(value, list) else frozenset(value) for key, value in index.items()})
+
+class HierarchySnapshot:
+    """
+    Immutable, versioned view of the Country -> Region -> Branch -> Location tree.
+    Parent, child and descendant links are precomputed so every lookup is a dict access.
+    """
+
+    def __init__(self, version: int, countries: List[CountryNode], regions: List[RegionNode], branches: List[BranchNode],
+                 locations: List[LocationNode], country_assignments: Dict[str, List[Assignment]],
+                 region_assignments: Dict[str, List[Assignment]], branch_assignments: Dict[str, List[Assignment]],
+                 controllers: set, managers: set):
+        self.version = version
+        self.loaded_at = time.time()
+        self.countries: Mapping[str, CountryNode] = MappingProxyType({c.id: c for c in countries})
+        self.regions: Mapping[str, RegionNode] = MappingProxyType({r.id: r for r in regions})
+        self.branches: Mapping[str, BranchNode] = MappingProxyType({b.id: b for b in branches})
+        self.locations: Mapping[str, LocationNode] = MappingProxyType({l.id: l for l in locations})
+
+        # Children
+        country_regions: Dict[str, list] = {c.id: [] for c in countries}
+        region_branches: Dict[str, list] = {r.id: [] for r in regions}
+        branch_locations: Dict[str, list] = {b.id: [] for b in branches}
+        for region in regions:
+            country_regions.setdefault(region.country_id, []).append(region.id)
+        for branch in branches:
+            region_branches.setdefault(branch.region_id, []).append(branch.id)
+        for location in locations:
+            if location.branch_id:
+                branch_locations.setdefault(location.branch_id, []).append(location.id)
+        self.country_regions: Mapping[str, Tuple[str, ...]] = _freeze(country_regions)
+        self.region_branches: Mapping[str, Tuple[str, ...]] = _freeze(region_branches)
+        self.branch_locations: Mapping[str, Tuple[str, ...]] = _freeze(branch_locations)
+
+        # Descendants
+        region_locations = {
+            region_id: [l for b in branch_ids for l in branch_locations.get(b, ())]
+            for region_id, branch_ids in region_branches.items()
+        }
+        country_branches = {
+            country_id: [b for r in region_ids for b in region_branches.get(r, ())]
+            for country_id, region_ids in country_regions.items()
+        }
+        country_locations = {
+            country_id: [l for r in region_ids for l in region_locations.get(r, ())]
+            for country_id, region_ids in country_regions.items()
+        }
+        self.region_locations: Mapping[str, Tuple[str, ...]] = _freeze(region_locations)
+        self.country_branches: Mapping[str, Tuple[str, ...]] = _freeze(country_branches)
+        self.country_locations: Mapping[str, Tuple[str, ...]] = _freeze(country_locations)
+
+        # Ancestors: location_id -> (branch_id, region_id, country_id)
+        ancestors = {}
+        for location in locations:
+            branch = self.branches.get(location.branch_id) if location.branch_id else None
+            region = self.regions.get(branch.region_id) if branch else None
+            ancestors[location.id] = (
+                branch.id if branch else None,
+                region.id if region else None,
+                region.country_id if region else None,
+            )
+        self.location_ancestors: Mapping[str, Tuple[Optional[str], Optional[str], Optional[str]]] = MappingProxyType(ancestors)
+
+        # Assignments, in both directions
+        self.country_assignments: Mapping[str, Tuple[Assignment, ...]] = _freeze(country_assignments)
+        self.region_assignments: Mapping[str, Tuple[Assignment, ...]] = _freeze(region_assignments)
+        self.branch_assignments: Mapping[str, Tuple[Assignment, ...]] = _freeze(branch_assignments)
+        self.user_countries = self._by_user(country_assignments)
+        self.user_regions = self._by_user(region_assignments)
+        self.user_branches = self._by_user(branch_assignments)
+
+        # Approvers: first assigned controller of each region, first assigned manager of each branch
+        self.region_controllers: Mapping[str, str] = MappingProxyType({
+            region_id: next(a.user_id for a in assigned if a.user_id in controllers)
+            for region_id, assigned in region_assignments.items()
+            if any(a.user_id in controllers for a in assigned)
+        })
+        self.branch_managers: Mapping[str, str] = MappingProxyType({
+            branch_id: next(a.user_id for a in assigned if a.user_id in managers)
+            for branch_id, assigned in branch_assignments.items()
+            if any(a.user_id in managers for a in assigned)
+        })
+
+    @staticmethod
+    def _by_user(assignments: Dict[str, List[Assignment]]) -> Mapping[str, Tuple[str, ...]]:
+        by_user: Dict[str, list] = {}
+        for node_id, assigned in assignments.items():
+            for assignment in assigned:
+                by_user.setdefault(assignment.user_id, []).append(node_id)
+        return _freeze(by_user)
+
+    def controller_for_branch(self, branch_id: Optional[str]) -> Optional[str]:
+        """User ID of the controller of the region the branch belongs to"""
+        branch = self.branches.get(branch_id) if branch_id else None
+        return self.region_controllers.get(branch.region_id) if branch else None
+
+    def manager_for_branch(self, branch_id: Optional[str]) -> Optional[str]:
+        """User ID of the manager of the branch"""
+        return self.branch_managers.get(branch_id) if branch_id else None
+
+def load_hierarchy(db: Session, version: int) -> HierarchySnapshot:
+    """Read the whole hierarchy and its assignments in a fixed number of queries"""
+    countries = [CountryNode(*row) for row in db.query(Country.id, Country.name, Country.code)]
+    regions = [RegionNode(*row) for row in db.query(Region.id, Region.name, Region.country_id)]
+    branches = [BranchNode(*row) for row in db.query(Branch.id, Branch.name, Branch.region_id, Branch.country_id)]
+    locations = [LocationNode(*row) for row in db.query(Location.id, Location.name, Location.branch_id)]
+
+    def group(model, column) -> Dict[str, List[Assignment]]:
+        grouped: Dict[str, List[Assignment]] = {}
+        for assignment_id, user_id, node_id in db.query(model.id, model.user_id, column).order_by(model.created_at):
+            grouped.setdefault(node_id, []).append(Assignment(assignment_id, user_id))
+        return grouped
+
+    country_assignments = group(UserCountryAssignment, UserCountryAssignment.country_id)
+    region_assignments = group(UserRegionAssignment, UserRegionAssignment.region_id)
+    branch_assignments = group(UserBranchAssignment, UserBranchAssignment.branch_id)
+
+    controllers, managers = set(), set()
+    for user_id, role in db.query(UserRole.user_id, UserRole.role).filter(UserRole.role.in_(['controller', 'manager'])):
+        (controllers if role == 'controller' else managers).add(user_id)
+
+    return HierarchySnapshot(
+        version, countries, regions, branches, locations,
+        country_assignments, region_assignments, branch_assignments,
+        controllers, managers,
+    )
+
+_snapshot: Optional[HierarchySnapshot] = None
+_load_lock = threading.Lock()
+_rebuild_lock = threading.Lock()
+_rebuilding = threading.Event()
+
+def _load(version: int) -> HierarchySnapshot:
+    db = SessionLocal()
+    try:
+        started = time.perf_counter()
+        snapshot = load_hierarchy(db, version)
+        logger.info(
+            f"Loaded hierarchy snapshot v{version} ({len(snapshot.locations)} locations) "
+            f"in {(time.perf_counter() - started) * 1000:.1f} ms"
+        )
+        return snapshot
+    finally:
+        db.close()
+
+def _rebuild(version: int):
+    global _snapshot
+    try:
+        snapshot = _load(version)
+        with _load_lock:
+            # A synchronous load for this process's own bump may have landed a newer one meanwhile
+            if _snapshot is None or _snapshot.version <= snapshot.version:
+                _snapshot = snapshot
+    except Exception as e:
+        logger.error(f"Failed to rebuild hierarchy snapshot: {str(e)}")
+    finally:
+        _rebuilding.clear()
+
+def get_hierarchy() -> HierarchySnapshot:
+    """
+    Current hierarchy snapshot of this process.
+    The first call loads it synchronously; after a version bump the old snapshot keeps
+    being served while a background thread builds the new one. A bump made by this process
+    is waited for, so a request sees its own hierarchy writes.
+    """
+    global _snapshot
+    # Read the version before the data so a concurrent bump triggers another rebuild
+    version = get_version(HIERARCHY_VERSION)
+    snapshot = _snapshot
+    if snapshot is None or snapshot.version < get_bumped_version(HIERARCHY_VERSION):
+        with _load_lock:
+            if _snapshot is None or _snapshot.version < get_bumped_version(HIERARCHY_VERSION):
+                _snapshot = _load(version)
+            return _snapshot
+    if snapshot.version != version:
+        with _rebuild_lock:
+            if not _rebuilding.is_set():
+                _rebuilding.set()
+                threading.Thread(target=_rebuild, args=(version,), name="hierarchy-rebuild", daemon=True).start()
+    return snapshot
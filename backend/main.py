@@ -7,6 +7,7 @@ from fastapi.middleware.cors import CORSMiddleware
 from sqlalchemy import create_engine, text
 from sqlalchemy.orm import sessionmaker
 import os
+import anyio.to_thread
 from dotenv import load_dotenv
 from routes_locations import router as locations_router
 from routes_countries import router as countries_router
@@ -28,12 +29,36 @@ from routes_asset_transfer import router as asset_transfer_router
 from config import config
 from routes_oauth_providers import router as oauth_providers_router
 from routes_erp_integration import router as erp_integration_router
+from routes_snapshots import router as snapshots_router
+from rate_limit import RateLimitMiddleware
+from oauth_client import close_http_client
+from query_stats import QueryStatsMiddleware
+from db_async import async_engine
 import logging
 
 load_dotenv()
 
 app = FastAPI(docs_url=None, redoc_url=None)
 
+@app.on_event("startup")
+def configure_threadpool():
+    # Blocking handlers (bcrypt, SQLAlchemy, oracledb) run in this pool instead of on the event loop
+    anyio.to_thread.current_default_thread_limiter().total_tokens = config.THREADPOOL_SIZE
+
+@app.on_event("shutdown")
+async def close_oauth_client():
+    await close_http_client()
+
+@app.on_event("shutdown")
+async def dispose_async_engine():
+    if async_engine is not None:
+        await async_engine.dispose()
+
+app.add_middleware(QueryStatsMiddleware)
+
+# Rate limiting sits inside CORS so 429 responses still carry CORS headers
+app.add_middleware(RateLimitMiddleware)
+
 # Configure CORS using config
 app.add_middleware(
     CORSMiddleware,
@@ -41,6 +66,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag", "X-Sync-Token", "Content-Range", "Accept-Ranges"],
 )
 
 # Basic auth for Swagger UI
@@ -78,6 +104,10 @@ async def redoc_html(credentials: HTTPBasicCredentials = Depends(get_swagger_cre
     )
 
 # Include routers
+if config.ASYNC_DB_ENABLED:
+    # Registered first so the async read endpoints take precedence over their sync counterparts
+    from routes_async_reads import router as async_reads_router
+    app.include_router(async_reads_router)
 app.include_router(locations_router)
 app.include_router(countries_router)
 app.include_router(regions_router)
@@ -95,6 +125,7 @@ app.include_router(admin_router)
 app.include_router(asset_transfer_router)
 app.include_router(oauth_providers_router)
 app.include_router(erp_integration_router)
+app.include_router(snapshots_router)
 
 @app.get("/")
 def read_root():
@@ -110,9 +141,9 @@ def health_check():
         return {"status": "error", "detail": str(e)}
 
 @app.get("/protected")
-async def protected_route(current_user = Depends(get_current_user)):
+def protected_route(current_user = Depends(get_current_user)):
     return {"message": f"Hello {current_user.email}, this is a protected route!"}
 
 @app.get("/admin-only")
-async def admin_only_route(current_user = Depends(require_role("admin"))):
+def admin_only_route(current_user = Depends(require_role("admin"))):
     return {"message": "This is admin only content!"} 
\ No newline at end of file
@@ -1,6 +1,7 @@
-from sqlalchemy import Column, String, DateTime, ForeignKey, UniqueConstraint, Boolean, Integer, JSON, text
-from sqlalchemy.orm import relationship, declarative_base
+from sqlalchemy import Column, String, DateTime, ForeignKey, UniqueConstraint, Index, Boolean, Integer, BigInteger, JSON, Text, text, event
+from sqlalchemy.orm import relationship, declarative_base, attributes
 from sqlalchemy.sql import func
+import re
 import uuid
 
 Base = declarative_base()
@@ -33,6 +34,8 @@ class Region(Base):
     created_at = Column(DateTime, server_default=func.now(), nullable=False)
     updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now(), nullable=False)
     
+    __table_args__ = (Index('ix_regions_country_name', 'country_id', 'name'),)
+    
     # Relationships
     country = relationship("Country", back_populates="regions")
     branches = relationship("Branch", back_populates="region", cascade="all, delete-orphan")
@@ -47,6 +50,8 @@ class Branch(Base):
     created_at = Column(DateTime, server_default=func.now(), nullable=False)
     updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now(), nullable=False)
     
+    __table_args__ = (Index('ix_branches_region_name', 'region_id', 'name'),)
+    
     # Relationships
     region = relationship("Region", back_populates="branches")
 
@@ -83,6 +88,7 @@ class Location(Base):
     branch_id = Column(String(36), ForeignKey('branches.id'), nullable=True)
     created_at = Column(DateTime, server_default=func.now(), nullable=False)
     updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now(), nullable=False)
+    __table_args__ = (Index('ix_locations_branch_name', 'branch_id', 'name'),)
 
 class Asset(Base):
     __tablename__ = 'assets'
@@ -99,6 +105,57 @@ class Asset(Base):
     created_at = Column(DateTime, server_default=func.now(), nullable=False)
     updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now(), nullable=False)
     synced_at = Column(DateTime, server_default=func.now())
+    # Normalised name, model, barcode and ERP id behind the FULLTEXT index, kept current by the listener below
+    search_text = Column(Text)
+    __table_args__ = (
+        Index('ix_assets_status_location', 'status', 'location'),
+        Index('ix_assets_category_location', 'category', 'location'),
+        Index('ix_assets_search_text', 'search_text', mysql_prefix='FULLTEXT'),
+        # Change feed order (sync.py)
+        Index('ix_assets_updated_at_id', 'updated_at', 'id'),
+    )
+
+_NON_ALNUM = re.compile(r'[^0-9a-z]+')
+
+def _compact(value):
+    return _NON_ALNUM.sub('', value.lower()) if value else None
+
+def asset_search_text(asset) -> str:
+    """
+    Lowercased name, model, barcode and ERP id, plus barcode and model without separators
+    so 'ABC-123' is found as 'abc123' too. The d8e2b4c61f07 migration backfills with the same recipe.
+    """
+    parts = [asset.name, asset.model, asset.barcode, _compact(asset.barcode), _compact(asset.model), asset.erp_asset_id]
+    return ' '.join(str(part) for part in parts if part not in (None, '')).lower()
+
+@event.listens_for(Asset, 'before_insert')
+@event.listens_for(Asset, 'before_update')
+def _refresh_search_text(mapper, connection, target):
+    target.search_text = asset_search_text(target)
+
+class AssetTombstone(Base):
+    """An asset that was deleted from, or moved out of, a location; read by the change feed in sync.py"""
+    __tablename__ = 'asset_tombstones'
+    id = Column(BigInteger, primary_key=True, autoincrement=True)
+    asset_id = Column(String(36), nullable=False)
+    location = Column(String(36))  # the location the asset left; no FK, the location may be gone too
+    reason = Column(String(16), nullable=False)  # 'deleted' or 'moved'
+    removed_at = Column(DateTime, server_default=func.now(), nullable=False)
+    __table_args__ = (
+        Index('ix_asset_tombstones_removed_at_id', 'removed_at', 'id'),
+    )
+
+# Written in the flush that removes the asset, so the tombstone commits or rolls back with it.
+# Bulk Query.delete()/update() bypass these; nothing in the app uses them on assets.
+@event.listens_for(Asset, 'after_delete')
+def _record_deletion(mapper, connection, target):
+    connection.execute(AssetTombstone.__table__.insert(), [{'asset_id': target.id, 'location': target.location, 'reason': 'deleted'}])
+
+@event.listens_for(Asset, 'after_update')
+def _record_move(mapper, connection, target):
+    moved_from = [location for location in attributes.get_history(target, 'location').deleted if location]
+    if moved_from:
+        connection.execute(AssetTombstone.__table__.insert(), [{'asset_id': target.id, 'location': moved_from[0], 'reason': 'moved'}])
 
 class Category(Base):
     __tablename__ = 'categories'
@@ -130,6 +187,7 @@ class TempAsset(Base):
     cycle_count_task_id = Column(String(36), ForeignKey('cycle_count_tasks.id'))
     created_at = Column(DateTime, server_default=func.now(), nullable=False)
     updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now(), nullable=False)
+    __table_args__ = (Index('ix_temp_assets_created_by', 'created_by', 'created_at'),)
 
 class CycleCountTask(Base):
     __tablename__ = 'cycle_count_tasks'
@@ -145,6 +203,7 @@ class CycleCountTask(Base):
     completed_at = Column(DateTime)
     created_at = Column(DateTime, server_default=func.now(), nullable=False)
     updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now(), nullable=False)
+    __table_args__ = (Index('ix_cycle_count_tasks_status_assigned', 'status', 'assigned_to'),)
 
 class CycleCountItem(Base):
     __tablename__ = 'cycle_count_items'
@@ -158,7 +217,10 @@ class CycleCountItem(Base):
     counted_by = Column(String(36))  # FK to users
     notes = Column(String(255))
     created_at = Column(DateTime, server_default=func.now(), nullable=False)
-    __table_args__ = (UniqueConstraint('task_id', 'asset_id', name='uq_task_asset'),)
+    __table_args__ = (
+        UniqueConstraint('task_id', 'asset_id', name='uq_task_asset'),
+        Index('ix_cycle_count_items_task_status', 'task_id', 'status'),
+    )
     asset = relationship('Asset', backref='cycle_count_items')
 
 # Placeholder for users (since Supabase handled auth.users)
@@ -188,6 +250,10 @@ class SyncLog(Base):
     scheduled_at = Column(DateTime)
     schedule_type = Column(String(32))
     next_run_at = Column(DateTime)
+    __table_args__ = (
+        Index('ix_sync_logs_type_started', 'sync_type', 'started_at'),
+        Index('ix_sync_logs_started_at', 'started_at'),
+    )
 
 class ERPSyncConfig(Base):
     __tablename__ = 'erp_sync_configs'
@@ -278,7 +344,7 @@ class AssetTransferItem(Base):
     __tablename__ = 'asset_transfer_items'
     id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
     transfer_id = Column(String(36), ForeignKey('asset_transfers.id'), nullable=False)
-    asset_id = Column(String(36), ForeignKey('assets.id'), nullable=False)
+    asset_id = Column(String(36), ForeignKey('assets.id'), nullable=False, index=True)
     barcode = Column(String(64), nullable=False)
     transfer = relationship('AssetTransfer', back_populates='items')
 
@@ -290,4 +356,5 @@ class AssetTransferApproval(Base):
     role = Column(String(32), nullable=False)  # controller, receiving_controller, receiving_manager
     status = Column(String(32), default='pending')  # pending, approved, rejected
     approved_at = Column(DateTime)
-    transfer = relationship('AssetTransfer', back_populates='approvals') 
\ No newline at end of file
+    transfer = relationship('AssetTransfer', back_populates='approvals')
+    __table_args__ = (Index('ix_asset_transfer_approvals_approver_status', 'approver_id', 'status'),) 
\ No newline at end of file
@@ -0,0 +1,152 @@
+import logging
+import threading
+from typing import Any, Dict, NamedTuple, Optional
+import httpx
+from fastapi import HTTPException
+from starlette.concurrency import run_in_threadpool
+from config import config
+from db import SessionLocal
+from models import OAuthProvider
+from cache import LRUCache, get_version, bump_version
+
+logger = logging.getLogger("uvicorn")
+
+OAUTH_PROVIDERS_VERSION = "oauth_providers"
+
+class ProviderConfig(NamedTuple):
+    name: str
+    client_id: str
+    client_secret: str
+    auth_url: str
+    token_url: str
+    user_info_url: str
+    scopes: str
+    redirect_uri: str
+    api_key: str
+
+_provider_cache = LRUCache(maxsize=16, ttl=config.OAUTH_PROVIDER_CACHE_SECONDS)
+_http_client: Optional[httpx.AsyncClient] = None
+_http_client_lock = threading.Lock()
+
+def get_http_client() -> httpx.AsyncClient:
+    """Shared keep-alive client for all calls to the identity provider"""
+    global _http_client
+    if _http_client is None:
+        with _http_client_lock:
+            if _http_client is None:
+                _http_client = httpx.AsyncClient(
+                    timeout=httpx.Timeout(config.OAUTH_HTTP_TIMEOUT),
+                    limits=httpx.Limits(
+                        max_connections=config.OAUTH_HTTP_MAX_CONNECTIONS,
+                        max_keepalive_connections=config.OAUTH_HTTP_MAX_CONNECTIONS,
+                    ),
+                )
+    return _http_client
+
+async def close_http_client():
+    global _http_client
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
+
+def invalidate_providers():
+    """Call after any write to oauth_providers"""
+    bump_version(OAUTH_PROVIDERS_VERSION)
+
+def _load_provider_row() -> Optional[Dict[str, Any]]:
+    db = SessionLocal()
+    try:
+        query = db.query(OAuthProvider).filter(OAuthProvider.is_active == True)
+        if config.OAUTH_PROVIDER_NAME:
+            query = query.filter(OAuthProvider.name == config.OAUTH_PROVIDER_NAME)
+        provider = query.order_by(OAuthProvider.created_at).first()
+        if provider is None:
+            return None
+        return {
+            "name": provider.name,
+            "client_id": provider.client_id,
+            "auth_url": provider.auth_url,
+            "token_url": provider.token_url,
+            "user_info_url": provider.user_info_url,
+            "scopes": provider.scopes,
+        }
+    finally:
+        db.close()
+
+async def _discover() -> Dict[str, Any]:
+    if not config.OAUTH_DISCOVERY_URL:
+        return {}
+    try:
+        response = await get_http_client().get(config.OAUTH_DISCOVERY_URL)
+        response.raise_for_status()
+        return response.json()
+    except (httpx.HTTPError, ValueError) as e:
+        logger.warning(f"OAuth discovery document unavailable: {str(e)}")
+        return {}
+
+async def get_provider() -> ProviderConfig:
+    """
+    Active provider configuration, cached per process.
+    An active oauth_providers row wins over the OAUTH2_* endpoints and scopes; empty endpoints are filled from the
+    discovery document. Client id and secret always come together from the settings, as the table holds no secret.
+    """
+    # get_version may go to Redis, which blocks
+    cache_key = await run_in_threadpool(get_version, OAUTH_PROVIDERS_VERSION)
+    provider = _provider_cache.get(cache_key)
+    if provider is not None:
+        return provider
+
+    row = await run_in_threadpool(_load_provider_row) or {}
+    discovery = await _discover()
+    if row.get("client_id") and row["client_id"] != config.OAUTH_CLIENT_ID:
+        logger.warning(f"OAuth provider {row['name']} has client_id {row['client_id']}, using OAUTH_CLIENT_ID to match OAUTH_CLIENT_SECRET")
+    provider = ProviderConfig(
+        name=row.get("name") or "default",
+        client_id=config.OAUTH_CLIENT_ID,
+        client_secret=config.OAUTH_CLIENT_SECRET,
+        auth_url=row.get("auth_url") or config.OAUTH_AUTH_URL or discovery.get("authorization_endpoint", ""),
+        token_url=row.get("token_url") or config.OAUTH_TOKEN_URL or discovery.get("token_endpoint", ""),
+        user_info_url=row.get("user_info_url") or config.OAUTH_USER_INFO_URL or discovery.get("userinfo_endpoint", ""),
+        scopes=row.get("scopes") or config.OAUTH_SCOPES,
+        redirect_uri=config.OAUTH_REDIRECT_URI,
+        api_key=config.OAUTH_API_KEY,
+    )
+    _provider_cache.set(cache_key, provider)
+    return provider
+
+async def exchange_code(provider: ProviderConfig, code: str) -> str:
+    """Trade an authorization code for the provider's access token"""
+    data = {
+        "grant_type": "authorization_code",
+        "code": code,
+        "redirect_uri": provider.redirect_uri,
+        "client_id": provider.client_id,
+        "client_secret": provider.client_secret,
+    }
+    try:
+        response = await get_http_client().post(provider.token_url, data=data)
+    except httpx.HTTPError as e:
+        logger.error(f"OAuth token exchange failed: {str(e)}")
+        raise HTTPException(status_code=502, detail="Identity provider unavailable")
+    if response.status_code != 200:
+        logger.error(f"OAuth token exchange failed: {response.status_code} - {response.text}")
+        raise HTTPException(status_code=400, detail="Failed to exchange authorization code")
+    access_token = response.json().get("access_token")
+    if not access_token:
+        raise HTTPException(status_code=400, detail="No access token in token response")
+    return access_token
+
+async def fetch_userinfo(provider: ProviderConfig, access_token: str) -> Dict[str, Any]:
+    try:
+        response = await get_http_client().get(
+            provider.user_info_url,
+            headers={"Authorization": f"Bearer {access_token}"},
+            params={"api-key": provider.api_key},
+        )
+    except httpx.HTTPError as e:
+        logger.error(f"OAuth user info request failed: {str(e)}")
+        raise HTTPException(status_code=502, detail="Identity provider unavailable")
+    if response.status_code != 200:
+        logger.error(f"OAuth user info request failed: {response.status_code} - {response.text}")
+        raise HTTPException(status_code=400, detail="Failed to fetch user info")
+    return response.json()
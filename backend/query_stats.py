@@ -0,0 +1,201 @@
+import json
+import logging
+import re
+import threading
+import time
+from collections import Counter, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Any, Deque, Dict, Iterator, List, Optional, Tuple
+from sqlalchemy import event
+from config import config
+from db import all_engines
+from db_async import async_engine
+
+logger = logging.getLogger("uvicorn")
+
+# Expanded IN lists differ only in their number of placeholders
+_IN_LIST = re.compile(r"\(\s*%s(?:\s*,\s*%s)+\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+
+def statement_shape(statement: str) -> str:
+    """Statement text with IN lists collapsed, so repeated lookups compare equal"""
+    return _IN_LIST.sub("(%s, ...)", _WHITESPACE.sub(" ", statement).strip())
+
+class RequestStats:
+    """Database usage of a single request"""
+
+    def __init__(self, scope: Optional[dict] = None):
+        self.scope = scope
+        self.checkouts = 0
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.shapes: Counter = Counter()
+
+    def route(self) -> Optional[str]:
+        """Route template once the router has matched, raw path before that"""
+        if self.scope is None:
+            return None
+        route = self.scope.get("route")
+        path = getattr(route, "path", None) or self.scope.get("path")
+        return f"{self.scope.get('method')} {path}"
+
+    def roles(self) -> Optional[List[str]]:
+        # Only roles already known to the principal; looking them up here would run more SQL
+        principal = self.scope.get("state", {}).get("principal") if self.scope is not None else None
+        return principal.loaded_roles if principal is not None else None
+
+    def record(self, shape: str, seconds: float):
+        self.queries += 1
+        self.db_seconds += seconds
+        self.shapes[shape] += 1
+
+    def repeated(self, threshold: Optional[int] = None) -> List[Tuple[str, int]]:
+        """Statement shapes executed at least `threshold` times, the usual sign of an N+1 loop"""
+        threshold = config.QUERY_REPEAT_THRESHOLD if threshold is None else threshold
+        return [(shape, count) for shape, count in self.shapes.most_common() if count >= threshold]
+
+# Set per request by QueryStatsMiddleware; sync handlers run in a copy of the context but share this object
+_current: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+
+def current_stats() -> Optional[RequestStats]:
+    return _current.get()
+
+class ShapeTotals:
+    """Count and time per statement shape across all requests since startup"""
+
+    def __init__(self, max_shapes: int):
+        self.max_shapes = max_shapes
+        self.started_at = datetime.utcnow()
+        self.untracked = 0
+        self._totals: Dict[str, List[float]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, shape: str, seconds: float):
+        with self._lock:
+            totals = self._totals.get(shape)
+            if totals is None:
+                if len(self._totals) >= self.max_shapes:
+                    self.untracked += 1
+                    return
+                totals = self._totals[shape] = [0, 0.0, 0.0]
+            totals[0] += 1
+            totals[1] += seconds
+            totals[2] = max(totals[2], seconds)
+
+    def top(self, limit: int) -> List[Dict[str, Any]]:
+        with self._lock:
+            ranked = sorted(self._totals.items(), key=lambda item: item[1][1], reverse=True)[:limit]
+        return [
+            {
+                "shape": shape,
+                "count": int(count),
+                "total_ms": round(total * 1000, 3),
+                "avg_ms": round(total / count * 1000, 3),
+                "max_ms": round(longest * 1000, 3),
+            }
+            for shape, (count, total, longest) in ranked
+        ]
+
+shape_totals = ShapeTotals(config.QUERY_SHAPES_MAX)
+# Most recent slow statements of this worker, newest last
+slow_queries: Deque[Dict[str, Any]] = deque(maxlen=config.SLOW_QUERY_LOG_SIZE)
+
+def _truncate_params(parameters) -> str:
+    text = repr(parameters)
+    limit = config.SLOW_QUERY_PARAMS_MAX_CHARS
+    return text if len(text) <= limit else text[:limit] + "..."
+
+def _record_slow(statement: str, parameters, seconds: float, stats: Optional[RequestStats]):
+    entry = {
+        "at": datetime.utcnow().isoformat(),
+        "duration_ms": round(seconds * 1000, 3),
+        "route": stats.route() if stats is not None else None,
+        "roles": stats.roles() if stats is not None else None,
+        "statement": _WHITESPACE.sub(" ", statement).strip(),
+        "params": _truncate_params(parameters),
+    }
+    slow_queries.append(entry)
+    logger.warning(f"Slow query: {json.dumps(entry, default=str)}")
+
+def _count_checkout(dbapi_connection, connection_record, connection_proxy):
+    stats = _current.get()
+    if stats is not None:
+        stats.checkouts += 1
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_started_at", []).append(time.perf_counter())
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    seconds = time.perf_counter() - conn.info["query_started_at"].pop()
+    shape = statement_shape(statement)
+    stats = _current.get()
+    if stats is not None:
+        stats.record(shape, seconds)
+    shape_totals.record(shape, seconds)
+    if seconds * 1000 >= config.SLOW_QUERY_THRESHOLD_MS:
+        _record_slow(statement, parameters, seconds, stats)
+
+def _handle_error(context):
+    # Failed statements never reach after_cursor_execute
+    if context.connection is not None and context.connection.info.get("query_started_at"):
+        context.connection.info["query_started_at"].pop()
+
+for _engine in all_engines + ([async_engine.sync_engine] if async_engine is not None else []):
+    event.listen(_engine, "checkout", _count_checkout)
+    event.listen(_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(_engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(_engine, "handle_error", _handle_error)
+
+@contextmanager
+def count_queries() -> Iterator[RequestStats]:
+    """Count the statements run inside the block, e.g. around a service call in a test"""
+    stats = RequestStats()
+    token = _current.set(stats)
+    try:
+        yield stats
+    finally:
+        _current.reset(token)
+
+@contextmanager
+def assert_max_queries(max_queries: int) -> Iterator[RequestStats]:
+    """Fail when the block runs more than `max_queries` statements"""
+    with count_queries() as stats:
+        yield stats
+    if stats.queries > max_queries:
+        shapes = "\n".join(f"  {count}x {shape[:200]}" for shape, count in stats.shapes.most_common(5))
+        raise AssertionError(f"Expected at most {max_queries} queries, ran {stats.queries}:\n{shapes}")
+
+class QueryStatsMiddleware:
+    """
+    Tracks database usage per request and logs repeated statement shapes (N+1 patterns).
+    Outside production the numbers are returned as response headers:
+    X-Query-Count, X-DB-Checkouts and a Server-Timing "db" entry.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.expose = not config.is_production()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        stats = RequestStats(scope)
+        token = _current.set(stats)
+
+        async def send_with_stats(message):
+            if message["type"] == "http.response.start" and self.expose:
+                headers = list(message.get("headers", []))
+                headers.append((b"x-query-count", str(stats.queries).encode()))
+                headers.append((b"x-db-checkouts", str(stats.checkouts).encode()))
+                headers.append((b"server-timing", f'db;dur={stats.db_seconds * 1000:.1f};desc="{stats.queries} queries"'.encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_stats)
+        finally:
+            _current.reset(token)
+            for shape, count in stats.repeated():
+                logger.warning(f"Possible N+1 in {scope['method']} {scope['path']}: {count}x {shape[:200]}")
@@ -0,0 +1,228 @@
+import hashlib
+import ipaddress
+import json
+import logging
+import math
+import re
+import threading
+import time
+import uuid
+from collections import deque
+from datetime import datetime, timedelta
+from typing import Deque, Dict, List, Optional, Tuple
+import redis
+import redis.asyncio as aioredis
+from config import config
+from db import SessionLocal
+from models import RateLimit
+
+logger = logging.getLogger("uvicorn")
+
+# Token bucket: refills `rate` tokens per second up to `capacity`, one token per request.
+# Returns {allowed, seconds until the next token} in a single round trip.
+# Time comes from the Redis server, so clock skew between API hosts cannot distort the refill.
+TOKEN_BUCKET_LUA = """
+if redis.replicate_commands then redis.replicate_commands() end
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local time = redis.call('TIME')
+local now = tonumber(time[1]) + tonumber(time[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or capacity
+local ts = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+local allowed = 0
+local retry_after = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+    allowed = 1
+else
+    retry_after = (1 - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate) + 1)
+return {allowed, tostring(retry_after)}
+"""
+
+def parse_limit(value: str) -> Optional[Tuple[int, float]]:
+    """Parse "<requests>/<seconds>" into (capacity, refill rate per second); empty disables the limit"""
+    if not value:
+        return None
+    count, seconds = value.split("/")
+    return int(count), int(count) / float(seconds)
+
+SEARCH_LIMIT = parse_limit(config.RATE_LIMIT_SEARCH)
+
+# Route classes, checked in order: (action, method, path pattern, limit)
+ROUTE_CLASSES: List[Tuple[str, str, "re.Pattern", Optional[Tuple[int, float]]]] = [
+    ("login", "POST", re.compile(r"^/auth/(token|register)$"), parse_limit(config.RATE_LIMIT_LOGIN)),
+    ("barcode", "GET", re.compile(r"^/assets/barcode/"), parse_limit(config.RATE_LIMIT_BARCODE)),
+    # A replayed batch costs one token, like a single scan
+    ("barcode", "POST", re.compile(r"^/assets/barcodes:resolve$"), parse_limit(config.RATE_LIMIT_BARCODE)),
+    ("search", "GET", re.compile(r"^/assets/search$"), SEARCH_LIMIT),
+    ("sync", "POST", re.compile(r"^/erp/sync-"), parse_limit(config.RATE_LIMIT_SYNC)),
+]
+
+SEARCH_PARAM = re.compile(rb"(^|&)(search|q)=[^&]")
+
+def classify(method: str, path: str, query_string: bytes) -> Optional[Tuple[str, Tuple[int, float]]]:
+    for action, route_method, pattern, limit in ROUTE_CLASSES:
+        if limit and method == route_method and pattern.match(path):
+            return action, limit
+    # List endpoints double as search when given a search term
+    if SEARCH_LIMIT and method == "GET" and SEARCH_PARAM.search(query_string):
+        return "search", SEARCH_LIMIT
+    return None
+
+def _parse_networks(value: str) -> list:
+    return [ipaddress.ip_network(network.strip(), strict=False) for network in value.split(",") if network.strip()]
+
+TRUSTED_PROXIES = _parse_networks(config.TRUSTED_PROXIES)
+
+def _trusted(address: str) -> bool:
+    try:
+        ip = ipaddress.ip_address(address)
+    except ValueError:
+        return False
+    return any(ip in network for network in TRUSTED_PROXIES)
+
+def client_ip(scope) -> str:
+    """
+    Address of the client. Behind a trusted proxy (TRUSTED_PROXIES) it is the right-most
+    X-Forwarded-For entry that is not a proxy itself; entries further left are client-supplied.
+    """
+    client = scope.get("client")
+    address = client[0] if client else "unknown"
+    if not TRUSTED_PROXIES or not _trusted(address):
+        return address
+    forwarded = [value.decode("latin-1") for name, value in scope.get("headers", ()) if name == b"x-forwarded-for"]
+    hops = [hop.strip() for hop in ",".join(forwarded).split(",") if hop.strip()]
+    for hop in reversed(hops):
+        if not _trusted(hop):
+            return hop
+    return hops[0] if hops else address
+
+def client_identifier(scope, action: str) -> str:
+    """Bearer token hash for authenticated calls so scanners behind one NAT get their own bucket, client IP otherwise"""
+    # Logins are always keyed on the IP, a made-up bearer header must not buy a fresh bucket
+    if action != "login":
+        for name, value in scope.get("headers", ()):
+            if name == b"authorization" and value[:7].lower() == b"bearer ":
+                return "token:" + hashlib.sha256(value[7:]).hexdigest()
+    return f"ip:{client_ip(scope)}"
+
+class BlockLog:
+    """Buffers block events in memory and writes them to rate_limits in batches"""
+
+    def __init__(self, flush_seconds: float):
+        self.flush_seconds = flush_seconds
+        self._events: Deque[Tuple[str, str, datetime, datetime]] = deque()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def record(self, identifier: str, action: str, retry_after: float):
+        now = datetime.utcnow()
+        self._events.append((identifier, action, now, now + timedelta(seconds=retry_after)))
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name="rate-limit-audit", daemon=True)
+                    self._thread.start()
+
+    def _run(self):
+        while True:
+            time.sleep(self.flush_seconds)
+            self.flush()
+
+    def flush(self):
+        # One row per identifier and action per batch, counting every blocked attempt
+        rows: Dict[Tuple[str, str], dict] = {}
+        while self._events:
+            identifier, action, blocked_at, blocked_until = self._events.popleft()
+            row = rows.get((identifier, action))
+            if row is None:
+                rows[(identifier, action)] = {
+                    "id": str(uuid.uuid4()),
+                    "identifier": identifier,
+                    "action": action,
+                    "attempts": 1,
+                    "window_start": blocked_at,
+                    "blocked_until": blocked_until,
+                }
+            else:
+                row["attempts"] += 1
+                row["blocked_until"] = max(row["blocked_until"], blocked_until)
+        if not rows:
+            return
+        db = SessionLocal()
+        try:
+            db.bulk_insert_mappings(RateLimit, list(rows.values()))
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Failed to write {len(rows)} rate limit events: {str(e)}")
+        finally:
+            db.close()
+
+block_log = BlockLog(config.RATE_LIMIT_AUDIT_FLUSH_SECONDS)
+
+class RateLimitMiddleware:
+    """
+    Token-bucket rate limiting per route class and client, kept in Redis.
+    Fails open while Redis is unreachable so an outage never locks users out.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self._redis = aioredis.Redis(
+            host=config.REDIS_HOST,
+            port=config.REDIS_PORT,
+            db=config.REDIS_DB,
+            password=config.REDIS_PASSWORD or None,
+            socket_timeout=config.CACHE_REDIS_TIMEOUT,
+            socket_connect_timeout=config.CACHE_REDIS_TIMEOUT,
+        )
+        self._token_bucket = self._redis.register_script(TOKEN_BUCKET_LUA)
+        self._warned_at = 0.0
+        # After a failure Redis is left alone for a while, like cache.get_redis does,
+        # so requests during an outage don't each wait out the socket timeout
+        self._retry_at = 0.0
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not config.RATE_LIMIT_ENABLED:
+            return await self.app(scope, receive, send)
+        route_class = classify(scope["method"], scope["path"], scope.get("query_string", b""))
+        if route_class is None:
+            return await self.app(scope, receive, send)
+
+        if time.monotonic() < self._retry_at:
+            return await self.app(scope, receive, send)
+        action, (capacity, rate) = route_class
+        identifier = client_identifier(scope, action)
+        try:
+            allowed, retry_after = await self._token_bucket(
+                keys=[f"ratelimit:{action}:{identifier}"], args=[capacity, rate]
+            )
+        except redis.RedisError as e:
+            self._retry_at = time.monotonic() + 30
+            if time.monotonic() - self._warned_at > 60:
+                self._warned_at = time.monotonic()
+                logger.warning(f"Rate limiting disabled, Redis unavailable: {str(e)}")
+            return await self.app(scope, receive, send)
+
+        if int(allowed):
+            return await self.app(scope, receive, send)
+
+        retry_after = float(retry_after)
+        block_log.record(identifier, action, retry_after)
+        body = json.dumps({"detail": "Too many requests, please try again later"}).encode()
+        await send({
+            "type": "http.response.start",
+            "status": 429,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(max(1, math.ceil(retry_after))).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
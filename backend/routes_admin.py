@@ -1,22 +1,21 @@
-from fastapi import APIRouter, Depends, HTTPException, Body
+from fastapi import APIRouter, Depends, HTTPException, Body, Query
 from sqlalchemy.orm import Session
 from sqlalchemy import func
 from typing import List, Dict, Any
 from models import User, UserRole, Asset, Location, SyncLog
-from db import SessionLocal
-from auth import require_role
+from db import get_db, get_pool_status
+from db_async import get_async_pool_status
+from auth import require_role, token_cache_stats
 from services.user_service import UserService
 from services.asset_service import AssetService
+from utils import scope_cache_stats, count_cache_stats
+from barcode_cache import barcode_cache_stats
+from hierarchy import get_hierarchy
+from config import config
+from query_stats import shape_totals, slow_queries
 
 router = APIRouter(prefix="/admin", tags=["admin"])
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
 @router.get("/stats/users")
 def get_user_stats(db: Session = Depends(get_db), current_user = Depends(require_role("admin"))):
     """Get user statistics for admin dashboard"""
@@ -213,4 +212,46 @@ def update_user_role(user_id: str, new_role: str, db: Session = Depends(get_db),
 def get_all_roles(db: Session = Depends(get_db), current_user = Depends(require_role("admin"))):
     """Get all unique user roles"""
     user_service = UserService(db)
-    return {"roles": user_service.get_all_roles()} 
\ No newline at end of file
+    return {"roles": user_service.get_all_roles()}
+
+@router.get("/cache/stats")
+def get_cache_stats(current_user = Depends(require_role("admin"))):
+    """Get hit ratio and rebuild latency of the in-process and Redis caches"""
+    hierarchy = get_hierarchy()
+    return {
+        "scope": scope_cache_stats.snapshot(),
+        "token": token_cache_stats.snapshot(),
+        "count": count_cache_stats.snapshot(),
+        "barcode": barcode_cache_stats.snapshot(),
+        "hierarchy": {
+            "version": hierarchy.version,
+            "loaded_at": hierarchy.loaded_at,
+            "countries": len(hierarchy.countries),
+            "regions": len(hierarchy.regions),
+            "branches": len(hierarchy.branches),
+            "locations": len(hierarchy.locations),
+        },
+    }
+
+@router.get("/db/pool")
+def get_db_pool_status(current_user = Depends(require_role("admin"))):
+    """Get checked-out connections, overflow and checkout wait times of this worker's connection pools"""
+    status = get_pool_status()
+    async_status = get_async_pool_status()
+    if async_status is not None:
+        status["async"] = async_status
+    return status
+
+@router.get("/db/slow-queries")
+def get_slow_queries(
+    limit: int = Query(20, ge=1, le=200),
+    current_user = Depends(require_role("admin"))
+):
+    """Get this worker's statement shapes ranked by total time since startup and its most recent slow statements"""
+    return {
+        "since": shape_totals.started_at,
+        "threshold_ms": config.SLOW_QUERY_THRESHOLD_MS,
+        "top_shapes": shape_totals.top(limit),
+        "untracked_statements": shape_totals.untracked,
+        "recent_slow": list(slow_queries)[-limit:][::-1],
+    }
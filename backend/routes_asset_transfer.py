@@ -1,6 +1,6 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
-from db import SessionLocal
+from db import get_db
 from schemas import AssetTransferCreate, AssetTransferOut
 from services.asset_transfer_service import AssetTransferService
 from auth import get_current_user
@@ -8,13 +8,6 @@ from typing import List
 
 router = APIRouter(prefix="/asset-transfers", tags=["asset-transfers"])
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
 @router.post("/", response_model=AssetTransferOut)
 def create_asset_transfer(
     transfer: AssetTransferCreate,
@@ -1,51 +1,101 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from datetime import datetime
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy import func, select
 from sqlalchemy.orm import Session
-from typing import List, Optional
+from typing import Dict, List, Optional
 from models import Asset
-from db import SessionLocal
-from schemas import AssetCreate, AssetUpdate, AssetOut
-from auth import get_current_user, require_role
-from utils import apply_search_filter, apply_filters, paginate_query, get_pagination_info, get_access_scope_for_user
+from db import get_db
+from schemas import AssetCreate, AssetUpdate, AssetOut, AssetPage, AssetChanges, BarcodeResolveRequest, BarcodeResolveResponse
+from auth import get_current_user, get_principal, require_role, Principal
+from utils import apply_filters, paginate_query, get_pagination_info, keyset_paginate, next_cursor, count_rows, cached_count
+from conditional import conditional_get
+from export import MEDIA_TYPES, accepts_gzip, stream_export
+from barcode_cache import get_asset_projection, project, remember_many
+from config import config
+from search import apply_asset_search, relevance_order
+from sync import get_changes
+from services.asset_service import ASSET_ORDER, ASSET_LIST_VERSIONS, asset_count_key
 
 router = APIRouter(prefix="/assets", tags=["assets"])
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+def _asset_query(db: Session, principal: Principal, search: Optional[str], status: Optional[str], category: Optional[str], location: Optional[str]):
+    query = db.query(Asset)
+    # Row-level filtering
+    query = query.filter(principal.scope.filter_clause(Asset.location))
+    # Apply search
+    if search:
+        query = apply_asset_search(query, search)
+    # Apply filters
+    filters = {
+        'status': status,
+        'category': category,
+        'location': location
+    }
+    return apply_filters(query, filters)
+
+def _asset_total(query, principal: Principal, search: Optional[str], status: Optional[str], category: Optional[str], location: Optional[str], exact: bool):
+    key = asset_count_key(principal.scope, search, status, category, location)
+    return cached_count(key, lambda: count_rows(query, Asset.id), exact=exact)
 
 @router.get("", response_model=List[AssetOut])
 def list_assets(
+    request: Request,
+    response: Response,
     skip: int = 0, 
     limit: int = 100,
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor of the previous page, replaces skip"),
     search: Optional[str] = Query(None, description="Search in name, barcode, model"),
     status: Optional[str] = Query(None, description="Filter by status"),
     category: Optional[str] = Query(None, description="Filter by category"),
     location: Optional[str] = Query(None, description="Filter by location"),
     db: Session = Depends(get_db),
-    current_user = Depends(get_current_user)
+    principal: Principal = Depends(get_principal)
 ):
-    query = db.query(Asset)
-    # Row-level filtering
-    scope = get_access_scope_for_user(db, current_user.id)
-    if not scope['is_admin']:
-        allowed_location_ids = set(scope['location_ids'])
-        query = query.filter(Asset.location.in_(allowed_location_ids))
-    # Apply search
-    if search:
-        query = apply_search_filter(query, search, [Asset.name, Asset.barcode, Asset.model])
-    # Apply filters
-    filters = {
-        'status': status,
-        'category': category,
-        'location': location
-    }
-    query = apply_filters(query, filters)
+    not_modified = conditional_get(request, response, ASSET_LIST_VERSIONS, principal.scope.fingerprint())
+    if not_modified:
+        return not_modified
+    query = _asset_query(db, principal, search, status, category, location)
     # Apply pagination
-    query = paginate_query(query, skip, limit)
-    return query.all()
+    assets = keyset_paginate(query, ASSET_ORDER, cursor, skip, limit).all()
+    next_page = next_cursor(assets, ASSET_ORDER, limit)
+    if next_page:
+        response.headers["X-Next-Cursor"] = next_page
+    return assets
+
+@router.get("/page", response_model=AssetPage)
+def list_assets_page(
+    request: Request,
+    response: Response,
+    skip: int = 0,
+    limit: int = Query(100, ge=1),
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page, replaces skip"),
+    search: Optional[str] = Query(None, description="Search in name, barcode, model"),
+    status: Optional[str] = Query(None, description="Filter by status"),
+    category: Optional[str] = Query(None, description="Filter by category"),
+    location: Optional[str] = Query(None, description="Filter by location"),
+    exact_total: bool = Query(False, description="Count now instead of using a total up to COUNT_CACHE_TTL_SECONDS old"),
+    db: Session = Depends(get_db),
+    principal: Principal = Depends(get_principal)
+):
+    """A page of assets together with the total, replacing separate /assets and /assets/count calls"""
+    not_modified = conditional_get(request, response, ASSET_LIST_VERSIONS, principal.scope.fingerprint())
+    if not_modified:
+        return not_modified
+    query = _asset_query(db, principal, search, status, category, location)
+    total, counted = _asset_total(query, principal, search, status, category, location, exact_total)
+    assets = keyset_paginate(query, ASSET_ORDER, cursor, skip, limit).all()
+    next_page = next_cursor(assets, ASSET_ORDER, limit)
+    pagination = get_pagination_info(total, skip, limit)
+    if cursor:
+        # The position of a cursor page is unknown without counting the rows before it
+        pagination.update(skip=None, page=None, has_prev=None, has_next=next_page is not None)
+    return {
+        "items": assets,
+        "total_exact": counted,
+        "next_cursor": next_page,
+        **pagination,
+    }
 
 @router.get("/search", response_model=List[AssetOut])
 def search_assets(
@@ -53,11 +103,14 @@ def search_assets(
     skip: int = 0,
     limit: int = 50,
     db: Session = Depends(get_db),
-    current_user = Depends(get_current_user)
+    principal: Principal = Depends(get_principal)
 ):
-    """Advanced search endpoint"""
-    query = db.query(Asset)
-    query = apply_search_filter(query, q, [Asset.name, Asset.barcode, Asset.model, Asset.erp_asset_id])
+    """
+    Ranked search over name, model, barcode and ERP id, by word prefix.
+    A single word containing a digit also matches anywhere inside a barcode, so '123' finds 'ABC123'.
+    """
+    query = db.query(Asset).filter(principal.scope.filter_clause(Asset.location))
+    query = apply_asset_search(query, q).order_by(*relevance_order(q))
     query = paginate_query(query, skip, limit)
     return query.all()
 
@@ -67,25 +120,61 @@ def count_assets(
     status: Optional[str] = Query(None, description="Filter by status"),
     category: Optional[str] = Query(None, description="Filter by category"),
     location: Optional[str] = Query(None, description="Filter by location"),
+    exact: bool = Query(True, description="False accepts a total up to COUNT_CACHE_TTL_SECONDS old"),
     db: Session = Depends(get_db),
-    current_user = Depends(get_current_user)
+    principal: Principal = Depends(get_principal)
 ):
-    query = db.query(Asset)
-    # Row-level filtering
-    scope = get_access_scope_for_user(db, current_user.id)
-    if not scope['is_admin']:
-        allowed_location_ids = set(scope['location_ids'])
-        query = query.filter(Asset.location.in_(allowed_location_ids))
+    query = _asset_query(db, principal, search, status, category, location)
+    count, _ = _asset_total(query, principal, search, status, category, location, exact)
+    return {"count": count}
+
+# Columns of the asset register export, in file order
+EXPORT_COLUMNS = [
+    Asset.id, Asset.erp_asset_id, Asset.name, Asset.barcode, Asset.model, Asset.build, Asset.category,
+    Asset.location, Asset.status, Asset.last_seen, Asset.created_at, Asset.updated_at, Asset.synced_at,
+]
+
+@router.get("/export")
+def export_assets(
+    request: Request,
+    fmt: str = Query("csv", alias="format", pattern="^(csv|ndjson)$", description="csv or ndjson"),
+    search: Optional[str] = Query(None, description="Search in name, barcode, model"),
+    status: Optional[str] = Query(None, description="Filter by status"),
+    category: Optional[str] = Query(None, description="Filter by category"),
+    location: Optional[str] = Query(None, description="Filter by location"),
+    principal: Principal = Depends(get_principal)
+):
+    """Stream every asset in the caller's scope as a file, gzip-compressed when the client accepts it"""
+    statement = select(*EXPORT_COLUMNS).filter(principal.scope.filter_clause(Asset.location))
     if search:
-        query = apply_search_filter(query, search, [Asset.name, Asset.barcode, Asset.model])
-    filters = {
+        statement = apply_asset_search(statement, search)
+    statement = apply_filters(statement, {
         'status': status,
         'category': category,
         'location': location
+    }).order_by(Asset.id)
+
+    compress = accepts_gzip(request.headers.get("accept-encoding"))
+    headers = {
+        "Content-Disposition": f'attachment; filename="assets-{datetime.utcnow():%Y%m%d-%H%M%S}.{fmt}"',
+        "Vary": "Accept-Encoding",
     }
-    query = apply_filters(query, filters)
-    count = query.count()
-    return {"count": count}
+    if compress:
+        headers["Content-Encoding"] = "gzip"
+    columns = [column.key for column in EXPORT_COLUMNS]
+    return StreamingResponse(stream_export(statement, columns, fmt, compress, caller=principal.id), media_type=MEDIA_TYPES[fmt], headers=headers)
+
+@router.get("/changes", response_model=AssetChanges)
+def get_asset_changes(
+    token: Optional[str] = Query(None, description="token of the previous response; omit for the initial download"),
+    limit: int = Query(1000, ge=1, le=config.SYNC_PAGE_MAX),
+    db: Session = Depends(get_db),
+    principal: Principal = Depends(get_principal)
+):
+    """Assets changed in the caller's scope since the sync token, with tombstones for removed ones"""
+    # A lagging replica would let the token move past rows it has not replayed yet
+    db.info["read_only"] = False
+    return get_changes(db, principal.scope, token, limit)
 
 @router.get("/{asset_id}", response_model=AssetOut)
 def get_asset(
@@ -146,7 +235,60 @@ def get_asset_by_barcode(
     current_user = Depends(get_current_user)
 ):
     """Get asset by barcode"""
-    asset = db.query(Asset).filter(Asset.barcode == barcode).first()
+    asset = get_asset_projection(db, barcode)
     if not asset:
         raise HTTPException(status_code=404, detail="Asset not found")
-    return asset 
\ No newline at end of file
+    return asset 
+
+@router.post("/barcodes:resolve", response_model=BarcodeResolveResponse)
+def resolve_barcodes(
+    payload: BarcodeResolveRequest,
+    db: Session = Depends(get_db),
+    principal: Principal = Depends(get_principal)
+):
+    """
+    Resolve a burst of queued scans in one request and one scoped query.
+    Results follow the input order; barcodes shared by several visible assets come back as duplicate.
+    """
+    if len(payload.barcodes) > config.BARCODE_RESOLVE_MAX:
+        raise HTTPException(status_code=400, detail=f"At most {config.BARCODE_RESOLVE_MAX} barcodes per request")
+    wanted = {barcode for barcode in payload.barcodes if barcode}
+    matches: Dict[str, list] = {}
+    projections = {}
+    if wanted:
+        assets = db.query(Asset).filter(
+            Asset.barcode.in_(wanted),
+            principal.scope.filter_clause(Asset.location)
+        ).all()
+        for asset in assets:
+            # The barcode collation is case-insensitive, so group the same way
+            matches.setdefault(asset.barcode.lower(), []).append(asset)
+        unique = [found[0] for found in matches.values() if len(found) == 1]
+        # The barcode cache serves every user, so only barcodes unique across all assets go in;
+        # one unique in this scope may be shared with assets the caller cannot see
+        shared = set()
+        if unique and not principal.scope.is_admin:
+            shared = {barcode.lower() for barcode in db.scalars(
+                select(Asset.barcode)
+                .where(Asset.barcode.in_([asset.barcode for asset in unique]))
+                .group_by(Asset.barcode)
+                .having(func.count() > 1)
+            )}
+        projections = remember_many(asset for asset in unique if asset.barcode.lower() not in shared)
+        projections.update((asset.id, project(asset)) for asset in unique if asset.barcode.lower() in shared)
+
+    results = []
+    for barcode in payload.barcodes:
+        found = matches.get(barcode.lower(), [])
+        if not found:
+            results.append({"barcode": barcode, "status": "not_found"})
+        elif len(found) == 1:
+            results.append({"barcode": barcode, "status": "found", "asset": projections[found[0].id]})
+        else:
+            results.append({"barcode": barcode, "status": "duplicate", "assets": found})
+    return {
+        "results": results,
+        "found": sum(1 for result in results if result["status"] == "found"),
+        "not_found": sum(1 for result in results if result["status"] == "not_found"),
+        "duplicates": sum(1 for result in results if result["status"] == "duplicate"),
+    }
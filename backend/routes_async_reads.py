@@ -0,0 +1,186 @@
+import time
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+from typing import Any, Dict, List, Optional
+from models import Asset, CycleCountItem, Location
+from starlette.concurrency import run_in_threadpool
+from db_async import get_async_db
+from config import config
+from barcode_cache import cached_projection, remember
+from cache import HIERARCHY_VERSION
+from conditional import conditional_get
+from schemas import AssetOut
+from auth import get_current_user, get_principal, Principal
+from utils import AccessScope, apply_filters, keyset_paginate, next_cursor, get_cached_count, store_count
+from search import apply_asset_search
+from services.asset_service import ASSET_ORDER, ASSET_LIST_VERSIONS, asset_count_key
+from services.cycle_count_item_service import ITEM_ORDER
+from services.location_service import LOCATION_ORDER, location_count_key
+
+# Async versions of the hottest read endpoints. main.py includes this router ahead of the
+# sync routers when ASYNC_DB_ENABLED is set, so these handlers take over the same paths.
+# Only the endpoint queries use the async engine: authentication still goes through the sync
+# get_principal and get_db, so each request holds a threadpool slot and a sync pool connection
+# while it is resolved, and the sync pool must stay sized for THREADPOOL_SIZE.
+router = APIRouter(tags=["async-reads"])
+
+async def _count(db: AsyncSession, query) -> int:
+    return await db.scalar(select(func.count()).select_from(query.order_by(None).subquery()))
+
+async def _cached_count(db: AsyncSession, key: tuple, query, exact: bool = False) -> int:
+    """utils.cached_count with the count awaited and the cache (synchronous Redis) kept off the event loop"""
+    if not exact:
+        total = await run_in_threadpool(get_cached_count, key)
+        if total is not None:
+            return total
+    started = time.perf_counter()
+    total = await _count(db, query)
+    await run_in_threadpool(store_count, key, total, time.perf_counter() - started)
+    return total
+
+def _resolve_scope(principal: Principal, level: str = 'location') -> AccessScope:
+    # A scope or hierarchy cache miss means synchronous Redis and database work, so run this in the threadpool
+    scope = principal.scope
+    scope.fingerprint(level)
+    return scope
+
+def _asset_query(scope: AccessScope, search: Optional[str], status: Optional[str], category: Optional[str], location: Optional[str]):
+    query = select(Asset).filter(scope.filter_clause(Asset.location))
+    if search:
+        query = apply_asset_search(query, search)
+    return apply_filters(query, {'status': status, 'category': category, 'location': location})
+
+@router.get("/assets", response_model=List[AssetOut])
+async def list_assets(
+    request: Request,
+    response: Response,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor of the previous page, replaces skip"),
+    search: Optional[str] = Query(None, description="Search in name, barcode, model"),
+    status: Optional[str] = Query(None, description="Filter by status"),
+    category: Optional[str] = Query(None, description="Filter by category"),
+    location: Optional[str] = Query(None, description="Filter by location"),
+    db: AsyncSession = Depends(get_async_db),
+    principal: Principal = Depends(get_principal)
+):
+    scope = await run_in_threadpool(_resolve_scope, principal)
+    # Version lookups may reach Redis, which is synchronous
+    not_modified = await run_in_threadpool(conditional_get, request, response, ASSET_LIST_VERSIONS, scope.fingerprint())
+    if not_modified:
+        return not_modified
+    query = keyset_paginate(_asset_query(scope, search, status, category, location), ASSET_ORDER, cursor, skip, limit)
+    assets = (await db.scalars(query)).all()
+    next_page = next_cursor(assets, ASSET_ORDER, limit)
+    if next_page:
+        response.headers["X-Next-Cursor"] = next_page
+    return assets
+
+@router.get("/assets/count")
+async def count_assets(
+    search: Optional[str] = Query(None, description="Search in name, barcode, model"),
+    status: Optional[str] = Query(None, description="Filter by status"),
+    category: Optional[str] = Query(None, description="Filter by category"),
+    location: Optional[str] = Query(None, description="Filter by location"),
+    exact: bool = Query(True, description="False accepts a total up to COUNT_CACHE_TTL_SECONDS old"),
+    db: AsyncSession = Depends(get_async_db),
+    principal: Principal = Depends(get_principal)
+):
+    scope = await run_in_threadpool(_resolve_scope, principal)
+    key = await run_in_threadpool(asset_count_key, scope, search, status, category, location)
+    query = _asset_query(scope, search, status, category, location)
+    return {"count": await _cached_count(db, key, query, exact)}
+
+@router.get("/assets/barcode/{barcode}", response_model=AssetOut)
+async def get_asset_by_barcode(
+    barcode: str,
+    db: AsyncSession = Depends(get_async_db),
+    current_user = Depends(get_current_user)
+):
+    """Get asset by barcode"""
+    if config.BARCODE_CACHE_ENABLED:
+        # The cache talks to Redis synchronously, so keep it off the event loop
+        projection = await run_in_threadpool(cached_projection, barcode)
+        if projection is not None:
+            return projection
+    started = time.perf_counter()
+    asset = await db.scalar(select(Asset).filter(Asset.barcode == barcode).limit(1))
+    if not asset:
+        raise HTTPException(status_code=404, detail="Asset not found")
+    if config.BARCODE_CACHE_ENABLED:
+        return await run_in_threadpool(remember, asset, time.perf_counter() - started)
+    return asset
+
+@router.get("/cycle-count-items", response_model=Dict[str, Any])
+async def list_cycle_count_items(
+    skip: int = 0,
+    limit: int = 100,
+    task_id: str = Query(None),
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page, replaces skip"),
+    db: AsyncSession = Depends(get_async_db),
+    current_user = Depends(get_current_user)
+):
+    query = select(CycleCountItem)
+    if task_id:
+        query = query.filter(CycleCountItem.task_id == task_id)
+    total = await _count(db, query)
+    query = keyset_paginate(query.options(selectinload(CycleCountItem.asset)), ITEM_ORDER, cursor, skip, limit)
+    items = (await db.scalars(query)).all()
+    # Same shape as CycleCountItemService.list_items
+    result = []
+    for item in items:
+        item_dict = item.__dict__.copy()
+        if item.asset:
+            asset_dict = item.asset.__dict__.copy()
+            asset_dict.pop('_sa_instance_state', None)
+            item_dict['asset'] = asset_dict
+        item_dict.pop('_sa_instance_state', None)
+        result.append(item_dict)
+    return {"items": result, "total": total, "next_cursor": next_cursor(items, ITEM_ORDER, limit)}
+
+@router.get("/locations")
+async def list_locations(
+    request: Request,
+    response: Response,
+    branch_id: Optional[str] = None,
+    search: Optional[str] = None,
+    skip: int = 0,
+    limit: int = 50,
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page, replaces skip"),
+    db: AsyncSession = Depends(get_async_db),
+    principal: Principal = Depends(get_principal)
+):
+    scope = await run_in_threadpool(_resolve_scope, principal, 'location')
+    not_modified = await run_in_threadpool(conditional_get, request, response, [HIERARCHY_VERSION], scope.fingerprint('location'))
+    if not_modified:
+        return not_modified
+    query = select(Location).filter(scope.filter_clause(Location.id, 'location'))
+    if branch_id:
+        query = query.filter(Location.branch_id == branch_id)
+    if search:
+        query = query.filter(Location.name.ilike(f'%{search}%'))
+    key = await run_in_threadpool(location_count_key, scope, branch_id, search)
+    # Locations only change with a hierarchy version bump, so the cached total is exact
+    total = await _cached_count(db, key, query)
+    locations = (await db.scalars(keyset_paginate(query, LOCATION_ORDER, cursor, skip, limit))).all()
+    # Same shape as LocationService.list_locations
+    return {
+        'items': [
+            {
+                'id': l.id,
+                'name': l.name,
+                'description': l.description,
+                'erp_location_id': l.erp_location_id,
+                'branch_id': l.branch_id,
+                'created_at': l.created_at,
+                'updated_at': l.updated_at,
+            }
+            for l in locations
+        ],
+        'total': total,
+        'skip': skip,
+        'limit': limit,
+        'next_cursor': next_cursor(locations, LOCATION_ORDER, limit)
+    }
@@ -1,28 +1,28 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from models import Category
-from db import SessionLocal
+from db import get_db
 from schemas import CategoryCreate, CategoryUpdate, CategoryOut
 from auth import get_current_user, require_role
+from cache import CATEGORIES_VERSION
+from conditional import conditional_get
 
 router = APIRouter(prefix="/categories", tags=["categories"])
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
 @router.get("", response_model=List[CategoryOut])
 def list_categories(
+    request: Request,
+    response: Response,
     skip: int = 0,
     limit: int = 100,
     search: Optional[str] = Query(None, description="Search in name"),
     db: Session = Depends(get_db),
     current_user = Depends(get_current_user)
 ):
+    not_modified = conditional_get(request, response, [CATEGORIES_VERSION])
+    if not_modified:
+        return not_modified
     return db.query(Category).offset(skip).limit(limit).all()
 
 @router.get("/{category_id}", response_model=CategoryOut)
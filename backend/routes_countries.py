@@ -2,19 +2,12 @@ from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from typing import List
 from models import Country
-from db import SessionLocal
+from db import get_db
 from schemas import CountryCreate, CountryUpdate, CountryOut
 from auth import get_current_user
 
 router = APIRouter(prefix="/countries", tags=["countries"])
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
 @router.get("", response_model=List[CountryOut])
 def list_countries(
     skip: int = 0,
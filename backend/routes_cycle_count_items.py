@@ -1,31 +1,25 @@
 from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 from models import CycleCountItem
-from db import SessionLocal
+from db import get_db
 from schemas import CycleCountItemCreate, CycleCountItemUpdate, CycleCountItemOut
 from auth import get_current_user, require_any_role, get_user_roles
 from services.cycle_count_item_service import CycleCountItemService
 
 router = APIRouter(prefix="/cycle-count-items", tags=["cycle-count-items"])
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
 @router.get("", response_model=Dict[str, Any])
 def list_cycle_count_items(
     skip: int = 0,
     limit: int = 100,
     task_id: str = Query(None),
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page, replaces skip"),
     db: Session = Depends(get_db),
     current_user = Depends(get_current_user)
 ):
     service = CycleCountItemService(db)
-    return service.list_items(skip=skip, limit=limit, task_id=task_id)
+    return service.list_items(skip=skip, limit=limit, task_id=task_id, cursor=cursor)
 
 @router.get("/{item_id}", response_model=CycleCountItemOut)
 def get_cycle_count_item(
@@ -1,21 +1,15 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
 from typing import List, Dict, Any
 from models import CycleCountTask
-from db import SessionLocal
+from db import get_db
 from schemas import CycleCountTaskCreate, CycleCountTaskUpdate, CycleCountTaskOut
 from auth import get_current_user, require_any_role, get_user_roles
 from services.cycle_count_task_service import CycleCountTaskService
+from barcode_cache import warm_location_branch
 
 router = APIRouter(prefix="/cycle-count-tasks", tags=["cycle-count-tasks"])
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
 @router.get("", response_model=Dict[str, Any])
 def list_cycle_count_tasks(
     skip: int = 0,
@@ -54,14 +48,20 @@ def create_cycle_count_task(
 def update_cycle_count_task(
     task_id: str,
     task: CycleCountTaskUpdate,
+    background_tasks: BackgroundTasks,
     db: Session = Depends(get_db),
     current_user = Depends(get_current_user)
 ):
     service = CycleCountTaskService(db)
+    updates = task.dict(exclude_unset=True)
     try:
-        return service.update_task(task_id, task.dict(exclude_unset=True), current_user.id, get_user_roles)
+        db_task = service.update_task(task_id, updates, current_user.id, get_user_roles)
     except Exception as e:
         raise HTTPException(status_code=403, detail=str(e))
+    # The app sets started_at on the first scan of a count; load the branch's barcodes before the next ones
+    if updates.get('started_at') and db_task.location_filter:
+        background_tasks.add_task(warm_location_branch, db_task.location_filter)
+    return db_task
 
 @router.delete("/{task_id}")
 def delete_cycle_count_task(
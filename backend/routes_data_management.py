@@ -1,6 +1,6 @@
 from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form
 from sqlalchemy.orm import Session
-from db import SessionLocal
+from db import get_db
 from services.data_management_service import DataManagementService
 from auth import require_role, get_current_user
 from models import User
@@ -8,13 +8,6 @@ from typing import List, Dict, Any
 
 router = APIRouter(prefix="/data-management", tags=["data-management"])
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
 @router.get("/sync-logs")
 def get_sync_logs(
     limit: int = 20,
@@ -35,7 +28,7 @@ def get_data_stats(
     return service.get_data_stats()
 
 @router.post("/upload/regions")
-async def upload_regions_csv(
+def upload_regions_csv(
     file: UploadFile = File(...),
     db: Session = Depends(get_db),
     current_user: User = Depends(require_role("admin"))
@@ -58,7 +51,7 @@ async def upload_regions_csv(
     }
 
 @router.post("/upload/locations")
-async def upload_locations_csv(
+def upload_locations_csv(
     file: UploadFile = File(...),
     db: Session = Depends(get_db),
     current_user: User = Depends(require_role("admin"))
@@ -81,7 +74,7 @@ async def upload_locations_csv(
     }
 
 @router.post("/upload/assets")
-async def upload_assets_csv(
+def upload_assets_csv(
     file: UploadFile = File(...),
     db: Session = Depends(get_db),
     current_user: User = Depends(require_role("admin"))
@@ -104,7 +97,7 @@ async def upload_assets_csv(
     } 
 
 @router.post("/debug/csv")
-async def debug_csv_upload(
+def debug_csv_upload(
     file: UploadFile = File(...),
     db: Session = Depends(get_db),
     current_user: User = Depends(require_role("admin"))
@@ -13,7 +13,7 @@ from celery.result import AsyncResult
 router = APIRouter(prefix="/erp", tags=["ERP Integration"])
 
 @router.post("/sync-locations", response_model=dict)
-async def sync_locations_from_oracle(
+def sync_locations_from_oracle(
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
@@ -41,7 +41,7 @@ async def sync_locations_from_oracle(
         )
 
 @router.post("/sync-assets", response_model=dict)
-async def sync_assets_from_oracle(
+def sync_assets_from_oracle(
     force_full_sync: bool = Query(False, description="Force full sync instead of incremental"),
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
@@ -74,7 +74,7 @@ async def sync_assets_from_oracle(
         )
 
 @router.get("/task-status/{task_id}")
-async def get_task_status(
+def get_task_status(
     task_id: str,
     current_user: User = Depends(get_current_user)
 ):
@@ -112,7 +112,7 @@ async def get_task_status(
         )
 
 @router.get("/sync-history")
-async def get_sync_history(
+def get_sync_history(
     limit: int = Query(50, ge=1, le=100),
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
@@ -145,7 +145,7 @@ async def get_sync_history(
     }
 
 @router.get("/test-connection")
-async def test_oracle_connection(
+def test_oracle_connection(
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
@@ -161,7 +161,7 @@ async def test_oracle_connection(
     return result
 
 @router.get("/sync-config")
-async def get_sync_config(
+def get_sync_config(
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
@@ -190,7 +190,7 @@ async def get_sync_config(
         }
 
 @router.get("/locations-mapping")
-async def get_locations_mapping(
+def get_locations_mapping(
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
@@ -1,23 +1,24 @@
-from fastapi import APIRouter, Depends, HTTPException, Body
+from fastapi import APIRouter, Depends, HTTPException, Body, Query, Request, Response
 from sqlalchemy.orm import Session
-from db import SessionLocal
+from db import get_db
 from services.location_service import LocationService
-from auth import require_role, get_current_user
+from auth import require_role, get_principal, Principal
 from typing import Optional
+from cache import HIERARCHY_VERSION, PROFILES_VERSION
+from conditional import conditional_get
 
 router = APIRouter(prefix="/locations", tags=["locations"])
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+# Hierarchy lists also carry the display names of assigned users
+HIERARCHY_LIST_VERSIONS = [HIERARCHY_VERSION, PROFILES_VERSION]
 
 # Country endpoints
 @router.get("/countries")
-def list_countries(db: Session = Depends(get_db), current_user = Depends(get_current_user)):
-    return LocationService(db).list_countries(user_id=current_user.id)
+def list_countries(request: Request, response: Response, db: Session = Depends(get_db), principal: Principal = Depends(get_principal)):
+    not_modified = conditional_get(request, response, HIERARCHY_LIST_VERSIONS, principal.scope.fingerprint('country'))
+    if not_modified:
+        return not_modified
+    return LocationService(db).list_countries(scope=principal.scope)
 
 @router.post("/countries")
 def create_country(
@@ -48,11 +49,16 @@ def delete_country(
 # Region endpoints
 @router.get("/regions")
 def list_regions(
+    request: Request,
+    response: Response,
     country_id: Optional[str] = None,
     db: Session = Depends(get_db),
-    current_user = Depends(get_current_user)
+    principal: Principal = Depends(get_principal)
 ):
-    return LocationService(db).list_regions(user_id=current_user.id, country_id=country_id)
+    not_modified = conditional_get(request, response, HIERARCHY_LIST_VERSIONS, principal.scope.fingerprint('region'))
+    if not_modified:
+        return not_modified
+    return LocationService(db).list_regions(scope=principal.scope, country_id=country_id)
 
 @router.post("/regions")
 def create_region(
@@ -83,14 +89,19 @@ def delete_region(
 # Branch endpoints
 @router.get("/branches")
 def list_branches(
+    request: Request,
+    response: Response,
     region_id: Optional[str] = None,
     search: Optional[str] = None,
     skip: int = 0,
     limit: int = 50,
     db: Session = Depends(get_db),
-    current_user = Depends(get_current_user)
+    principal: Principal = Depends(get_principal)
 ):
-    return LocationService(db).list_branches(user_id=current_user.id, region_id=region_id, search=search, skip=skip, limit=limit)
+    not_modified = conditional_get(request, response, HIERARCHY_LIST_VERSIONS, principal.scope.fingerprint('branch'))
+    if not_modified:
+        return not_modified
+    return LocationService(db).list_branches(scope=principal.scope, region_id=region_id, search=search, skip=skip, limit=limit)
 
 @router.post("/branches")
 def create_branch(
@@ -120,14 +131,20 @@ def delete_branch(
 
 @router.get("")
 def list_locations(
+    request: Request,
+    response: Response,
     branch_id: Optional[str] = None,
     search: Optional[str] = None,
     skip: int = 0,
     limit: int = 50,
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page, replaces skip"),
     db: Session = Depends(get_db),
-    current_user = Depends(get_current_user)
+    principal: Principal = Depends(get_principal)
 ):
-    return LocationService(db).list_locations(user_id=current_user.id, branch_id=branch_id, search=search, skip=skip, limit=limit)
+    not_modified = conditional_get(request, response, [HIERARCHY_VERSION], principal.scope.fingerprint('location'))
+    if not_modified:
+        return not_modified
+    return LocationService(db).list_locations(scope=principal.scope, branch_id=branch_id, search=search, skip=skip, limit=limit, cursor=cursor)
 
 @router.post("")
 def create_location(
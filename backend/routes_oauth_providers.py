@@ -1,21 +1,15 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 from typing import List
-from db import SessionLocal
+from db import get_db
 from models import OAuthProvider
 from schemas import OAuthProviderCreate, OAuthProviderUpdate, OAuthProviderOut
 from auth import get_current_user, require_role
 from uuid import uuid4
+from oauth_client import invalidate_providers
 
 router = APIRouter(prefix="/oauth-providers", tags=["oauth-providers"])
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
 @router.get("", response_model=List[OAuthProviderOut])
 def list_oauth_providers(db: Session = Depends(get_db), current_user=Depends(get_current_user)):
     return db.query(OAuthProvider).all()
@@ -46,6 +40,7 @@ def create_oauth_provider(
     )
     db.add(new_provider)
     db.commit()
+    invalidate_providers()
     db.refresh(new_provider)
     return new_provider
 
@@ -62,6 +57,7 @@ def update_oauth_provider(
     for field, value in updates.dict(exclude_unset=True).items():
         setattr(provider, field, value)
     db.commit()
+    invalidate_providers()
     db.refresh(provider)
     return provider
 
@@ -76,4 +72,5 @@ def delete_oauth_provider(
         raise HTTPException(status_code=404, detail="OAuth provider not found")
     db.delete(provider)
     db.commit()
+    invalidate_providers()
     return None 
\ No newline at end of file
@@ -2,19 +2,12 @@ from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from typing import List
 from models import Region
-from db import SessionLocal
+from db import get_db
 from schemas import RegionCreate, RegionUpdate, RegionOut
 from auth import get_current_user
 
 router = APIRouter(prefix="/regions", tags=["regions"])
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
 @router.get("", response_model=List[RegionOut])
 def list_regions(
     skip: int = 0,
@@ -0,0 +1,44 @@
+from datetime import datetime
+from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from fastapi.responses import FileResponse
+from auth import get_principal, Principal
+from conditional import etag_matches
+from schemas import SnapshotPackOut
+from snapshots import get_pack
+from sync import sync_token
+
+router = APIRouter(prefix="/snapshots", tags=["snapshots"])
+
+@router.get("/branches", response_model=List[SnapshotPackOut])
+def list_branch_snapshots(principal: Principal = Depends(get_principal)):
+    """Snapshot packs of the branches in the caller's scope"""
+    packs = (get_pack(branch_id) for branch_id in principal.scope.branch_ids)
+    return [pack for pack in packs if pack is not None]
+
+@router.api_route("/branches/{branch_id}", methods=["GET", "HEAD"])
+def download_branch_snapshot(
+    branch_id: str,
+    request: Request,
+    principal: Principal = Depends(get_principal)
+):
+    """
+    Download the snapshot pack of a branch, a gzip-compressed SQLite file. Range requests resume
+    an interrupted download. X-Sync-Token continues from the pack through /assets/changes; it is
+    only sent when the pack holds the caller's whole scope, since the change feed is per scope and
+    a token from one branch would skip the other branches' assets older than the pack.
+    """
+    pack = get_pack(branch_id) if principal.scope.allows(branch_id, 'branch') else None
+    if pack is None:
+        raise HTTPException(status_code=404, detail="Snapshot not found")
+    headers = {
+        "ETag": pack["etag"],
+        "Cache-Control": "private, no-cache",
+    }
+    if pack.get("scope_fingerprint") == principal.scope.fingerprint():
+        headers["X-Sync-Token"] = sync_token(principal.scope, datetime.fromisoformat(pack["synced_until"]))
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None and etag_matches(if_none_match, pack["etag"]):
+        return Response(status_code=304, headers=headers)
+    # FileResponse answers Range and If-Range itself, against the ETag set here
+    return FileResponse(pack["path"], media_type="application/gzip", filename=f"branch-{branch_id}.sqlite.gz", headers=headers)
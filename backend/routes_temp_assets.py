@@ -1,28 +1,30 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 from models import TempAsset
-from db import SessionLocal
+from db import get_db
 from schemas import TempAssetCreate, TempAssetUpdate, TempAssetOut
 from auth import get_current_user, require_any_role
+from utils import keyset_paginate, next_cursor
 
 router = APIRouter(prefix="/temp-assets", tags=["temp-assets"])
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+TEMP_ASSET_ORDER = [TempAsset.id]
 
 @router.get("", response_model=List[TempAssetOut])
 def list_temp_assets(
+    response: Response,
     skip: int = 0, 
     limit: int = 100, 
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor of the previous page, replaces skip"),
     db: Session = Depends(get_db),
     current_user = Depends(get_current_user)
 ):
-    return db.query(TempAsset).offset(skip).limit(limit).all()
+    temp_assets = keyset_paginate(db.query(TempAsset), TEMP_ASSET_ORDER, cursor, skip, limit).all()
+    next_page = next_cursor(temp_assets, TEMP_ASSET_ORDER, limit)
+    if next_page:
+        response.headers["X-Next-Cursor"] = next_page
+    return temp_assets
 
 @router.get("/{temp_asset_id}", response_model=TempAssetOut)
 def get_temp_asset(
@@ -1,18 +1,11 @@
 from fastapi import APIRouter, Depends, HTTPException, Body
 from sqlalchemy.orm import Session
-from db import SessionLocal
+from db import get_db
 from services.user_assignment_service import UserAssignmentService
 from auth import require_role, require_any_role
 
 router = APIRouter(prefix="/user-assignments", tags=["user-assignments"])
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
 # Get all users with roles (excluding admins)
 @router.get("/users-with-roles")
 def get_users_with_roles(db: Session = Depends(get_db), current_user = Depends(require_any_role(["admin", "manager"]))):
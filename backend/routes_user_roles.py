@@ -2,19 +2,13 @@ from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from typing import List
 from models import UserRole
-from db import SessionLocal
+from db import get_db
 from schemas import UserRoleCreate, UserRoleUpdate, UserRoleOut
-from auth import get_current_user
+from auth import get_current_user, invalidate_user_tokens
+from cache import bump_hierarchy_version
 
 router = APIRouter(prefix="/user-roles", tags=["user-roles"])
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
 @router.get("", response_model=List[UserRoleOut])
 def list_user_roles(
     skip: int = 0,
@@ -36,6 +30,8 @@ def create_user_role(user_role: UserRoleCreate, db: Session = Depends(get_db)):
     db_user_role = UserRole(**user_role.dict())
     db.add(db_user_role)
     db.commit()
+    bump_hierarchy_version()
+    invalidate_user_tokens(db_user_role.user_id)
     db.refresh(db_user_role)
     return db_user_role
 
@@ -47,6 +43,8 @@ def update_user_role(user_role_id: str, user_role: UserRoleUpdate, db: Session =
     for key, value in user_role.dict(exclude_unset=True).items():
         setattr(db_user_role, key, value)
     db.commit()
+    bump_hierarchy_version()
+    invalidate_user_tokens(db_user_role.user_id)
     db.refresh(db_user_role)
     return db_user_role
 
@@ -55,6 +53,9 @@ def delete_user_role(user_role_id: str, db: Session = Depends(get_db)):
     db_user_role = db.query(UserRole).filter(UserRole.id == user_role_id).first()
     if not db_user_role:
         raise HTTPException(status_code=404, detail="User role not found")
+    user_id = db_user_role.user_id
     db.delete(db_user_role)
     db.commit()
+    bump_hierarchy_version()
+    invalidate_user_tokens(user_id)
     return {"ok": True} 
\ No newline at end of file
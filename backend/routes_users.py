@@ -1,29 +1,30 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from models import User, UserRole, Profile
-from db import SessionLocal
+from db import get_db
 from schemas import UserCreate, UserUpdate, UserOut
-from auth import get_current_user
+from auth import get_current_user, invalidate_user_tokens
+from utils import keyset_paginate, next_cursor
 
 router = APIRouter(prefix="/users", tags=["users"])
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+USER_ORDER = [User.id]
 
 @router.get("", response_model=List[UserOut])
 def list_users(
+    response: Response,
     skip: int = 0,
     limit: int = 100,
     search: Optional[str] = None,
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor of the previous page, replaces skip"),
     db: Session = Depends(get_db),
     current_user = Depends(get_current_user)
 ):
-    users = db.query(User).offset(skip).limit(limit).all()
+    users = keyset_paginate(db.query(User), USER_ORDER, cursor, skip, limit).all()
+    next_page = next_cursor(users, USER_ORDER, limit)
+    if next_page:
+        response.headers["X-Next-Cursor"] = next_page
     # Fetch all profiles in one go for efficiency
     # profiles = {p.id: p for p in db.query(Profile).all()}
     # Attach display_name from Profile if available
@@ -78,4 +79,5 @@ def delete_user(user_id: str, db: Session = Depends(get_db)):
         raise HTTPException(status_code=404, detail="User not found")
     db.delete(db_user)
     db.commit()
+    invalidate_user_tokens(user_id)
     return {"ok": True} 
\ No newline at end of file
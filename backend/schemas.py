@@ -89,6 +89,59 @@ class AssetOut(AssetBase):
     class Config:
         from_attributes = True
 
+class AssetPage(BaseModel):
+    """
+    A page of assets with the total and the fields of utils.get_pagination_info.
+    Pages fetched by cursor have no offset, so skip, page and has_prev are null for them.
+    """
+    items: List[AssetOut]
+    total: int
+    total_exact: bool
+    skip: Optional[int]
+    limit: int
+    page: Optional[int]
+    total_pages: int
+    has_next: bool
+    has_prev: Optional[bool]
+    next_cursor: Optional[str] = None
+
+class BarcodeResolveRequest(BaseModel):
+    barcodes: List[str]
+
+class BarcodeResolution(BaseModel):
+    barcode: str
+    status: str  # found, not_found or duplicate
+    asset: Optional[AssetOut] = None
+    # Every visible asset carrying the barcode when it is not unique
+    assets: Optional[List[AssetOut]] = None
+
+class BarcodeResolveResponse(BaseModel):
+    results: List[BarcodeResolution]
+    found: int
+    not_found: int
+    duplicates: int
+
+class AssetRemoval(BaseModel):
+    id: str
+    reason: str  # deleted, or moved out of the caller's scope
+    removed_at: datetime
+
+class AssetChanges(BaseModel):
+    """A page of the asset change feed; pass token back until has_more is false, then keep it for the next sync"""
+    assets: List[AssetOut]
+    removed: List[AssetRemoval]
+    token: str
+    has_more: bool
+
+class SnapshotPackOut(BaseModel):
+    branch_id: str
+    etag: str
+    size: int
+    format_version: int
+    built_at: datetime
+    synced_until: datetime
+    counts: Dict[str, int]
+
 # User schemas
 class UserBase(BaseModel):
     email: str
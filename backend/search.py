@@ -0,0 +1,60 @@
+import re
+from typing import List, Optional
+from sqlalchemy import and_, case, false, or_
+from sqlalchemy.dialects.mysql import match
+from config import config
+from models import Asset
+
+# Asset search on the FULLTEXT index over assets.search_text (see models.asset_search_text).
+# Replaces ILIKE '%term%', which scanned the whole table for every search.
+
+_TOKEN = re.compile(r"[0-9a-z]+")
+# A single word containing a digit, e.g. a partially typed or scanned barcode
+_BARCODE_LIKE = re.compile(r"\S*[0-9]\S*")
+MAX_TERMS = 8
+
+def _tokens(term: str) -> List[str]:
+    return _TOKEN.findall(term.lower())[:MAX_TERMS]
+
+def boolean_query(term: str) -> Optional[str]:
+    """
+    Boolean-mode query requiring every indexed word of the term, each as a prefix: 'dell lat' -> '+dell* +lat*'.
+    None when the term has no word of at least FULLTEXT_MIN_TOKEN_SIZE characters.
+    """
+    tokens = [token for token in _tokens(term) if len(token) >= config.FULLTEXT_MIN_TOKEN_SIZE]
+    if not tokens:
+        return None
+    return " ".join(f"+{token}*" for token in tokens)
+
+def _short_word_filter(token: str):
+    # Words below the index's minimum token size are not in the FULLTEXT index, so 'hp' or 'pc'
+    # is matched as a word prefix in search_text instead; the other words still narrow through MATCH
+    return or_(Asset.search_text.like(f"{token}%"), Asset.search_text.like(f"% {token}%"))
+
+def _match(expression: str):
+    return match(Asset.search_text, against=expression).in_boolean_mode()
+
+def apply_asset_search(query, term: str):
+    """Restrict an asset query (ORM query or select()) to assets matching the search term"""
+    tokens = _tokens(term)
+    if not tokens:
+        return query.filter(false())
+    conditions = [_short_word_filter(token) for token in tokens if len(token) < config.FULLTEXT_MIN_TOKEN_SIZE]
+    expression = boolean_query(term)
+    if expression is not None:
+        conditions.insert(0, _match(expression))
+    condition = and_(*conditions)
+    term = term.strip()
+    if _BARCODE_LIKE.fullmatch(term):
+        # Word prefixes miss '123' in 'ABC123', so barcode-like input also matches anywhere in the
+        # barcode; this scans the barcode index, which is why plain words don't get it
+        condition = or_(condition, Asset.barcode.contains(term, autoescape=True))
+    return query.filter(condition)
+
+def relevance_order(term: str) -> list:
+    """Exact barcode hits first, then full-text relevance, then id so equal scores page stably"""
+    expression = boolean_query(term)
+    order = [case((Asset.barcode == term, 1), else_=0).desc()]
+    if expression is not None:
+        order.append(_match(expression).desc())
+    return order + [Asset.id]
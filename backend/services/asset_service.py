@@ -1,7 +1,18 @@
 from sqlalchemy.orm import Session
 from typing import List, Optional, Dict, Any
 from models import Asset
-from utils import get_access_scope_for_user, apply_search_filter, apply_filters, paginate_query
+from utils import AccessScope, get_access_scope_for_user, apply_filters, keyset_paginate
+from search import apply_asset_search
+from cache import ASSETS_VERSION, HIERARCHY_VERSION, get_version
+
+# Keyset order of asset lists; the primary key alone keeps pages stable
+ASSET_ORDER = [Asset.id]
+# Asset lists change with asset writes and, through the access scope, with the hierarchy
+ASSET_LIST_VERSIONS = [ASSETS_VERSION, HIERARCHY_VERSION]
+
+def asset_count_key(scope: AccessScope, search: Optional[str], status: Optional[str], category: Optional[str], location: Optional[str]) -> tuple:
+    """utils.cached_count key of an asset list total, shared by the sync and async routes"""
+    return ("assets", scope.fingerprint(), get_version(ASSETS_VERSION), get_version(HIERARCHY_VERSION), search, status, category, location)
 
 class AssetService:
     def __init__(self, db: Session):
@@ -15,17 +26,16 @@ class AssetService:
         search: Optional[str] = None,
         status: Optional[str] = None,
         category: Optional[str] = None,
-        location: Optional[str] = None
+        location: Optional[str] = None,
+        cursor: Optional[str] = None
     ) -> List[Asset]:
         query = self.db.query(Asset)
         # Row-level filtering
         scope = get_access_scope_for_user(self.db, user_id)
-        if not scope['is_admin']:
-            allowed_location_ids = set(scope['location_ids'])
-            query = query.filter(Asset.location.in_(allowed_location_ids))
+        query = query.filter(scope.filter_clause(Asset.location))
         # Apply search
         if search:
-            query = apply_search_filter(query, search, [Asset.name, Asset.barcode, Asset.model])
+            query = apply_asset_search(query, search)
         # Apply filters
         filters = {
             'status': status,
@@ -34,8 +44,7 @@ class AssetService:
         }
         query = apply_filters(query, filters)
         # Apply pagination
-        query = paginate_query(query, skip, limit)
-        return query.all()
+        return keyset_paginate(query, ASSET_ORDER, cursor, skip, limit).all()
 
     def count_assets(
         self,
@@ -48,12 +57,10 @@ class AssetService:
         query = self.db.query(Asset)
         # Row-level filtering
         scope = get_access_scope_for_user(self.db, user_id)
-        if not scope['is_admin']:
-            allowed_location_ids = set(scope['location_ids'])
-            query = query.filter(Asset.location.in_(allowed_location_ids))
+        query = query.filter(scope.filter_clause(Asset.location))
         # Apply search
         if search:
-            query = apply_search_filter(query, search, [Asset.name, Asset.barcode, Asset.model])
+            query = apply_asset_search(query, search)
         # Apply filters
         filters = {
             'status': status,
@@ -1,6 +1,7 @@
 from sqlalchemy.orm import Session
-from models import AssetTransfer, AssetTransferItem, AssetTransferApproval, Location, User, UserRole, UserBranchAssignment, UserRegionAssignment, Branch, Region, Asset
+from models import AssetTransfer, AssetTransferItem, AssetTransferApproval, Location, UserRole, Asset
 from schemas import AssetTransferCreate
+from hierarchy import get_hierarchy
 from datetime import datetime
 import uuid
 
@@ -29,8 +30,9 @@ class AssetTransferService:
             in_transfer = self.db.query(AssetTransferItem).filter(AssetTransferItem.asset_id == asset_id).first()
             if in_transfer:
                 raise Exception(f"Asset {asset_id} is already in another transfer.")
-        source_location = self.db.query(Location).filter(Location.id == transfer_data.source_location_id).first()
-        dest_location = self.db.query(Location).filter(Location.id == transfer_data.destination_location_id).first()
+        hierarchy = get_hierarchy()
+        source_location = self._get_location(hierarchy, transfer_data.source_location_id)
+        dest_location = self._get_location(hierarchy, transfer_data.destination_location_id)
         branch_code = source_location.name.split('-')[1] if source_location and '-' in source_location.name else 'BR'
         transfer_number = self.generate_transfer_number(branch_code)
         transfer = AssetTransfer(
@@ -53,63 +55,44 @@ class AssetTransferService:
             )
             self.db.add(transfer_item)
         # Create approval steps
-        self._create_approval_steps(transfer, source_location, dest_location)
+        self._create_approval_steps(transfer, source_location, dest_location, hierarchy)
         self.db.commit()
         self.db.refresh(transfer)
         return transfer
 
-    def _create_approval_steps(self, transfer, source_location, dest_location):
+    def _get_location(self, hierarchy, location_id):
+        # Locations created since the snapshot was built are read from the database
+        location = hierarchy.locations.get(location_id)
+        if location is None:
+            location = self.db.query(Location).filter(Location.id == location_id).first()
+        return location
+
+    def _create_approval_steps(self, transfer, source_location, dest_location, hierarchy):
         # Always require source controller approval
-        source_controller = self._get_controller_for_location(source_location)
-        if source_controller:
-            self._add_approval(transfer.id, source_controller.id, 'controller')
+        source_controller_id = self._get_controller_for_location(source_location, hierarchy)
+        if source_controller_id:
+            self._add_approval(transfer.id, source_controller_id, 'controller')
         # If different region, require receiving region controller
         if source_location and dest_location and source_location.branch_id != dest_location.branch_id:
-            dest_controller = self._get_controller_for_location(dest_location)
-            if dest_controller:
-                self._add_approval(transfer.id, dest_controller.id, 'receiving_controller')
+            dest_controller_id = self._get_controller_for_location(dest_location, hierarchy)
+            if dest_controller_id:
+                self._add_approval(transfer.id, dest_controller_id, 'receiving_controller')
         # Always require receiving manager approval
-        dest_manager = self._get_manager_for_location(dest_location)
-        if dest_manager:
-            self._add_approval(transfer.id, dest_manager.id, 'receiving_manager')
+        dest_manager_id = self._get_manager_for_location(dest_location, hierarchy)
+        if dest_manager_id:
+            self._add_approval(transfer.id, dest_manager_id, 'receiving_manager')
 
-    def _get_controller_for_location(self, location):
-        # Find the controller for the region of the location's branch
+    def _get_controller_for_location(self, location, hierarchy):
+        # Controller assigned to the region of the location's branch
         if not location or not location.branch_id:
             return None
-        branch = self.db.query(Branch).filter(Branch.id == location.branch_id).first()
-        if not branch:
-            return None
-        region = self.db.query(Region).filter(Region.id == branch.region_id).first()
-        if not region:
-            return None
-        region_assignment = self.db.query(UserRegionAssignment).filter(
-            UserRegionAssignment.region_id == region.id
-        ).first()
-        if region_assignment:
-            user_role = self.db.query(UserRole).filter(
-                UserRole.user_id == region_assignment.user_id,
-                UserRole.role == 'controller'
-            ).first()
-            if user_role:
-                return self.db.query(User).filter(User.id == user_role.user_id).first()
-        return None
+        return hierarchy.controller_for_branch(location.branch_id)
 
-    def _get_manager_for_location(self, location):
-        # Find the manager for the branch of the location
+    def _get_manager_for_location(self, location, hierarchy):
+        # Manager assigned to the branch of the location
         if not location or not location.branch_id:
             return None
-        branch_assignment = self.db.query(UserBranchAssignment).filter(
-            UserBranchAssignment.branch_id == location.branch_id
-        ).first()
-        if branch_assignment:
-            user_role = self.db.query(UserRole).filter(
-                UserRole.user_id == branch_assignment.user_id,
-                UserRole.role == 'manager'
-            ).first()
-            if user_role:
-                return self.db.query(User).filter(User.id == user_role.user_id).first()
-        return None
+        return hierarchy.manager_for_branch(location.branch_id)
 
     def _add_approval(self, transfer_id, approver_id, role):
         approval = AssetTransferApproval(
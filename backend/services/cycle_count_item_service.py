@@ -1,18 +1,22 @@
 from sqlalchemy.orm import Session, selectinload
 from models import CycleCountItem, Asset
 from typing import Optional, Dict, Any, List
+from utils import keyset_paginate, next_cursor
+
+# Keyset order of item lists; the primary key alone keeps pages stable
+ITEM_ORDER = [CycleCountItem.id]
 
 class CycleCountItemService:
     def __init__(self, db: Session):
         self.db = db
 
-    def list_items(self, skip: int = 0, limit: int = 100, task_id: Optional[str] = None) -> Dict[str, Any]:
-        """List items with pagination and optional task_id filter, joined with asset details."""
+    def list_items(self, skip: int = 0, limit: int = 100, task_id: Optional[str] = None, cursor: Optional[str] = None) -> Dict[str, Any]:
+        """List items with skip or cursor pagination and optional task_id filter, joined with asset details."""
         query = self.db.query(CycleCountItem).options(selectinload(CycleCountItem.asset))
         if task_id:
             query = query.filter(CycleCountItem.task_id == task_id)
         total = query.count()
-        items = query.offset(skip).limit(limit).all()
+        items = keyset_paginate(query, ITEM_ORDER, cursor, skip, limit).all()
         # Serialize items with asset details
         result = []
         for item in items:
@@ -23,7 +27,7 @@ class CycleCountItemService:
                 item_dict['asset'] = asset_dict
             item_dict.pop('_sa_instance_state', None)
             result.append(item_dict)
-        return {"items": result, "total": total}
+        return {"items": result, "total": total, "next_cursor": next_cursor(items, ITEM_ORDER, limit)}
 
     def get_item(self, item_id: str) -> Optional[CycleCountItem]:
         """Get a single item by ID."""
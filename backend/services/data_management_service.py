@@ -7,6 +7,7 @@ import csv
 import io
 import uuid
 from datetime import datetime
+from cache import bump_hierarchy_version
 
 class DataManagementService:
     def __init__(self, db: Session):
@@ -250,6 +251,7 @@ class DataManagementService:
                 print(f"DEBUG: Error processing row {i}: {str(e)}")
         try:
             self.db.commit()
+            bump_hierarchy_version()
             print(f"DEBUG: Successfully committed {processed} region/branch rows to database")
         except Exception as e:
             self.db.rollback()
@@ -342,6 +344,7 @@ class DataManagementService:
         # Commit all changes
         try:
             self.db.commit()
+            bump_hierarchy_version()
             print(f"DEBUG: Successfully committed {processed} locations to database")
         except Exception as e:
             self.db.rollback()
@@ -1,5 +1,6 @@
 import logging
 from typing import List, Dict, Any, Optional, Tuple
+from sqlalchemy import func
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import IntegrityError
 from models import Asset, Location, SyncLog, ERPSyncConfig, Branch
@@ -9,6 +10,10 @@ from datetime import datetime
 import oracledb
 import platform
 from config import config
+from cache import bump_hierarchy_version
+from barcode_cache import invalidate_all as invalidate_barcode_cache
+from sync import purge_tombstones
+from snapshots import mark_stale, ALL_BRANCHES
 
 logger = logging.getLogger("uvicorn")
 
@@ -137,6 +142,8 @@ class ERPIntegrationService:
         except Exception as e:
             logger.error(f"Error updating location: {str(e)}")
             self.db.rollback()
+            # Rows updated before the failure were already committed
+            bump_hierarchy_version()
             return ERPAssetResponse(
                 success=False,
                 message=f"Error updating location: {str(e)}",
@@ -144,6 +151,7 @@ class ERPIntegrationService:
             )
             
         self.db.commit()
+        bump_hierarchy_version()
         logger.info(f"Successfully synced {len(rows)} locations from Oracle ERP")
         return ERPAssetResponse(
             success=True,
@@ -344,8 +352,9 @@ class ERPIntegrationService:
                 existing_asset.location = location.id
                 existing_asset.category = erp_asset.category
                 existing_asset.erp_asset_id = erp_asset.erp_asset_id
-                existing_asset.updated_at = datetime.utcnow()
-                existing_asset.synced_at = datetime.utcnow()
+                # Database clock, like the change feed window (sync.py) that reads updated_at
+                existing_asset.updated_at = func.now()
+                existing_asset.synced_at = func.now()
                 
                 self.db.commit()
                 logger.info(f"Updated asset with barcode: {erp_asset.barcode}")
@@ -362,8 +371,8 @@ class ERPIntegrationService:
                     location=location.id,
                     category=erp_asset.category,                    
                     status='active',
-                    synced_at=datetime.utcnow(),
-                    updated_at=datetime.utcnow()
+                    synced_at=func.now(),
+                    updated_at=func.now()
                 )
                 
                 self.db.add(new_asset)
@@ -455,6 +464,11 @@ class ERPIntegrationService:
                     errors.append(error_msg)
                     logger.error(error_msg)
 
+            # Each commit already dropped its barcodes; this also clears other workers' in-process copies
+            invalidate_barcode_cache()
+            purge_tombstones(self.db)
+            mark_stale([ALL_BRANCHES])
+
             # Update last sync date
             self.update_last_sync_date(current_sync_date, 'asset_sync')
 
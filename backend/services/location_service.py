@@ -2,49 +2,68 @@ from sqlalchemy.orm import Session
 from sqlalchemy.exc import IntegrityError
 from fastapi import HTTPException
 from typing import List, Dict, Any, Optional
-from models import Country, Region, Branch, Location, UserCountryAssignment, UserRegionAssignment, UserBranchAssignment, UserRole, Profile
+from models import Country, Region, Branch, Location, UserRole, Profile
 import uuid
-from utils import get_access_scope_for_user
+from utils import AccessScope, get_access_scope_for_user, keyset_paginate, next_cursor, count_rows, cached_count
+from cache import bump_hierarchy_version, get_version, HIERARCHY_VERSION
+from hierarchy import get_hierarchy
+
+# Keyset order of the location list, served by the unique index on name
+LOCATION_ORDER = [Location.name, Location.id]
+
+def location_count_key(scope: Optional[AccessScope], branch_id: Optional[str], search: Optional[str]) -> tuple:
+    """utils.cached_count key of a location list total, shared by the sync and async routes"""
+    return ('locations', scope.fingerprint('location') if scope else 'all', get_version(HIERARCHY_VERSION), branch_id, search)
 
 class LocationService:
     def __init__(self, db: Session):
         self.db = db
 
-    # Country CRUD
-    def list_countries(self, user_id: Optional[str] = None) -> List[Dict[str, Any]]:
-        if user_id:
+    def _assigned_users(self, assignments_by_node: Dict[str, tuple]) -> Dict[str, List[Dict[str, Any]]]:
+        """Resolve snapshot assignments to users, loading roles and profiles in one query each"""
+        user_ids = {a.user_id for assigned in assignments_by_node.values() for a in assigned}
+        roles, profiles = {}, {}
+        if user_ids:
+            roles = {r.user_id: r.role for r in self.db.query(UserRole).filter(UserRole.user_id.in_(user_ids))}
+            profiles = {p.id: p.display_name for p in self.db.query(Profile).filter(Profile.id.in_(user_ids))}
+        return {
+            node_id: [
+                {
+                    'user_id': a.user_id,
+                    'role': roles[a.user_id],
+                    'display_name': profiles[a.user_id],
+                    'assignment_id': a.id
+                }
+                for a in assigned
+                if a.user_id in roles and a.user_id in profiles
+            ]
+            for node_id, assigned in assignments_by_node.items()
+        }
+
+    def _resolve_scope(self, user_id: Optional[str], scope: Optional[AccessScope]) -> Optional[AccessScope]:
+        # Callers holding a request principal pass its scope; others only pass a user_id
+        if scope is None and user_id:
             scope = get_access_scope_for_user(self.db, user_id)
-            if not scope['is_admin']:
-                allowed_ids = set(scope['country_ids'])
-                countries = self.db.query(Country).filter(Country.id.in_(allowed_ids)).order_by(Country.name).all()
-            else:
-                countries = self.db.query(Country).order_by(Country.name).all()
+        return scope
+
+    # Country CRUD
+    def list_countries(self, user_id: Optional[str] = None, scope: Optional[AccessScope] = None) -> List[Dict[str, Any]]:
+        scope = self._resolve_scope(user_id, scope)
+        if scope is not None:
+            countries = self.db.query(Country).filter(scope.filter_clause(Country.id, 'country')).order_by(Country.name).all()
         else:
             countries = self.db.query(Country).order_by(Country.name).all()
         
+        hierarchy = get_hierarchy()
+        assigned_users = self._assigned_users({c.id: hierarchy.country_assignments.get(c.id, ()) for c in countries})
         result = []
         for country in countries:
-            # Get assigned users for this country
-            assignments = self.db.query(UserCountryAssignment).filter(UserCountryAssignment.country_id == country.id).all()
-            assigned_users = []
-            
-            for assignment in assignments:
-                user_role = self.db.query(UserRole).filter(UserRole.user_id == assignment.user_id).first()
-                profile = self.db.query(Profile).filter(Profile.id == assignment.user_id).first()
-                if user_role and profile:
-                    assigned_users.append({
-                        'user_id': assignment.user_id,
-                        'role': user_role.role,
-                        'display_name': profile.display_name,
-                        'assignment_id': assignment.id
-                    })
-            
             result.append({
                 'id': country.id,
                 'name': country.name,
                 'code': country.code,
                 'accounting_manager_id': country.accounting_manager_id,
-                'assigned_users': assigned_users,
+                'assigned_users': assigned_users[country.id],
                 'created_at': country.created_at,
                 'updated_at': country.updated_at,
             })
@@ -58,6 +77,7 @@ class LocationService:
         self.db.add(country)
         try:
             self.db.commit()
+            bump_hierarchy_version()
             self.db.refresh(country)
         except IntegrityError:
             self.db.rollback()
@@ -78,6 +98,7 @@ class LocationService:
             setattr(country, k, v)
         try:
             self.db.commit()
+            bump_hierarchy_version()
             self.db.refresh(country)
         except IntegrityError:
             self.db.rollback()
@@ -97,51 +118,39 @@ class LocationService:
         self.db.delete(country)
         try:
             self.db.commit()
+            bump_hierarchy_version()
         except IntegrityError:
             self.db.rollback()
             raise HTTPException(status_code=400, detail='Failed to delete country')
         return {'ok': True, 'id': country_id}
 
     # Region CRUD
-    def list_regions(self, user_id: Optional[str] = None, country_id: Optional[str] = None) -> List[Dict[str, Any]]:
+    def list_regions(self, user_id: Optional[str] = None, country_id: Optional[str] = None, scope: Optional[AccessScope] = None) -> List[Dict[str, Any]]:
         q = self.db.query(Region).join(Country, Region.country_id == Country.id)
         if country_id:
             q = q.filter(Region.country_id == country_id)
-        if user_id:
-            scope = get_access_scope_for_user(self.db, user_id)
-            if not scope['is_admin']:
-                allowed_ids = set(scope['region_ids'])
-                q = q.filter(Region.id.in_(allowed_ids))
+        scope = self._resolve_scope(user_id, scope)
+        if scope is not None:
+            q = q.filter(scope.filter_clause(Region.id, 'region'))
         
         regions = q.order_by(Region.name).all()
+        hierarchy = get_hierarchy()
+        assigned_users = self._assigned_users({r.id: hierarchy.region_assignments.get(r.id, ()) for r in regions})
         result = []
         
         for region in regions:
-            # Get assigned users for this region
-            assignments = self.db.query(UserRegionAssignment).filter(UserRegionAssignment.region_id == region.id).all()
-            assigned_users = []
-            
-            for assignment in assignments:
-                user_role = self.db.query(UserRole).filter(UserRole.user_id == assignment.user_id).first()
-                profile = self.db.query(Profile).filter(Profile.id == assignment.user_id).first()
-                if user_role and profile:
-                    assigned_users.append({
-                        'user_id': assignment.user_id,
-                        'role': user_role.role,
-                        'display_name': profile.display_name,
-                        'assignment_id': assignment.id
-                    })
-            
+            # Parents come from the hierarchy snapshot, rows newer than the snapshot fall back to the relationship
+            country = hierarchy.countries.get(region.country_id) or region.country
             result.append({
                 'id': region.id,
                 'name': region.name,
                 'country_id': region.country_id,
                 'country': {
-                    'id': region.country.id,
-                    'name': region.country.name,
-                    'code': region.country.code,
+                    'id': country.id,
+                    'name': country.name,
+                    'code': country.code,
                 },
-                'assigned_users': assigned_users,
+                'assigned_users': assigned_users[region.id],
                 'created_at': region.created_at,
                 'updated_at': region.updated_at,
             })
@@ -153,6 +162,7 @@ class LocationService:
         self.db.add(region)
         try:
             self.db.commit()
+            bump_hierarchy_version()
             self.db.refresh(region)
             # Get the country information
             country = self.db.query(Country).filter(Country.id == country_id).first()
@@ -180,6 +190,7 @@ class LocationService:
             setattr(region, k, v)
         try:
             self.db.commit()
+            bump_hierarchy_version()
             self.db.refresh(region)
             # Get the country information
             country = self.db.query(Country).filter(Country.id == region.country_id).first()
@@ -206,61 +217,51 @@ class LocationService:
         self.db.delete(region)
         try:
             self.db.commit()
+            bump_hierarchy_version()
         except IntegrityError:
             self.db.rollback()
             raise HTTPException(status_code=400, detail='Failed to delete region')
         return {'ok': True, 'id': region_id}
 
     # Branch CRUD
-    def list_branches(self, user_id: Optional[str] = None, region_id: Optional[str] = None, search: Optional[str] = None, skip: int = 0, limit: int = 50) -> Dict[str, Any]:
+    def list_branches(self, user_id: Optional[str] = None, region_id: Optional[str] = None, search: Optional[str] = None, skip: int = 0, limit: int = 50, scope: Optional[AccessScope] = None) -> Dict[str, Any]:
         q = self.db.query(Branch).join(Region, Branch.region_id == Region.id).join(Country, Region.country_id == Country.id)
         if region_id:
             q = q.filter(Branch.region_id == region_id)
         if search:
             q = q.filter(Branch.name.ilike(f'%{search}%'))
-        if user_id:
-            scope = get_access_scope_for_user(self.db, user_id)
-            if not scope['is_admin']:
-                allowed_ids = set(scope['branch_ids'])
-                q = q.filter(Branch.id.in_(allowed_ids))
+        scope = self._resolve_scope(user_id, scope)
+        if scope is not None:
+            q = q.filter(scope.filter_clause(Branch.id, 'branch'))
         
-        # Get total count
-        total = q.count()
+        # Branches only change with a hierarchy version bump, so the cached total is exact
+        key = ('branches', scope.fingerprint('branch') if scope else 'all', get_version(HIERARCHY_VERSION), region_id, search)
+        total, _ = cached_count(key, lambda: count_rows(q, Branch.id))
         
         # Apply pagination
         branches = q.order_by(Branch.name).offset(skip).limit(limit).all()
+        hierarchy = get_hierarchy()
+        assigned_users = self._assigned_users({b.id: hierarchy.branch_assignments.get(b.id, ()) for b in branches})
         result = []
         
         for branch in branches:
-            # Get assigned users for this branch
-            assignments = self.db.query(UserBranchAssignment).filter(UserBranchAssignment.branch_id == branch.id).all()
-            assigned_users = []
-            
-            for assignment in assignments:
-                user_role = self.db.query(UserRole).filter(UserRole.user_id == assignment.user_id).first()
-                profile = self.db.query(Profile).filter(Profile.id == assignment.user_id).first()
-                if user_role and profile:
-                    assigned_users.append({
-                        'user_id': assignment.user_id,
-                        'role': user_role.role,
-                        'display_name': profile.display_name,
-                        'assignment_id': assignment.id
-                    })
-            
+            # Parents come from the hierarchy snapshot, rows newer than the snapshot fall back to the relationship
+            region = hierarchy.regions.get(branch.region_id) or branch.region
+            country = hierarchy.countries.get(region.country_id) or branch.region.country
             result.append({
                 'id': branch.id,
                 'name': branch.name,
                 'region_id': branch.region_id,
                 'region': {
-                    'id': branch.region.id,
-                    'name': branch.region.name,
+                    'id': region.id,
+                    'name': region.name,
                 },
                 'country': {
-                    'id': branch.region.country.id,
-                    'name': branch.region.country.name,
-                    'code': branch.region.country.code,
+                    'id': country.id,
+                    'name': country.name,
+                    'code': country.code,
                 },
-                'assigned_users': assigned_users,
+                'assigned_users': assigned_users[branch.id],
                 'created_at': branch.created_at,
                 'updated_at': branch.updated_at,
             })
@@ -277,6 +278,7 @@ class LocationService:
         self.db.add(branch)
         try:
             self.db.commit()
+            bump_hierarchy_version()
             self.db.refresh(branch)
             # Get the region and country information
             region = self.db.query(Region).filter(Region.id == region_id).first()
@@ -309,6 +311,7 @@ class LocationService:
             setattr(branch, k, v)
         try:
             self.db.commit()
+            bump_hierarchy_version()
             self.db.refresh(branch)
             # Get the region and country information
             region = self.db.query(Region).filter(Region.id == branch.region_id).first()
@@ -340,28 +343,27 @@ class LocationService:
         self.db.delete(branch)
         try:
             self.db.commit()
+            bump_hierarchy_version()
         except IntegrityError:
             self.db.rollback()
             raise HTTPException(status_code=400, detail='Failed to delete branch')
         return {'ok': True, 'id': branch_id}
 
-    def list_locations(self, user_id: Optional[str] = None, branch_id: Optional[str] = None, search: Optional[str] = None, skip: int = 0, limit: int = 50) -> Dict[str, Any]:
+    def list_locations(self, user_id: Optional[str] = None, branch_id: Optional[str] = None, search: Optional[str] = None, skip: int = 0, limit: int = 50, scope: Optional[AccessScope] = None, cursor: Optional[str] = None) -> Dict[str, Any]:
         q = self.db.query(Location)
         if branch_id:
             q = q.filter(Location.branch_id == branch_id)
         if search:
             q = q.filter(Location.name.ilike(f'%{search}%'))
-        if user_id:
-            scope = get_access_scope_for_user(self.db, user_id)
-            if not scope['is_admin']:
-                allowed_ids = set(scope['location_ids'])
-                q = q.filter(Location.id.in_(allowed_ids))
+        scope = self._resolve_scope(user_id, scope)
+        if scope is not None:
+            q = q.filter(scope.filter_clause(Location.id, 'location'))
         
-        # Get total count
-        total = q.count()
+        # Locations only change with a hierarchy version bump, so the cached total is exact
+        total, _ = cached_count(location_count_key(scope, branch_id, search), lambda: count_rows(q, Location.id))
         
         # Apply pagination
-        locations = q.order_by(Location.name).offset(skip).limit(limit).all()
+        locations = keyset_paginate(q, LOCATION_ORDER, cursor, skip, limit).all()
         result = [
             {
                 'id': l.id,
@@ -379,7 +381,8 @@ class LocationService:
             'items': result,
             'total': total,
             'skip': skip,
-            'limit': limit
+            'limit': limit,
+            'next_cursor': next_cursor(locations, LOCATION_ORDER, limit)
         }
 
     def create_location(self, name: str, description: Optional[str] = None, erp_location_id: Optional[str] = None, branch_id: Optional[str] = None) -> Dict[str, Any]:
@@ -393,6 +396,7 @@ class LocationService:
         self.db.add(location)
         try:
             self.db.commit()
+            bump_hierarchy_version()
             self.db.refresh(location)
         except IntegrityError:
             self.db.rollback()
@@ -415,6 +419,7 @@ class LocationService:
             setattr(location, k, v)
         try:
             self.db.commit()
+            bump_hierarchy_version()
             self.db.refresh(location)
         except IntegrityError:
             self.db.rollback()
@@ -436,6 +441,7 @@ class LocationService:
         self.db.delete(location)
         try:
             self.db.commit()
+            bump_hierarchy_version()
         except IntegrityError:
             self.db.rollback()
             raise HTTPException(status_code=400, detail='Failed to delete location')
@@ -4,6 +4,7 @@ from fastapi import HTTPException
 from typing import List, Dict, Any
 from models import UserCountryAssignment, UserRegionAssignment, UserBranchAssignment, Country, Region, Branch, UserRole, Profile
 import uuid
+from cache import bump_hierarchy_version
 
 class UserAssignmentService:
     def __init__(self, db: Session):
@@ -74,6 +75,7 @@ class UserAssignmentService:
         self.db.add(assignment)
         try:
             self.db.commit()
+            bump_hierarchy_version()
             self.db.refresh(assignment)
         except IntegrityError:
             self.db.rollback()
@@ -94,6 +96,7 @@ class UserAssignmentService:
         self.db.delete(assignment)
         try:
             self.db.commit()
+            bump_hierarchy_version()
         except IntegrityError:
             self.db.rollback()
             raise HTTPException(status_code=400, detail='Failed to remove assignment')
@@ -153,6 +156,7 @@ class UserAssignmentService:
         self.db.add(assignment)
         try:
             self.db.commit()
+            bump_hierarchy_version()
             self.db.refresh(assignment)
         except IntegrityError:
             self.db.rollback()
@@ -173,6 +177,7 @@ class UserAssignmentService:
         self.db.delete(assignment)
         try:
             self.db.commit()
+            bump_hierarchy_version()
         except IntegrityError:
             self.db.rollback()
             raise HTTPException(status_code=400, detail='Failed to remove assignment')
@@ -237,6 +242,7 @@ class UserAssignmentService:
         self.db.add(assignment)
         try:
             self.db.commit()
+            bump_hierarchy_version()
             self.db.refresh(assignment)
         except IntegrityError:
             self.db.rollback()
@@ -257,6 +263,7 @@ class UserAssignmentService:
         self.db.delete(assignment)
         try:
             self.db.commit()
+            bump_hierarchy_version()
         except IntegrityError:
             self.db.rollback()
             raise HTTPException(status_code=400, detail='Failed to remove assignment')
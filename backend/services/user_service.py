@@ -3,8 +3,9 @@ from sqlalchemy.exc import IntegrityError
 from fastapi import HTTPException
 from typing import List, Optional, Dict, Any
 from models import User, UserRole, Profile
-from auth import get_password_hash
+from auth import get_password_hash, invalidate_user_tokens
 import uuid
+from cache import bump_hierarchy_version
 
 class UserService:
     def __init__(self, db: Session):
@@ -134,6 +135,14 @@ class UserService:
             self.db.rollback()
             raise HTTPException(status_code=400, detail="Failed to update user")
         
+        # Roles decide which part of the hierarchy a user can see
+        if 'role' in kwargs and kwargs['role'] is not None:
+            bump_hierarchy_version()
+        # Lock, unlock, password and role changes must not wait for cached tokens to expire;
+        # email and display name edits leave the user signed in
+        if any(kwargs.get(field) is not None for field in ('is_active', 'password', 'role')):
+            invalidate_user_tokens(user_id)
+        
         return {"ok": True, "user_id": user_id}
 
     def delete_user(self, user_id: str) -> Dict[str, Any]:
@@ -153,6 +162,9 @@ class UserService:
             self.db.rollback()
             raise HTTPException(status_code=400, detail="Failed to delete user")
         
+        bump_hierarchy_version()
+        invalidate_user_tokens(user_id)
+        
         return {"ok": True, "user_id": user_id}
 
     def lock_user(self, user_id: str) -> Dict[str, Any]:
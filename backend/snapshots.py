@@ -0,0 +1,274 @@
+import glob
+import gzip
+import hashlib
+import itertools
+import json
+import logging
+import os
+import shutil
+import sqlite3
+import tempfile
+import time
+from contextlib import closing
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional
+import redis
+from sqlalchemy import Integer, event, func, select
+from sqlalchemy.orm import Session, attributes
+from config import config
+from cache import get_redis
+from db import SessionLocal
+from hierarchy import get_hierarchy
+from models import Asset, Branch, Category, Location
+from utils import AccessScope
+
+logger = logging.getLogger("uvicorn")
+
+# Offline snapshot packs: per branch, a gzip-compressed SQLite file with the branch's assets and
+# locations and all categories, for the first load of a device. The change feed (sync.py) takes
+# over from the pack's synced_until. Packs are rebuilt by Celery (tasks/snapshot_tasks.py) after
+# ERP syncs and, debounced, after commits touching the branch.
+
+TABLES = {
+    "assets": [
+        Asset.id, Asset.erp_asset_id, Asset.name, Asset.barcode, Asset.model, Asset.build, Asset.category,
+        Asset.location, Asset.status, Asset.last_seen, Asset.created_at, Asset.updated_at, Asset.synced_at,
+    ],
+    "locations": [Location.id, Location.name, Location.description, Location.erp_location_id, Location.branch_id],
+    "categories": [Category.id, Category.name, Category.description],
+}
+INDEXES = [
+    "CREATE INDEX ix_assets_barcode ON assets (barcode COLLATE NOCASE)",
+    "CREATE INDEX ix_assets_location ON assets (location)",
+]
+# Bumped when the layout of the SQLite file changes
+FORMAT_VERSION = 1
+BATCH_SIZE = 1000
+
+# Branches waiting for a rebuild; ALL_BRANCHES stands for every branch
+STALE_KEY = "snapshots:stale"
+SCHEDULED_KEY = "snapshots:scheduled"
+ALL_BRANCHES = "*"
+
+def _pack_glob(branch_id: str) -> str:
+    return os.path.join(config.SNAPSHOT_DIR, f"branch-{branch_id}-*.sqlite.gz")
+
+def _meta_path(branch_id: str) -> str:
+    return os.path.join(config.SNAPSHOT_DIR, f"branch-{branch_id}.json")
+
+def _sqlite_value(value: Any):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+def _create_table(out: sqlite3.Connection, table: str, columns: list):
+    definitions = [
+        f"{column.key} {'INTEGER' if isinstance(column.type, Integer) else 'TEXT'}{' PRIMARY KEY' if column.expression.primary_key else ''}"
+        for column in columns
+    ]
+    out.execute(f"CREATE TABLE {table} ({', '.join(definitions)})")
+
+def _copy(db: Session, out: sqlite3.Connection, table: str, statement) -> int:
+    insert = f"INSERT INTO {table} VALUES ({', '.join('?' * len(TABLES[table]))})"
+    copied = 0
+    result = db.execute(statement.execution_options(stream_results=True, yield_per=BATCH_SIZE))
+    for rows in result.partitions():
+        out.executemany(insert, [tuple(_sqlite_value(value) for value in row) for row in rows])
+        copied += len(rows)
+    return copied
+
+def _compress(source: str, target: str) -> str:
+    """gzip source into target and return the sha1 of the compressed bytes"""
+    digest = hashlib.sha1()
+    with open(source, "rb") as src, open(target, "wb") as raw:
+        # mtime=0 so identical data packs to identical bytes
+        with gzip.GzipFile(filename="", mode="wb", fileobj=raw, compresslevel=9, mtime=0) as dst:
+            shutil.copyfileobj(src, dst, 1024 * 1024)
+    with open(target, "rb") as packed:
+        for chunk in iter(lambda: packed.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def _write_meta(branch_id: str, meta: Dict[str, Any]):
+    fd, path = tempfile.mkstemp(suffix=".json", dir=config.SNAPSHOT_DIR)
+    with os.fdopen(fd, "w") as f:
+        json.dump(meta, f)
+    os.replace(path, _meta_path(branch_id))
+
+def _remove_old_packs(branch_id: str, current: str):
+    # The previous pack stays for downloads still in flight
+    packs = sorted(glob.glob(_pack_glob(branch_id)), key=os.path.getmtime, reverse=True)
+    for path in [path for path in packs if os.path.basename(path) != current][1:]:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+def build_branch_snapshot(branch_id: str) -> Optional[Dict[str, Any]]:
+    """Build the pack of a branch and make it the one served; returns its metadata, None for an unknown branch"""
+    os.makedirs(config.SNAPSHOT_DIR, exist_ok=True)
+    started = time.perf_counter()
+    fd, sqlite_path = tempfile.mkstemp(suffix=".sqlite", dir=config.SNAPSHOT_DIR)
+    os.close(fd)
+    packed_path = sqlite_path + ".gz"
+    db = SessionLocal()
+    try:
+        # The first statement opens the transaction, so every table below is read from the same
+        # consistent snapshot, and changes after synced_until are left to the change feed
+        synced_until = db.scalar(select(func.now())) - timedelta(seconds=config.SYNC_SETTLE_SECONDS)
+        if db.scalar(select(Branch.id).where(Branch.id == branch_id)) is None:
+            return None
+        # From the database rather than the process's hierarchy snapshot, which may not have caught up
+        # with a location created or moved just before this build
+        location_ids = list(db.scalars(select(Location.id).where(Location.branch_id == branch_id)))
+        statements = {
+            "assets": select(*TABLES["assets"]).where(Asset.location.in_(location_ids)).order_by(Asset.id),
+            "locations": select(*TABLES["locations"]).where(Location.branch_id == branch_id).order_by(Location.id),
+            "categories": select(*TABLES["categories"]).order_by(Category.id),
+        }
+        counts = {}
+        with closing(sqlite3.connect(sqlite_path)) as out:
+            for table, columns in TABLES.items():
+                _create_table(out, table, columns)
+                counts[table] = _copy(db, out, table, statements[table])
+            for index in INDEXES:
+                out.execute(index)
+            out.execute("CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT)")
+            out.executemany("INSERT INTO meta VALUES (?, ?)", [
+                ("format_version", str(FORMAT_VERSION)),
+                ("branch_id", branch_id),
+                ("synced_until", synced_until.isoformat()),
+            ])
+            out.commit()
+        digest = _compress(sqlite_path, packed_path)
+        file_name = f"branch-{branch_id}-{digest[:16]}.sqlite.gz"
+        os.replace(packed_path, os.path.join(config.SNAPSHOT_DIR, file_name))
+    finally:
+        db.close()
+        for path in (sqlite_path, packed_path):
+            if os.path.exists(path):
+                os.remove(path)
+
+    meta = {
+        "branch_id": branch_id,
+        "file": file_name,
+        "etag": f'"{digest}"',
+        "size": os.path.getsize(os.path.join(config.SNAPSHOT_DIR, file_name)),
+        "format_version": FORMAT_VERSION,
+        "built_at": datetime.utcnow().isoformat(),
+        "synced_until": synced_until.isoformat(),
+        # Fingerprint of a scope holding exactly the pack's locations, see routes_snapshots
+        "scope_fingerprint": AccessScope(False, {"location_ids": location_ids}).fingerprint(),
+        "counts": counts,
+    }
+    _write_meta(branch_id, meta)
+    _remove_old_packs(branch_id, file_name)
+    logger.info(f"Built snapshot of branch {branch_id}: {counts['assets']} assets, {meta['size']} bytes in {time.perf_counter() - started:.2f}s")
+    return meta
+
+def build_snapshots(branch_ids: Optional[Iterable[str]] = None) -> int:
+    """Rebuild the packs of the given branches, or of every branch; returns how many were built"""
+    if branch_ids is None:
+        db = SessionLocal()
+        try:
+            branch_ids = list(db.scalars(select(Branch.id)))
+        finally:
+            db.close()
+    branch_ids = list(branch_ids)
+    built = 0
+    for branch_id in branch_ids:
+        try:
+            if build_branch_snapshot(branch_id):
+                built += 1
+        except Exception as e:
+            logger.error(f"Failed to build snapshot of branch {branch_id}: {str(e)}")
+    return built
+
+def get_pack(branch_id: str) -> Optional[Dict[str, Any]]:
+    """Metadata of the current pack of a branch, with its path; None until one was built"""
+    try:
+        with open(_meta_path(branch_id)) as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return None
+    meta["path"] = os.path.join(config.SNAPSHOT_DIR, meta["file"])
+    return meta if os.path.exists(meta["path"]) else None
+
+def mark_stale(branch_ids: Iterable[str]):
+    """Queue a rebuild of the branches; commits within SNAPSHOT_REBUILD_DELAY_SECONDS share one run"""
+    branch_ids = set(branch_ids)
+    client = get_redis()
+    if not branch_ids or client is None:
+        return
+    try:
+        client.sadd(STALE_KEY, *branch_ids)
+        # Expires on its own in case the scheduled run is lost
+        if client.set(SCHEDULED_KEY, 1, nx=True, ex=config.SNAPSHOT_REBUILD_DELAY_SECONDS + 600):
+            from tasks.snapshot_tasks import build_stale_snapshots_task
+            build_stale_snapshots_task.apply_async(countdown=config.SNAPSHOT_REBUILD_DELAY_SECONDS)
+    # Runs after commit: a broker or Redis failure must not fail the request that wrote the data
+    except Exception as e:
+        logger.warning(f"Failed to schedule snapshot rebuild of {len(branch_ids)} branches: {str(e)}")
+
+def take_stale() -> Optional[List[str]]:
+    """Branches marked stale since the last run, None for all of them"""
+    client = get_redis()
+    if client is None:
+        return []
+    try:
+        # Marks from here on schedule the next run
+        client.delete(SCHEDULED_KEY)
+        pipeline = client.pipeline()
+        pipeline.smembers(STALE_KEY)
+        pipeline.delete(STALE_KEY)
+        stale, _ = pipeline.execute()
+    except redis.RedisError as e:
+        logger.warning(f"Failed to read stale snapshots: {str(e)}")
+        return []
+    stale = {branch_id.decode() if isinstance(branch_id, bytes) else branch_id for branch_id in stale}
+    return None if ALL_BRANCHES in stale else sorted(stale)
+
+# Locations (for assets) and branches touched by each commit, resolved to branches after it
+@event.listens_for(Session, "after_flush")
+def _collect_changes(session, flush_context):
+    changes = session.info.setdefault("snapshot_changes", set())
+    for obj in itertools.chain(session.new, session.dirty, session.deleted):
+        if isinstance(obj, Asset):
+            history = attributes.get_history(obj, "location")
+            changes.update(("location", location) for location in itertools.chain(*history) if location)
+        elif isinstance(obj, Location):
+            history = attributes.get_history(obj, "branch_id")
+            changes.update(("branch", branch_id) for branch_id in itertools.chain(*history) if branch_id)
+        elif isinstance(obj, Category):
+            changes.add(("branch", ALL_BRANCHES))
+
+@event.listens_for(Session, "after_commit")
+def _mark_committed(session):
+    changes = session.info.pop("snapshot_changes", None)
+    if not changes:
+        return
+    locations = get_hierarchy().locations
+    branch_ids = set()
+    unknown = set()
+    for kind, object_id in changes:
+        if kind == "branch":
+            branch_ids.add(object_id)
+        elif object_id in locations:
+            if locations[object_id].branch_id:
+                branch_ids.add(locations[object_id].branch_id)
+        else:
+            unknown.add(object_id)
+    # Locations newer than this process's hierarchy snapshot
+    if unknown:
+        db = SessionLocal()
+        try:
+            branch_ids.update(branch_id for branch_id in db.scalars(
+                select(Location.branch_id).where(Location.id.in_(unknown), Location.branch_id.isnot(None))
+            ))
+        finally:
+            db.close()
+    mark_stale(branch_ids)
+
+@event.listens_for(Session, "after_rollback")
+def _discard_uncommitted(session):
+    session.info.pop("snapshot_changes", None)
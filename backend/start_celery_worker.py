@@ -12,6 +12,9 @@ from pathlib import Path
 backend_dir = Path(__file__).parent
 sys.path.insert(0, str(backend_dir))
 
+# Use the Celery connection pool defaults
+os.environ.setdefault("PROCESS_TYPE", "celery")
+
 from celery_app import celery_app
 
 if __name__ == "__main__":
@@ -20,6 +23,6 @@ if __name__ == "__main__":
         "worker",
         "--loglevel=info",
         "--concurrency=1",  # Single worker process for ERP tasks
-        "--queues=erp_sync",  # Only process ERP sync tasks
+        "--queues=erp_sync,snapshots",  # ERP sync tasks and the snapshot packs rebuilt after them
         "--hostname=erp_worker@%h"  # Unique worker name
     ]) 
\ No newline at end of file
@@ -0,0 +1,106 @@
+import logging
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+from fastapi import HTTPException
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+from config import config
+from models import Asset, AssetTombstone
+from utils import AccessScope, encode_cursor, decode_cursor, keyset_paginate
+
+logger = logging.getLogger("uvicorn")
+
+# Asset change feed for mobile clients. A sync token holds
+#   [since, until, asset cursor, tombstone cursor, access scope fingerprint]
+# and a sync returns what changed in [since, until), a page at a time. until lags the database clock
+# by SYNC_SETTLE_SECONDS, so rows of transactions still committing land in the next sync instead of
+# behind the token.
+
+CHANGE_ORDER = [Asset.updated_at, Asset.id]
+TOMBSTONE_ORDER = [AssetTombstone.removed_at, AssetTombstone.id]
+
+def _parse_time(value: Optional[str]) -> Optional[datetime]:
+    if value is None:
+        return None
+    try:
+        return datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        raise HTTPException(status_code=400, detail="Invalid sync token")
+
+def _last_key(rows: list, order_by: list, previous: Optional[str]) -> Optional[str]:
+    # A stream that ran dry keeps its cursor, so the next page does not start it over
+    if not rows:
+        return previous
+    return encode_cursor([getattr(rows[-1], column.key) for column in order_by])
+
+def sync_token(scope: AccessScope, since: datetime) -> str:
+    """Token that makes the next sync start at `since`, e.g. the synced_until of a snapshot pack"""
+    return encode_cursor([since, None, None, None, scope.fingerprint()])
+
+def get_changes(db: Session, scope: AccessScope, token: Optional[str], limit: int) -> Dict[str, Any]:
+    """
+    Assets created or changed in the scope since the token, and tombstones of those deleted or moved out of it.
+    Without a token every asset in the scope is returned, which is the initial download.
+    """
+    now = db.scalar(select(func.now()))
+    if token:
+        values = decode_cursor(token, 5)
+        since, until = _parse_time(values[0]), _parse_time(values[1])
+        asset_cursor, tombstone_cursor, fingerprint = values[2:]
+        # Assets of locations that just entered the scope did not change, so only a full download brings them
+        if fingerprint != scope.fingerprint():
+            raise HTTPException(status_code=410, detail="Access scope changed since the last sync, download all assets again")
+        if since is not None and since < now - timedelta(days=config.SYNC_TOMBSTONE_RETENTION_DAYS):
+            raise HTTPException(status_code=410, detail="Sync token expired, download all assets again")
+    else:
+        since = until = asset_cursor = tombstone_cursor = None
+    # Fixed by the first page of a sync and carried by the tokens of the following ones
+    if until is None:
+        until = now - timedelta(seconds=config.SYNC_SETTLE_SECONDS)
+
+    query = db.query(Asset).filter(scope.filter_clause(Asset.location), Asset.updated_at < until)
+    if since is not None:
+        query = query.filter(Asset.updated_at >= since)
+    assets = keyset_paginate(query, CHANGE_ORDER, asset_cursor, limit=limit).all()
+
+    tombstones = []
+    # The initial download has nothing to remove
+    if since is not None:
+        query = db.query(AssetTombstone).filter(
+            scope.filter_clause(AssetTombstone.location),
+            AssetTombstone.removed_at >= since,
+            AssetTombstone.removed_at < until,
+            # Moved within the scope, or back into it: the asset is current and sent as a change instead
+            AssetTombstone.asset_id.not_in(select(Asset.id).where(scope.filter_clause(Asset.location))),
+        )
+        tombstones = keyset_paginate(query, TOMBSTONE_ORDER, tombstone_cursor, limit=limit).all()
+
+    has_more = len(assets) == limit or len(tombstones) == limit
+    if has_more:
+        token = encode_cursor([
+            since,
+            until,
+            _last_key(assets, CHANGE_ORDER, asset_cursor),
+            _last_key(tombstones, TOMBSTONE_ORDER, tombstone_cursor),
+            scope.fingerprint(),
+        ])
+    else:
+        token = sync_token(scope, until)
+    return {
+        "assets": assets,
+        "removed": [
+            {"id": tombstone.asset_id, "reason": tombstone.reason, "removed_at": tombstone.removed_at}
+            for tombstone in tombstones
+        ],
+        "token": token,
+        "has_more": has_more,
+    }
+
+def purge_tombstones(db: Session) -> int:
+    """Drop tombstones past SYNC_TOMBSTONE_RETENTION_DAYS; tokens that old are refused anyway"""
+    cutoff = db.scalar(select(func.now())) - timedelta(days=config.SYNC_TOMBSTONE_RETENTION_DAYS)
+    purged = db.query(AssetTombstone).filter(AssetTombstone.removed_at < cutoff).delete(synchronize_session=False)
+    db.commit()
+    if purged:
+        logger.info(f"Purged {purged} asset tombstones older than {cutoff}")
+    return purged
@@ -4,6 +4,9 @@ from sqlalchemy.orm import Session
 from db import get_db
 from services.erp_integration_service import ERPIntegrationService
 from celery_app import celery_app
+from barcode_cache import invalidate_all as invalidate_barcode_cache
+from sync import purge_tombstones
+from snapshots import mark_stale, ALL_BRANCHES
 from datetime import datetime
 import uuid
 import platform
@@ -156,8 +159,13 @@ def sync_assets_from_oracle_task(self, user_id: str = None, force_full_sync: boo
                 errors.append(error_msg)
                 logger.error(error_msg)
         
+        # Each commit already dropped its barcodes; this also clears other workers' in-process copies
+        invalidate_barcode_cache()
+
         # Update last sync date
         erp_service.update_last_sync_date(current_sync_date, 'asset_sync')
+        purge_tombstones(db)
+        mark_stale([ALL_BRANCHES])
         
         # Update sync log with success
         erp_service.update_sync_log_success(
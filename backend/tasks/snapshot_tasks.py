@@ -0,0 +1,22 @@
+import logging
+from celery_app import celery_app
+from snapshots import build_snapshots, take_stale
+
+logger = logging.getLogger("uvicorn")
+
+@celery_app.task(name="tasks.snapshot_tasks.build_snapshots")
+def build_snapshots_task(branch_ids: list = None):
+    """
+    Rebuild the offline snapshot packs of the given branches, or of every branch
+    """
+    return {"built": build_snapshots(branch_ids)}
+
+@celery_app.task(name="tasks.snapshot_tasks.build_stale_snapshots")
+def build_stale_snapshots_task():
+    """
+    Rebuild the packs of branches changed since the last run; scheduled by snapshots.mark_stale
+    """
+    branch_ids = take_stale()
+    if branch_ids == []:
+        return {"built": 0}
+    return {"built": build_snapshots(branch_ids)}
@@ -1,7 +1,17 @@
-from typing import Optional, Dict, Any
+import base64
+import binascii
+import hashlib
+import json
+import time
+from typing import Callable, Optional, Dict, Any, Tuple
+from fastapi import HTTPException
 from sqlalchemy.orm import Query
-from sqlalchemy import or_, and_
-from models import UserRole, UserCountryAssignment, UserRegionAssignment, UserBranchAssignment, Country, Region, Branch, Location
+from sqlalchemy import or_, and_, true, func
+import redis
+from models import UserRole
+from cache import LRUCache, CacheStats, get_redis
+from hierarchy import HierarchySnapshot, get_hierarchy
+from config import config
 
 def apply_search_filter(query: Query, search_term: Optional[str], search_fields: list) -> Query:
     """Apply search filter to a query"""
@@ -24,6 +34,105 @@ def paginate_query(query: Query, skip: int = 0, limit: int = 100) -> Query:
     """Apply pagination to a query"""
     return query.offset(skip).limit(limit)
 
+def encode_cursor(values: list) -> str:
+    """Opaque cursor holding the sort key values of the last row of a page"""
+    # Datetimes become 'YYYY-MM-DD HH:MM:SS', which MySQL compares with DATETIME columns
+    return base64.urlsafe_b64encode(json.dumps(values, separators=(",", ":"), default=str).encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str, size: int) -> list:
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except (binascii.Error, ValueError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if not isinstance(values, list) or len(values) != size:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return values
+
+def keyset_paginate(query, order_by: list, cursor: Optional[str] = None, skip: int = 0, limit: int = 100):
+    """
+    Order by the given columns (ending in a unique one, usually id) and continue after the cursor.
+    Without a cursor the page starts at `skip`, so old clients keep working and get the same stable order.
+    Works for ORM queries and select() statements.
+    """
+    query = query.order_by(*order_by)
+    if cursor:
+        if skip:
+            raise HTTPException(status_code=400, detail="Use either skip or cursor, not both")
+        values = decode_cursor(cursor, len(order_by))
+        # (a, b) > (x, y) spelled out, which MySQL turns into a range scan on the index
+        query = query.filter(or_(*[
+            and_(*[column == value for column, value in zip(order_by[:i], values[:i])], order_by[i] > values[i])
+            for i in range(len(order_by))
+        ]))
+    elif skip:
+        query = query.offset(skip)
+    return query.limit(limit)
+
+def next_cursor(rows: list, order_by: list, limit: int) -> Optional[str]:
+    """Cursor for the page after `rows`, None once a short page shows the end was reached"""
+    if not rows or len(rows) < limit:
+        return None
+    return encode_cursor([getattr(rows[-1], column.key) for column in order_by])
+
+def count_rows(query: Query, column) -> int:
+    """COUNT(column) with the query's filters, without the subquery Query.count() wraps around it"""
+    return query.with_entities(func.count(column)).order_by(None).scalar()
+
+# Totals of list queries keyed by scope fingerprint and filters; Redis holds the shared tier
+_count_cache = LRUCache(maxsize=config.COUNT_CACHE_SIZE, ttl=config.COUNT_CACHE_TTL_SECONDS)
+count_cache_stats = CacheStats()
+
+def _count_key(key: tuple) -> str:
+    return "count:" + hashlib.sha1(json.dumps(key, default=str).encode()).hexdigest()
+
+def get_cached_count(key: tuple) -> Optional[int]:
+    """Cached total for the key, or None on a miss"""
+    redis_key = _count_key(key)
+    total = _count_cache.get(redis_key)
+    if total is not None:
+        count_cache_stats.record_hit("local")
+        return total
+    client = get_redis()
+    if client is None:
+        return None
+    try:
+        cached = client.get(redis_key)
+    except redis.RedisError:
+        return None
+    if cached is None:
+        return None
+    total = int(cached)
+    _count_cache.set(redis_key, total)
+    count_cache_stats.record_hit("redis")
+    return total
+
+def store_count(key: tuple, total: int, rebuild_seconds: float = 0.0):
+    """Cache a total counted after a miss"""
+    redis_key = _count_key(key)
+    count_cache_stats.record_miss(rebuild_seconds)
+    _count_cache.set(redis_key, total)
+    client = get_redis()
+    if client is not None:
+        try:
+            client.setex(redis_key, config.COUNT_CACHE_TTL_SECONDS, total)
+        except redis.RedisError:
+            pass
+
+def cached_count(key: tuple, count: Callable[[], int], exact: bool = False) -> Tuple[int, bool]:
+    """
+    Total for a list query, reused for COUNT_CACHE_TTL_SECONDS by every worker.
+    The key must identify the access scope and every filter. exact=True always counts and refreshes the cache.
+    Returns (total, whether it was counted just now).
+    """
+    if not exact:
+        total = get_cached_count(key)
+        if total is not None:
+            return total, False
+    started = time.perf_counter()
+    total = count()
+    store_count(key, total, time.perf_counter() - started)
+    return total, True
+
 def get_pagination_info(total_count: int, skip: int, limit: int) -> Dict[str, Any]:
     """Get pagination metadata"""
     return {
@@ -36,29 +145,130 @@ def get_pagination_info(total_count: int, skip: int, limit: int) -> Dict[str, An
         "has_prev": skip > 0
     }
 
-def get_access_scope_for_user(db, user_id: str):
+class AccessScope:
+    """
+    Row-level access scope of a user.
+    Admin scopes answer every question without materialising IDs; they are only listed when a caller asks for them.
+    """
+
+    def __init__(self, is_admin: bool, ids: Optional[Dict[str, list]] = None):
+        self.is_admin = is_admin
+        self._ids: Dict[str, list] = dict(ids or {})
+        self._id_sets: Dict[str, set] = {}
+        self._fingerprints: Dict[str, str] = {}
+
+    def ids(self, level: str = 'location') -> list:
+        """Accessible IDs at a hierarchy level ('country', 'region', 'branch' or 'location')"""
+        key = f'{level}_ids'
+        if key not in self._ids:
+            if not self.is_admin:
+                return []
+            hierarchy = get_hierarchy()
+            nodes = {
+                'country': hierarchy.countries,
+                'region': hierarchy.regions,
+                'branch': hierarchy.branches,
+                'location': hierarchy.locations,
+            }[level]
+            self._ids[key] = list(nodes)
+        return self._ids[key]
+
+    @property
+    def country_ids(self) -> list:
+        return self.ids('country')
+
+    @property
+    def region_ids(self) -> list:
+        return self.ids('region')
+
+    @property
+    def branch_ids(self) -> list:
+        return self.ids('branch')
+
+    @property
+    def location_ids(self) -> list:
+        return self.ids('location')
+
+    def allows(self, object_id: Optional[str], level: str = 'location') -> bool:
+        """Whether the user may see the given location (or country/region/branch)"""
+        if self.is_admin:
+            return True
+        if level not in self._id_sets:
+            self._id_sets[level] = set(self.ids(level))
+        return object_id in self._id_sets[level]
+
+    def fingerprint(self, level: str = 'location') -> str:
+        """Short key for the IDs at a level, so users with the same scope share cached results"""
+        if self.is_admin:
+            return 'admin'
+        if level not in self._fingerprints:
+            self._fingerprints[level] = hashlib.sha1(','.join(sorted(self.ids(level))).encode()).hexdigest()
+        return self._fingerprints[level]
+
+    def filter_clause(self, column, level: str = 'location'):
+        """SQL clause restricting column (holding IDs of the given level) to this scope"""
+        if self.is_admin:
+            return true()
+        return column.in_(self.ids(level))
+
+# Access scopes keyed by (user_id, hierarchy version); Redis holds the shared tier
+_scope_cache = LRUCache(maxsize=config.SCOPE_CACHE_SIZE, ttl=config.SCOPE_CACHE_TTL_SECONDS)
+scope_cache_stats = CacheStats()
+
+def get_access_scope_for_user(db, user_id: str, roles: Optional[list] = None) -> AccessScope:
     """
-    Returns a dict with lists of accessible country_ids, region_ids, branch_ids, and location_ids for the user.
-    Admins get all. Others get only what is assigned to them (and children).
+    Returns the AccessScope of the user.
+    Admins can access everything. Others get only what is assigned to them (and children).
+    Results are cached until the hierarchy version is bumped by an assignment, hierarchy or role write.
+    Pass roles when the caller already has them to skip the role query on a cache miss.
     """
+    return AccessScope(**_get_cached_scope(db, user_id, roles))
+
+def _get_cached_scope(db, user_id: str, roles: Optional[list] = None) -> Dict[str, Any]:
+    # Keyed by the snapshot version the scope is computed from, not the latest bump,
+    # so a scope built from a stale snapshot is recomputed once the rebuild lands
+    hierarchy = get_hierarchy()
+    version = hierarchy.version
+    key = (user_id, version)
+    scope = _scope_cache.get(key)
+    if scope is not None:
+        scope_cache_stats.record_hit("local")
+        return scope
+
+    client = get_redis()
+    redis_key = f"scope:{version}:{user_id}"
+    if client is not None:
+        try:
+            cached = client.get(redis_key)
+        except redis.RedisError:
+            cached = None
+        if cached:
+            scope = json.loads(cached)
+            _scope_cache.set(key, scope)
+            scope_cache_stats.record_hit("redis")
+            return scope
+
+    started = time.perf_counter()
+    scope = _build_access_scope(db, user_id, hierarchy, roles)
+    scope_cache_stats.record_miss(time.perf_counter() - started)
+    _scope_cache.set(key, scope)
+    if client is not None:
+        try:
+            client.setex(redis_key, config.SCOPE_CACHE_TTL_SECONDS, json.dumps(scope))
+        except redis.RedisError:
+            pass
+    return scope
+
+def _build_access_scope(db, user_id: str, hierarchy: HierarchySnapshot, roles: Optional[list] = None):
+    """Compute a user's access scope from their roles and the hierarchy snapshot"""
     # Get user roles
-    user_roles = db.query(UserRole).filter(UserRole.user_id == user_id).all()
-    roles = [r.role for r in user_roles]
+    if roles is None:
+        roles = [role for (role,) in db.query(UserRole.role).filter(UserRole.user_id == user_id).all()]
     is_admin = 'admin' in roles
 
-    # If admin, return all
+    # Admins can access everything, no need to list it
     if is_admin:
-        country_ids = [c.id for c in db.query(Country.id).all()]
-        region_ids = [r.id for r in db.query(Region.id).all()]
-        branch_ids = [b.id for b in db.query(Branch.id).all()]
-        location_ids = [l.id for l in db.query(Location.id).all()]
-        return {
-            'country_ids': country_ids,
-            'region_ids': region_ids,
-            'branch_ids': branch_ids,
-            'location_ids': location_ids,
-            'is_admin': True
-        }
+        return {'is_admin': True}
 
     # Otherwise, build access scope
     country_ids = set()
@@ -66,54 +276,41 @@ def get_access_scope_for_user(db, user_id: str):
     branch_ids = set()
     location_ids = set()
 
-    # Accounting manager: assigned countries
+    # Accounting manager: assigned countries and everything below them
     if 'accounting_manager' in roles:
-        assigned_countries = db.query(UserCountryAssignment.country_id).filter(UserCountryAssignment.user_id == user_id).all()
-        for (country_id,) in assigned_countries:
+        for country_id in hierarchy.user_countries.get(user_id, ()):
             country_ids.add(country_id)
-            # All regions in country
-            for region in db.query(Region).filter(Region.country_id == country_id):
-                region_ids.add(region.id)
-                # All branches in region
-                for branch in db.query(Branch).filter(Branch.region_id == region.id):
-                    branch_ids.add(branch.id)
-                    # All locations in branch
-                    for location in db.query(Location).filter(Location.branch_id == branch.id):
-                        location_ids.add(location.id)
+            region_ids.update(hierarchy.country_regions.get(country_id, ()))
+            branch_ids.update(hierarchy.country_branches.get(country_id, ()))
+            location_ids.update(hierarchy.country_locations.get(country_id, ()))
 
     # Controller: assigned regions
     if 'controller' in roles:
-        assigned_regions = db.query(UserRegionAssignment.region_id).filter(UserRegionAssignment.user_id == user_id).all()
-        for (region_id,) in assigned_regions:
+        for region_id in hierarchy.user_regions.get(user_id, ()):
             region_ids.add(region_id)
-            region = db.query(Region).filter(Region.id == region_id).first()
+            region = hierarchy.regions.get(region_id)
             if region:
                 country_ids.add(region.country_id)
-            # All branches in region
-            for branch in db.query(Branch).filter(Branch.region_id == region_id):
-                branch_ids.add(branch.id)
-                # All locations in branch
-                for location in db.query(Location).filter(Location.branch_id == branch.id):
-                    location_ids.add(location.id)
+            branch_ids.update(hierarchy.region_branches.get(region_id, ()))
+            location_ids.update(hierarchy.region_locations.get(region_id, ()))
 
     # Manager/user: assigned branches
     if 'manager' in roles or 'user' in roles:
-        assigned_branches = db.query(UserBranchAssignment.branch_id).filter(UserBranchAssignment.user_id == user_id).all()
-        for (branch_id,) in assigned_branches:
+        for branch_id in hierarchy.user_branches.get(user_id, ()):
             branch_ids.add(branch_id)
-            branch = db.query(Branch).filter(Branch.id == branch_id).first()
+            branch = hierarchy.branches.get(branch_id)
             if branch:
                 region_ids.add(branch.region_id)
                 if branch.country_id:
                     country_ids.add(branch.country_id)
-            # All locations in branch
-            for location in db.query(Location).filter(Location.branch_id == branch_id):
-                location_ids.add(location.id)
+            location_ids.update(hierarchy.branch_locations.get(branch_id, ()))
 
     return {
-        'country_ids': list(country_ids),
-        'region_ids': list(region_ids),
-        'branch_ids': list(branch_ids),
-        'location_ids': list(location_ids),
-        'is_admin': False
-    } 
\ No newline at end of file
+        'is_admin': False,
+        'ids': {
+            'country_ids': list(country_ids),
+            'region_ids': list(region_ids),
+            'branch_ids': list(branch_ids),
+            'location_ids': list(location_ids),
+        }
+    }
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Benchmark /assets/barcode/{barcode} latency (p50/p99) with a cold and a warm barcode cache.
+The first pass over the sample misses the cache and reads the database, the second is served from the cache.
+For a baseline without the cache at all, run it against a server started with BARCODE_CACHE_ENABLED=false.
+"""
+
+import os
+import statistics
+import sys
+import time
+
+import requests
+
+# Configuration
+BASE_URL = os.getenv("BASE_URL", "http://localhost:8200")
+TEST_TOKEN = os.getenv("TEST_TOKEN", "your-test-token-here")  # Replace with a valid token
+SAMPLE_SIZE = int(os.getenv("SAMPLE_SIZE", "500"))
+
+HEADERS = {"Authorization": f"Bearer {TEST_TOKEN}"}
+
+def sample_barcodes():
+    """Barcodes of the first SAMPLE_SIZE assets; rerun within BARCODE_CACHE_TTL_SECONDS and the cold pass is warm too"""
+    response = requests.get(f"{BASE_URL}/assets/page", headers=HEADERS, params={"limit": SAMPLE_SIZE})
+    response.raise_for_status()
+    return [asset["barcode"] for asset in response.json()["items"] if asset.get("barcode")]
+
+def percentile(timings, pct):
+    ordered = sorted(timings)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+def scan_all(session, barcodes):
+    timings = []
+    for barcode in barcodes:
+        started = time.perf_counter()
+        response = session.get(f"{BASE_URL}/assets/barcode/{barcode}", headers=HEADERS)
+        timings.append((time.perf_counter() - started) * 1000)
+        if response.status_code != 200:
+            raise RuntimeError(f"{barcode}: {response.status_code} {response.text[:200]}")
+    return timings
+
+def test_barcode_latency():
+    """The warm pass must not be slower than the cold one"""
+    barcodes = sample_barcodes()
+    if not barcodes:
+        print("No assets with barcodes to scan")
+        return False
+    print(f"Scanning {len(barcodes)} barcodes twice...")
+    # One keep-alive session, like a scanner, so connection setup does not drown the difference
+    with requests.Session() as session:
+        cold = scan_all(session, barcodes)
+        warm = scan_all(session, barcodes)
+    for name, timings in (("cold", cold), ("warm", warm)):
+        print(f"  {name}: p50 {statistics.median(timings):.2f} ms, p99 {percentile(timings, 99):.2f} ms")
+    return statistics.median(warm) <= statistics.median(cold)
+
+if __name__ == "__main__":
+    print("Barcode Lookup Latency Test")
+    print("=" * 50)
+
+    try:
+        ok = test_barcode_latency()
+    except (requests.RequestException, RuntimeError) as e:
+        print(f"Error: {e}")
+        ok = False
+
+    print("\nTest passed!" if ok else "\nTest failed!")
+    sys.exit(0 if ok else 1)
@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""
+Test script to verify an authenticated request uses a single database session.
+Needs a non-production server, which reports connection checkouts in X-DB-Checkouts.
+"""
+
+import os
+import sys
+
+import requests
+
+# Configuration
+BASE_URL = os.getenv("BASE_URL", "http://localhost:8200")
+TEST_TOKEN = os.getenv("TEST_TOKEN", "your-test-token-here")  # Replace with actual token
+
+HEADERS = {"Authorization": f"Bearer {TEST_TOKEN}"}
+
+# Read-only endpoints that authenticate the caller and then query through the handler's session
+ENDPOINTS = [
+    "/auth/me",
+    "/assets?limit=5",
+    "/assets/count",
+    "/locations?skip=0&limit=5",
+    "/locations/branches?skip=0&limit=5",
+    "/cycle-count-tasks",
+]
+
+def test_checkouts_per_request():
+    """Each request should check out at most one pooled connection"""
+    print("Testing connection checkouts per request...")
+    failures = 0
+    for path in ENDPOINTS:
+        # The first call may load the hierarchy snapshot, which uses its own session
+        requests.get(f"{BASE_URL}{path}", headers=HEADERS)
+        response = requests.get(f"{BASE_URL}{path}", headers=HEADERS)
+        checkouts = response.headers.get("X-DB-Checkouts")
+        if checkouts is None:
+            print(f"  {path}: status {response.status_code}, no X-DB-Checkouts header (production mode?)")
+            failures += 1
+            continue
+        ok = response.status_code == 200 and int(checkouts) <= 1
+        print(f"  {'OK  ' if ok else 'FAIL'} {path}: status {response.status_code}, {checkouts} checkout(s)")
+        failures += 0 if ok else 1
+    return failures == 0
+
+if __name__ == "__main__":
+    print("Database Session Test Script")
+    print("=" * 50)
+
+    ok = test_checkouts_per_request()
+
+    print("\nTest passed!" if ok else "\nTest failed!")
+    sys.exit(0 if ok else 1)
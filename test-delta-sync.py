@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Check the asset change feed (/assets/changes) the way a device uses it: an initial download
+without a token, paged until has_more is false, then a sync with the kept token that only
+transfers what changed in between. Run it on a quiet system, or expect a few changed rows.
+"""
+
+import os
+import sys
+import time
+
+import requests
+
+# Configuration
+BASE_URL = os.getenv("BASE_URL", "http://localhost:8200")
+TEST_TOKEN = os.getenv("TEST_TOKEN", "your-test-token-here")  # Replace with a valid token
+PAGE_SIZE = int(os.getenv("PAGE_SIZE", "1000"))
+
+HEADERS = {"Authorization": f"Bearer {TEST_TOKEN}"}
+
+def sync(token=None):
+    """Page through one sync; returns (changed assets, removals, bytes received, token for the next sync)"""
+    assets, removed, received = {}, [], 0
+    while True:
+        params = {"limit": PAGE_SIZE}
+        if token:
+            params["token"] = token
+        response = requests.get(f"{BASE_URL}/assets/changes", headers=HEADERS, params=params)
+        response.raise_for_status()
+        received += len(response.content)
+        page = response.json()
+        assets.update((asset["id"], asset) for asset in page["assets"])
+        removed.extend(page["removed"])
+        token = page["token"]
+        if not page["has_more"]:
+            return assets, removed, received, token
+
+def test_delta_sync():
+    response = requests.get(f"{BASE_URL}/assets/count", headers=HEADERS, params={"exact": True})
+    response.raise_for_status()
+    expected = response.json()["count"]
+
+    started = time.perf_counter()
+    assets, _, received, token = sync()
+    print(f"Initial download: {len(assets)} assets, {received / 1024:.0f} KiB in {time.perf_counter() - started:.2f}s")
+    # Assets changed within the settle window arrive with the next sync instead
+    if len(assets) > expected:
+        print(f"  more assets than /assets/count reports ({expected})")
+        return False
+
+    started = time.perf_counter()
+    changed, removed, received, _ = sync(token)
+    print(f"Delta sync: {len(changed)} changed, {len(removed)} removed, {received / 1024:.1f} KiB in {time.perf_counter() - started:.2f}s")
+    # Only what changed since the first sync; on a quiet system that is (almost) nothing
+    return len(changed) + len(removed) < max(1, len(assets) // 100)
+
+if __name__ == "__main__":
+    print("Delta Sync Test")
+    print("=" * 50)
+
+    try:
+        ok = test_delta_sync()
+    except requests.RequestException as e:
+        print(f"Error: {e}")
+        ok = False
+
+    print("\nTest passed!" if ok else "\nTest failed!")
+    sys.exit(0 if ok else 1)
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Test script to verify slow logins and Oracle connection tests do not stall barcode lookups
+on the same worker. Run it against a single uvicorn worker started with RATE_LIMIT_ENABLED=false:
+the login rate limit would otherwise answer most logins with 429 before bcrypt runs, and the
+test would measure the rate limiter instead.
+"""
+
+import os
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+# Configuration
+BASE_URL = os.getenv("BASE_URL", "http://localhost:8200")
+TEST_TOKEN = os.getenv("TEST_TOKEN", "your-test-token-here")  # Replace with an admin token
+TEST_BARCODE = os.getenv("TEST_BARCODE", "TEST-BARCODE")
+SAMPLES = int(os.getenv("SAMPLES", "50"))
+SLOW_CALLS = int(os.getenv("SLOW_CALLS", "20"))
+MAX_P95_INCREASE_MS = float(os.getenv("MAX_P95_INCREASE_MS", "250"))
+
+HEADERS = {"Authorization": f"Bearer {TEST_TOKEN}"}
+
+def barcode_latencies(samples):
+    """Time sequential barcode lookups in milliseconds"""
+    latencies = []
+    with requests.Session() as session:
+        for _ in range(samples):
+            started = time.perf_counter()
+            session.get(f"{BASE_URL}/assets/barcode/{TEST_BARCODE}", headers=HEADERS)
+            latencies.append((time.perf_counter() - started) * 1000)
+    return latencies
+
+def slow_login():
+    # bcrypt verification runs even when the password is wrong
+    response = requests.post(f"{BASE_URL}/auth/token", data={"username": "latency@test.local", "password": "wrong-password"})
+    return response.status_code
+
+def slow_oracle_test():
+    requests.get(f"{BASE_URL}/erp/test-connection", headers=HEADERS)
+
+def p95(latencies):
+    return statistics.quantiles(latencies, n=20)[-1]
+
+def report(label, latencies):
+    print(f"{label}: p50={statistics.median(latencies):.1f} ms  p95={p95(latencies):.1f} ms  max={max(latencies):.1f} ms")
+
+def test_event_loop_latency():
+    """Compare barcode lookup latency with and without concurrent blocking calls"""
+    print("Measuring baseline barcode lookup latency...")
+    baseline = barcode_latencies(SAMPLES)
+    report("Baseline", baseline)
+
+    print(f"\nMeasuring again while {SLOW_CALLS} logins and Oracle connection tests run...")
+    with ThreadPoolExecutor(max_workers=SLOW_CALLS) as pool:
+        logins = [pool.submit(slow_login if i % 2 == 0 else slow_oracle_test) for i in range(SLOW_CALLS)][::2]
+        loaded = barcode_latencies(SAMPLES)
+    report("Under load", loaded)
+
+    statuses = [login.result() for login in logins]
+    if 429 in statuses:
+        print(f"\n{statuses.count(429)} of {len(statuses)} logins were rate limited; restart the server with RATE_LIMIT_ENABLED=false")
+        return False
+    if any(status != 401 for status in statuses):
+        print(f"\nLogins returned {sorted(set(statuses))}, expected 401 for the wrong password")
+        return False
+
+    increase = p95(loaded) - p95(baseline)
+    print(f"\np95 increase: {increase:.1f} ms (allowed {MAX_P95_INCREASE_MS:.0f} ms)")
+    return increase <= MAX_P95_INCREASE_MS
+
+if __name__ == "__main__":
+    print("Event Loop Latency Test Script")
+    print("=" * 50)
+
+    ok = test_event_loop_latency()
+
+    print("\nTest passed!" if ok else "\nTest failed: blocking calls are delaying barcode lookups")
+    sys.exit(0 if ok else 1)
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Benchmark page latency against page depth for skip/limit and cursor pagination of /assets.
+Walks the list with X-Next-Cursor and, at each sampled depth, times the same page fetched with skip.
+Cursor pages should stay flat while skip pages grow with the number of skipped rows.
+"""
+
+import os
+import statistics
+import sys
+import time
+
+import requests
+
+# Configuration
+BASE_URL = os.getenv("BASE_URL", "http://localhost:8200")
+TEST_TOKEN = os.getenv("TEST_TOKEN", "your-test-token-here")  # Replace with an admin token
+PAGE_SIZE = int(os.getenv("PAGE_SIZE", "100"))
+MAX_PAGES = int(os.getenv("MAX_PAGES", "2000"))
+SAMPLE_DEPTHS = [1, 10, 100, 500, 1000, 2000]
+REPEATS = 3
+
+HEADERS = {"Authorization": f"Bearer {TEST_TOKEN}"}
+
+def timed_get(params):
+    started = time.perf_counter()
+    response = requests.get(f"{BASE_URL}/assets", headers=HEADERS, params=params)
+    return response, (time.perf_counter() - started) * 1000
+
+def median_ms(params):
+    return statistics.median(timed_get(params)[1] for _ in range(REPEATS))
+
+def test_pagination_depth():
+    """Skip and cursor pages at the same depth must hold the same rows; print latency per depth"""
+    print(f"Walking /assets with limit={PAGE_SIZE}...")
+    print(f"{'page':>6} {'skip ms':>10} {'cursor ms':>10}")
+    cursor = None
+    ok = True
+    for page in range(1, MAX_PAGES + 1):
+        params = {"limit": PAGE_SIZE, "cursor": cursor} if cursor else {"limit": PAGE_SIZE}
+        response, _ = timed_get(params)
+        if response.status_code != 200:
+            print(f"  FAIL page {page}: {response.status_code} {response.text[:200]}")
+            return False
+        if page in SAMPLE_DEPTHS:
+            skip_params = {"limit": PAGE_SIZE, "skip": (page - 1) * PAGE_SIZE}
+            skip_ids = [asset["id"] for asset in timed_get(skip_params)[0].json()]
+            if skip_ids != [asset["id"] for asset in response.json()]:
+                print(f"  FAIL page {page}: skip and cursor pages differ")
+                ok = False
+            print(f"{page:>6} {median_ms(skip_params):>10.1f} {median_ms(params):>10.1f}")
+        cursor = response.headers.get("X-Next-Cursor")
+        if not cursor:
+            print(f"Reached the end after {page} pages")
+            break
+    return ok
+
+if __name__ == "__main__":
+    print("Pagination Depth Benchmark")
+    print("=" * 50)
+
+    ok = test_pagination_depth()
+
+    print("\nTest passed!" if ok else "\nTest failed!")
+    sys.exit(0 if ok else 1)
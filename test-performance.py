@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Benchmark script comparing the sync and async read endpoints.
+Start two servers on the same database, one with ASYNC_DB_ENABLED=false and one with
+ASYNC_DB_ENABLED=true, then point SYNC_BASE_URL and ASYNC_BASE_URL at them.
+"""
+
+import os
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+# Configuration
+SYNC_BASE_URL = os.getenv("SYNC_BASE_URL", "http://localhost:8200")
+ASYNC_BASE_URL = os.getenv("ASYNC_BASE_URL", "http://localhost:8201")
+TEST_TOKEN = os.getenv("TEST_TOKEN", "your-test-token-here")  # Replace with actual token
+TEST_BARCODE = os.getenv("TEST_BARCODE", "TEST-BARCODE")
+CONCURRENCY = int(os.getenv("CONCURRENCY", "64"))
+REQUESTS_PER_ENDPOINT = int(os.getenv("REQUESTS_PER_ENDPOINT", "500"))
+
+HEADERS = {"Authorization": f"Bearer {TEST_TOKEN}"}
+
+ENDPOINTS = [
+    "/assets?limit=50",
+    f"/assets/barcode/{TEST_BARCODE}",
+    "/assets/count",
+    "/cycle-count-items?limit=50",
+    "/locations?limit=50",
+]
+
+def run(base_url, path):
+    """Fire REQUESTS_PER_ENDPOINT requests with CONCURRENCY clients; return (requests/s, latencies in ms, errors)"""
+    session = requests.Session()
+    session.mount("http://", requests.adapters.HTTPAdapter(pool_maxsize=CONCURRENCY))
+
+    def call(_):
+        started = time.perf_counter()
+        response = session.get(f"{base_url}{path}", headers=HEADERS)
+        return (time.perf_counter() - started) * 1000, response.status_code
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=CONCURRENCY) as pool:
+        results = list(pool.map(call, range(REQUESTS_PER_ENDPOINT)))
+    elapsed = time.perf_counter() - started
+    latencies = [latency for latency, _ in results]
+    errors = sum(1 for _, status in results if status >= 500)
+    return REQUESTS_PER_ENDPOINT / elapsed, latencies, errors
+
+def report(label, result):
+    throughput, latencies, errors = result
+    p95 = statistics.quantiles(latencies, n=20)[-1]
+    print(f"  {label:<6} {throughput:8.1f} req/s  p50={statistics.median(latencies):7.1f} ms  p95={p95:7.1f} ms  5xx={errors}")
+
+def benchmark_sync_vs_async():
+    """Compare throughput and latency of each hot read endpoint on both paths"""
+    for path in ENDPOINTS:
+        print(f"\n{path}")
+        # Warm up caches and pools on both servers
+        run(SYNC_BASE_URL, path)
+        run(ASYNC_BASE_URL, path)
+        report("sync", run(SYNC_BASE_URL, path))
+        report("async", run(ASYNC_BASE_URL, path))
+
+if __name__ == "__main__":
+    print("Performance Benchmark Script")
+    print("=" * 50)
+    print(f"{REQUESTS_PER_ENDPOINT} requests per endpoint, {CONCURRENCY} concurrent clients")
+
+    benchmark_sync_vs_async()
+
+    print("\nBenchmark completed!")
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Test script to verify hot-path queries are served by an index.
+Runs ANALYZE TABLE and then EXPLAIN for each query against the configured database (backend/.env)
+and fails on full table scans. Run it on production-sized data (test-search-benchmark.py --seed fills
+assets): on near-empty tables the optimizer scans even with a good index.
+"""
+
+import sys
+from pathlib import Path
+
+# Add the backend directory to Python path
+sys.path.insert(0, str(Path(__file__).parent / "backend"))
+
+from sqlalchemy import select, text
+from sqlalchemy.dialects import mysql
+from db import engine
+from search import apply_asset_search
+from models import (
+    Asset, AssetTransferApproval, AssetTransferItem, Branch, CycleCountItem, CycleCountTask,
+    Location, Region, SyncLog, TempAsset,
+)
+
+SAMPLE_ID = "00000000-0000-0000-0000-000000000000"
+
+# Lookup tables small enough that a full scan is fine; their scans only warn
+SMALL_TABLES = {"regions", "branches"}
+
+# (name, table the plan must not scan, query)
+HOT_PATH_QUERIES = [
+    ("asset by barcode", "assets", select(Asset).where(Asset.barcode == "TEST-BARCODE")),
+    ("asset search", "assets", apply_asset_search(select(Asset), "dell latitude").limit(50)),
+    ("assets by status", "assets", select(Asset).where(Asset.status == "active").limit(100)),
+    ("assets by category", "assets", select(Asset).where(Asset.category == "IT").limit(100)),
+    ("assets by location", "assets", select(Asset).where(Asset.location.in_([SAMPLE_ID])).limit(100)),
+    ("cycle count items of a task", "cycle_count_items",
+     select(CycleCountItem).where(CycleCountItem.task_id == SAMPLE_ID).limit(100)),
+    ("pending items of a task", "cycle_count_items",
+     select(CycleCountItem).where(CycleCountItem.task_id == SAMPLE_ID, CycleCountItem.status == "pending")),
+    ("cycle count tasks by status", "cycle_count_tasks",
+     select(CycleCountTask).where(CycleCountTask.status == "active").limit(100)),
+    ("tasks assigned to a user", "cycle_count_tasks",
+     select(CycleCountTask).where(CycleCountTask.status == "active", CycleCountTask.assigned_to == SAMPLE_ID)),
+    ("transfers of an asset", "asset_transfer_items",
+     select(AssetTransferItem).where(AssetTransferItem.asset_id == SAMPLE_ID).limit(1)),
+    ("pending approvals of a user", "asset_transfer_approvals",
+     select(AssetTransferApproval).where(AssetTransferApproval.approver_id == SAMPLE_ID, AssetTransferApproval.status == "pending")),
+    ("sync history", "sync_logs",
+     select(SyncLog).where(SyncLog.sync_type == "oracle_asset_sync").order_by(SyncLog.started_at.desc()).limit(50)),
+    ("latest syncs", "sync_logs", select(SyncLog).order_by(SyncLog.started_at.desc()).limit(5)),
+    ("locations of a branch", "locations",
+     select(Location).where(Location.branch_id == SAMPLE_ID).order_by(Location.name).limit(50)),
+    ("branches of a region", "branches", select(Branch).where(Branch.region_id == SAMPLE_ID).order_by(Branch.name)),
+    ("regions of a country", "regions", select(Region).where(Region.country_id == SAMPLE_ID).order_by(Region.name)),
+    ("temp assets of a user", "temp_assets", select(TempAsset).where(TempAsset.created_by == SAMPLE_ID)),
+]
+
+def explain(conn, query):
+    sql = str(query.compile(dialect=mysql.dialect(), compile_kwargs={"literal_binds": True}))
+    return conn.execute(text(f"EXPLAIN {sql}")).mappings().all()
+
+def test_query_plans():
+    """A plan fails when it scans the whole table, unless the table is in SMALL_TABLES"""
+    failures = 0
+    with engine.connect() as conn:
+        # Fresh index statistics, so a plan is not a scan only because they are stale
+        for table in sorted({table for _, table, _ in HOT_PATH_QUERIES}):
+            conn.execute(text(f"ANALYZE TABLE {table}")).all()
+        for name, table, query in HOT_PATH_QUERIES:
+            rows = [row for row in explain(conn, query) if row["table"] == table]
+            scans = [row for row in rows if row["type"] == "ALL"]
+            if not scans:
+                used = ", ".join(str(row["key"]) for row in rows) or "no table access"
+                print(f"  OK   {name}: {used}")
+            elif table in SMALL_TABLES:
+                print(f"  WARN {name}: full scan of small table {table}")
+            else:
+                considered = scans[0]["possible_keys"] or "no usable index"
+                print(f"  FAIL {name}: full table scan of {table} (considered: {considered})")
+                failures += 1
+    return failures == 0
+
+if __name__ == "__main__":
+    print("Query Plan Test Script")
+    print("=" * 50)
+
+    ok = test_query_plans()
+
+    print("\nTest passed!" if ok else "\nTest failed!")
+    sys.exit(0 if ok else 1)
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Benchmark asset search: FULLTEXT (search.apply_asset_search) against the old ILIKE '%term%' filter.
+Runs against the configured database (backend/.env).
+
+    python test-search-benchmark.py            # benchmark the assets already there
+    python test-search-benchmark.py --seed     # first top up to TARGET_ASSETS synthetic assets
+    python test-search-benchmark.py --cleanup  # remove the synthetic assets again
+
+Synthetic assets use ERP ids from SEED_ERP_ID_START upwards so they can be told apart and removed.
+"""
+
+import os
+import random
+import statistics
+import sys
+import time
+import uuid
+from pathlib import Path
+from types import SimpleNamespace
+
+# Add the backend directory to Python path
+sys.path.insert(0, str(Path(__file__).parent / "backend"))
+
+from sqlalchemy import delete, func, insert, or_, select
+from db import engine
+from models import Asset, asset_search_text
+from search import apply_asset_search, relevance_order
+
+TARGET_ASSETS = int(os.getenv("TARGET_ASSETS", "1000000"))
+SEED_ERP_ID_START = 900_000_000
+BATCH_SIZE = 10_000
+REPEATS = 5
+MAX_SEARCH_MS = float(os.getenv("MAX_SEARCH_MS", "100"))
+
+VENDORS = ["dell", "hp", "lenovo", "apple", "zebra", "honeywell", "cisco", "samsung"]
+PRODUCTS = ["latitude", "elitebook", "thinkpad", "macbook", "scanner", "printer", "switch", "monitor"]
+TERMS = ["dell latitude", "thinkpad", "zebra sca", "ABC-0004", "abc0004", "9000001"]
+
+def seed(conn):
+    existing = conn.scalar(select(func.count()).select_from(Asset))
+    missing = TARGET_ASSETS - existing
+    print(f"{existing} assets, adding {max(0, missing)}")
+    next_erp_id = (conn.scalar(select(func.max(Asset.erp_asset_id)).where(Asset.erp_asset_id >= SEED_ERP_ID_START))
+                   or SEED_ERP_ID_START - 1) + 1
+    while missing > 0:
+        rows = []
+        for erp_id in range(next_erp_id, next_erp_id + min(BATCH_SIZE, missing)):
+            row = {
+                "id": str(uuid.uuid4()),
+                "erp_asset_id": erp_id,
+                "name": f"{random.choice(VENDORS)} {random.choice(PRODUCTS)} {erp_id % 1000}",
+                "model": f"{random.choice(PRODUCTS).upper()}-{random.randint(100, 999)}",
+                "barcode": f"ABC-{erp_id - SEED_ERP_ID_START:07d}",
+                "status": "active",
+            }
+            # Core inserts skip the ORM listener that fills search_text
+            row["search_text"] = asset_search_text(SimpleNamespace(**row))
+            rows.append(row)
+        conn.execute(insert(Asset), rows)
+        conn.commit()
+        next_erp_id += len(rows)
+        missing -= len(rows)
+
+def cleanup(conn):
+    result = conn.execute(delete(Asset).where(Asset.erp_asset_id >= SEED_ERP_ID_START))
+    conn.commit()
+    print(f"Removed {result.rowcount} synthetic assets")
+
+def median_ms(conn, query):
+    timings = []
+    for _ in range(REPEATS):
+        started = time.perf_counter()
+        conn.execute(query).all()
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+def test_search_latency(conn):
+    """Full-text search must answer within MAX_SEARCH_MS; ILIKE is timed for comparison"""
+    total = conn.scalar(select(func.count()).select_from(Asset))
+    print(f"Searching {total} assets, median of {REPEATS} runs")
+    print(f"{'term':<16} {'fulltext ms':>12} {'ilike ms':>10}")
+    ok = True
+    for term in TERMS:
+        fulltext = apply_asset_search(select(Asset), term).order_by(*relevance_order(term)).limit(50)
+        ilike = select(Asset).where(or_(*[
+            column.ilike(f"%{term}%") for column in (Asset.name, Asset.barcode, Asset.model)
+        ])).limit(50)
+        fulltext_ms = median_ms(conn, fulltext)
+        print(f"{term:<16} {fulltext_ms:>12.1f} {median_ms(conn, ilike):>10.1f}")
+        ok = ok and fulltext_ms <= MAX_SEARCH_MS
+    return ok
+
+if __name__ == "__main__":
+    print("Asset Search Benchmark")
+    print("=" * 50)
+
+    with engine.connect() as conn:
+        if "--cleanup" in sys.argv:
+            cleanup(conn)
+            sys.exit(0)
+        if "--seed" in sys.argv:
+            seed(conn)
+        ok = test_search_latency(conn)
+
+    print("\nTest passed!" if ok else "\nTest failed!")
+    sys.exit(0 if ok else 1)
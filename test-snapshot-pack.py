@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Check the offline snapshot packs (/snapshots/branches): download the first pack in scope,
+resume it with a Range request, revalidate it with its ETag, then open the SQLite file and
+continue from its X-Sync-Token through /assets/changes. Packs are built by the Celery worker
+(snapshots queue) after an ERP sync or changes to a branch.
+
+TEST_TOKEN should belong to a user assigned to a single branch. Set TWO_BRANCH_TOKEN to a user
+assigned to two branches to check that their downloads carry no X-Sync-Token.
+"""
+
+import gzip
+import os
+import sqlite3
+import sys
+import tempfile
+
+import requests
+
+# Configuration
+BASE_URL = os.getenv("BASE_URL", "http://localhost:8200")
+TEST_TOKEN = os.getenv("TEST_TOKEN", "your-test-token-here")  # Replace with a valid token
+TWO_BRANCH_TOKEN = os.getenv("TWO_BRANCH_TOKEN")
+
+HEADERS = {"Authorization": f"Bearer {TEST_TOKEN}"}
+
+def test_snapshot_pack():
+    response = requests.get(f"{BASE_URL}/snapshots/branches", headers=HEADERS)
+    response.raise_for_status()
+    packs = response.json()
+    if not packs:
+        print("No snapshot packs built yet")
+        return False
+    pack = packs[0]
+    url = f"{BASE_URL}/snapshots/branches/{pack['branch_id']}"
+    print(f"Branch {pack['branch_id']}: {pack['size']} bytes, {pack['counts']}")
+
+    full = requests.get(url, headers=HEADERS)
+    full.raise_for_status()
+    if full.headers.get("ETag") != pack["etag"] or len(full.content) != pack["size"]:
+        print("  download does not match the listed pack")
+        return False
+
+    # Resume from the middle, as after a dropped connection
+    middle = len(full.content) // 2
+    resumed = requests.get(url, headers=dict(HEADERS, Range=f"bytes={middle}-", **{"If-Range": pack["etag"]}))
+    if resumed.status_code != 206 or full.content[:middle] + resumed.content != full.content:
+        print(f"  range request returned {resumed.status_code}, not the rest of the pack")
+        return False
+
+    revalidated = requests.get(url, headers=dict(HEADERS, **{"If-None-Match": pack["etag"]}))
+    if revalidated.status_code != 304:
+        print(f"  revalidation returned {revalidated.status_code}, expected 304")
+        return False
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "pack.sqlite")
+        with open(path, "wb") as f:
+            f.write(gzip.decompress(full.content))
+        with sqlite3.connect(path) as db:
+            assets = db.execute("SELECT COUNT(*) FROM assets").fetchone()[0]
+            synced_until = dict(db.execute("SELECT key, value FROM meta"))["synced_until"]
+    print(f"  {assets} assets in the pack, synced until {synced_until}")
+    if assets != pack["counts"]["assets"]:
+        return False
+
+    if "X-Sync-Token" not in full.headers:
+        print("  no X-Sync-Token: the pack does not hold the whole scope of TEST_TOKEN")
+        return False
+    changes = requests.get(f"{BASE_URL}/assets/changes", headers=HEADERS, params={"token": full.headers["X-Sync-Token"]})
+    changes.raise_for_status()
+    page = changes.json()
+    print(f"  delta since the pack: {len(page['assets'])} changed, {len(page['removed'])} removed")
+    return True
+
+def test_two_branch_user():
+    """A pack of one branch must not hand a two-branch user a token for their whole scope"""
+    headers = {"Authorization": f"Bearer {TWO_BRANCH_TOKEN}"}
+    response = requests.get(f"{BASE_URL}/snapshots/branches", headers=headers)
+    response.raise_for_status()
+    packs = response.json()
+    if len(packs) < 2:
+        print(f"Two-branch user sees {len(packs)} packs, expected 2")
+        return False
+    for pack in packs:
+        download = requests.head(f"{BASE_URL}/snapshots/branches/{pack['branch_id']}", headers=headers)
+        download.raise_for_status()
+        if "X-Sync-Token" in download.headers:
+            print(f"  pack of branch {pack['branch_id']} came with an X-Sync-Token")
+            return False
+    print(f"Two-branch user: {len(packs)} packs, none with an X-Sync-Token")
+    return True
+
+if __name__ == "__main__":
+    print("Snapshot Pack Test")
+    print("=" * 50)
+
+    try:
+        ok = test_snapshot_pack()
+        if TWO_BRANCH_TOKEN:
+            ok = test_two_branch_user() and ok
+    except (requests.RequestException, OSError, sqlite3.Error) as e:
+        print(f"Error: {e}")
+        ok = False
+
+    print("\nTest passed!" if ok else "\nTest failed!")
+    sys.exit(0 if ok else 1)